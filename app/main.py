@@ -1,39 +1,36 @@
 import sys
+import time
 from pathlib import Path
 from uuid import uuid4
-from datetime import datetime
-import json
+from dataclasses import asdict
 import streamlit as st
-from copy import replace
-import matplotlib.pyplot as plt
-from collections import defaultdict, OrderedDict
 
 # ----------------- Paths -----------------
 ROOT = Path(__file__).resolve().parent.parent
 sys.path.append(str(ROOT))
 
 # ----------------- Imports -----------------
-from core.transforms import load_seed, add_transaction, update_budget, account_balance, load_users, authenticate
-from core.domain import User, Transaction, Account, Category, Budget
-from core.recursion import flatten_categories, sum_expenses_recursive, by_category, by_date_range, by_amount_range
-from core.memo import forecast_expenses_timed
-from core.ftypes import validate_transaction, check_budget, Maybe, Either
+# Здесь — только то, что нужно форме входа и меню. Тяжёлые модули
+# (matplotlib, ядра отчётов и прогнозов, csv/io) импортируются внутри
+# страниц, которым они нужны; core.service с NumPy — в фоновом потоке.
+from core.transforms import authenticate, now_ts
+from core.domain import Transaction
+from core import aggregate, instrument, startup
 
 # ----------------- Streamlit config -----------------
 st.set_page_config(page_title="Financial Manager", layout="wide")
 st.title("💼 Financial Manager")
 
 # ----------------- Load data -----------------
-accounts, categories, transactions, budgets = load_seed(str(ROOT / "data/seed.json"))
-users = load_users(str(ROOT / "data/seed.json"))
+SEED_PATH = str(ROOT / "data/seed.json")
+# леджер (общий для всех сессий) строится в фоне, пока показывается форма входа
+startup.preload(SEED_PATH)
 
 # ----------------- Session state -----------------
 if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
 if "user" not in st.session_state:
     st.session_state.user = None
-if "transactions" not in st.session_state:
-    st.session_state.transactions = transactions  # инициализация один раз
 
 # ----------------- Authentication -----------------
 if not st.session_state.logged_in:
@@ -41,11 +38,11 @@ if not st.session_state.logged_in:
     username = st.text_input("Username", key="login_username")
     password = st.text_input("Password", type="password", key="login_password")
     if st.button("Sign In"):
-        user = authenticate(users, username, password)
+        # пользователи уже прочитаны фоновым потоком (заголовок seed.snap)
+        user = authenticate(startup.users(SEED_PATH), username, password)
         if user:
             st.session_state.logged_in = True
             st.session_state.user = user
-            st.session_state.transactions = transactions
             st.success(f"Welcome, {user.username} ({user.role})")
         else:
             st.error("❌ Invalid username or password")
@@ -54,360 +51,500 @@ if not st.session_state.logged_in:
 if st.session_state.logged_in and st.session_state.user is not None:
     user = st.session_state.user
 
+    # ждём фоновую загрузку только здесь (обычно она уже закончилась)
+    if startup.ready(SEED_PATH):
+        ledger = startup.ledger(SEED_PATH)
+    else:
+        with st.spinner("Загрузка данных…"):
+            ledger = startup.ledger(SEED_PATH)
+    accounts, categories, budgets = ledger.accounts, ledger.categories, ledger.budgets
+
     # --- Фильтрация данных по пользователю ---
+    # индекс владения: выборка пользователя собирается один раз и кэшируется
     if user.role == "admin":
         user_accounts = accounts
-        visible_transactions = st.session_state.transactions
     else:
-        user_accounts = [a for a in accounts if getattr(a, "user_id", None) == user.username]
-        visible_transactions = [t for t in st.session_state.transactions if t.account_id in [a.id for a in user_accounts]]
+        user_accounts = ledger.ownership.accounts(user.username)
+    visible_transactions = ledger.visible_to(user)
+    visible_account_ids = {a.id for a in user_accounts}
+
+    def is_visible(t):
+        return user.role == "admin" or t.account_id in visible_account_ids
+
+    # --- Постраничный просмотр ---
+    # В сессии хранится только курсор (ts, id) текущей страницы; в браузер
+    # уходит одна страница, а не весь список транзакций.
+    def _set_cursor(key, after=None, before=None):
+        st.session_state[key] = {"after": after, "before": before}
+
+    def paged(key, index, size=50):
+        cursor = st.session_state.get(key) or {}
+        page = index.page(after=cursor.get("after"), before=cursor.get("before"),
+                          size=size)
+        if not page.items and page.total:
+            # выборка сменилась под курсором — к началу
+            _set_cursor(key)
+            page = index.page(size=size)
+        col_prev, col_info, col_next = st.columns([1, 4, 1])
+        col_prev.button("◀ Новее", key=f"{key}_prev", disabled=page.prev is None,
+                        on_click=_set_cursor, args=(key,), kwargs={"before": page.prev})
+        col_next.button("Старше ▶", key=f"{key}_next", disabled=page.next is None,
+                        on_click=_set_cursor, args=(key,), kwargs={"after": page.next})
+        shown = "0"
+        if page.items:
+            shown = f"{page.offset + 1}–{page.offset + len(page.items)}"
+        col_info.caption(f"Строки {shown} из {page.total}")
+        return page
 
     # --- Боковое меню ---
     st.sidebar.success(f"Logged in as {user.username} ({user.role})")
     menu_items = ["Overview", "Data", "Functional Core", "Pipelines", "Reports"]
+    if user.role == "admin":
+        menu_items.append("Diagnostics")
     choice = st.sidebar.radio("📋 Menu", menu_items)
 
-    # ----------------- Overview -----------------
-    if choice == "Overview":
-        st.header("📊 Overview")
-        col1, col2, col3, col4 = st.columns(4)
-        col1.metric("Accounts", len(user_accounts))
-        col2.metric("Categories", len(categories))
-        col3.metric("Transactions", len(visible_transactions))
-        total_balance = sum(a.balance for a in user_accounts) + sum(t.amount for t in visible_transactions)
-        col4.metric("Total Balance", total_balance)
-
-    # ----------------- Data -----------------
-    elif choice == "Data":
-        st.header("📁 Data Explorer")
-        st.subheader("Accounts")
-        st.table([a.__dict__ for a in user_accounts])
-        st.subheader("Categories")
-        st.table([c.__dict__ for c in categories])
-        st.subheader("Transactions (first 20)")
-        st.table([t.__dict__ for t in visible_transactions[:20]])
-
-    # ----------------- Functional Core -----------------
-    elif choice == "Functional Core":
-        st.header("➕ Add Transaction")
-
-        if not user_accounts:
-            st.warning("У вас пока нет счетов. Обратитесь к администратору для их создания.")
-        else:
-            acc = st.selectbox("💳 Account", user_accounts, format_func=lambda a: a.name)
-            cat = st.selectbox("📂 Category", categories, format_func=lambda c: c.name)
-            amount = st.number_input("💰 Amount", value=0, step=100)
-            note = st.text_input("📝 Note", placeholder="Например: продукты, зарплата...")
-
-            signed_amount = abs(int(amount)) if "income" in cat.id.lower() or "income" in cat.name.lower() else -abs(int(amount))
-
-            if st.button("Add Transaction"):
-                t = Transaction(
-                    id=str(uuid4()),
-                    account_id=acc.id,
-                    user_id=user.username,
-                    cat_id=cat.id,
-                    amount=signed_amount,
-                    ts=datetime.now().isoformat(timespec="seconds"),
-                    note=note,
-                    deleted=False
+    # замер перерисовки страницы (и разовый профиль, если он заказан в Diagnostics)
+    page_started = time.perf_counter()
+    profile_kind = st.session_state.get("profile_kind")
+    page_profile = None
+    if profile_kind and choice != "Diagnostics":
+        page_profile = instrument.capture(profile_kind).start()
+
+    try:
+        # ----------------- Overview -----------------
+        if choice == "Overview":
+            st.header("📊 Overview")
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Accounts", len(user_accounts))
+            col2.metric("Categories", len(categories))
+            col3.metric("Transactions", len(visible_transactions))
+            # начальные остатки + индекс балансов (удалённые транзакции не учитываются)
+            total_balance = (aggregate.total(a.balance for a in user_accounts)
+                             + ledger.balances.total(a.id for a in user_accounts))
+            col4.metric("Total Balance", total_balance)
+
+            # Живые предупреждения по бюджетам (текущий период, без удалённых)
+            status = ledger.budget_status().values()
+            for alert in (e.left for e in status if not e.is_right()):
+                st.warning(
+                    f"⚠️ Бюджет {alert['budget_id']} "
+                    f"({alert['cat_id']}, {alert['period']}): "
+                    f"потрачено {alert['spent']} из {alert['limit']}"
                 )
-                st.session_state.transactions = add_transaction(st.session_state.transactions, t)
-
-                # Обновляем seed.json
-                seed_path = ROOT / "data/seed.json"
-                with open(seed_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                data["transactions"].append(t.__dict__)
-                with open(seed_path, "w", encoding="utf-8") as f:
-                    json.dump(data, f, indent=4, ensure_ascii=False)
-
-                st.success("✅ Transaction added and saved successfully!")
-                with st.expander("📜 View last transaction"):
-                    st.json(t.__dict__)
-
-        # --- Просмотр и удаление ---
-        st.divider()
-        st.subheader("💼 Your Transactions")
-
-        if user.role == "admin":
-            user_transactions = st.session_state.transactions
-        else:
-            user_transactions = [t for t in st.session_state.transactions if t.user_id == user.username and not t.deleted]
 
-        if user_transactions:
-            selected = st.selectbox(
-                "Выберите транзакцию для просмотра/удаления:",
-                user_transactions[::-1],
-                format_func=lambda t: f"{t.note or '(без заметки)'} — {t.amount} ({t.ts})"
-            )
-            with st.expander("📄 Детали транзакции", expanded=True):
-                st.markdown(f"""
-                    **ID:** {selected.id}  
-                    **Account:** {selected.account_id}  
-                    **User:** {selected.user_id}  
-                    **Category:** {selected.cat_id}  
-                    **Amount:** {selected.amount}  
-                    **Timestamp:** {selected.ts}  
-                    **Note:** {selected.note}  
-                    **Deleted:** {"Yes" if selected.deleted else "No"}  
-                    """)
-
-            if not selected.deleted:
-                if st.button("🗑️ Удалить транзакцию"):
-                    deleted_tr = replace(selected, deleted=True)
-                    st.session_state.transactions = [deleted_tr if t.id == selected.id else t for t in st.session_state.transactions]
-
-                    # Обновляем seed.json
-                    seed_path = ROOT / "data/seed.json"
-                    with open(seed_path, "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                    for idx, tr in enumerate(data["transactions"]):
-                        if tr["id"] == selected.id:
-                            data["transactions"][idx]["deleted"] = True
-                            break
-                    with open(seed_path, "w", encoding="utf-8") as f:
-                        json.dump(data, f, indent=4, ensure_ascii=False)
-
-                    st.warning("🚫 Transaction marked as deleted (visible only to admin).")
+        # ----------------- Data -----------------
+        elif choice == "Data":
+            st.header("📁 Data Explorer")
+            st.subheader("Accounts")
+            st.table([asdict(a) for a in user_accounts])
+            st.subheader("Categories")
+            st.table([asdict(c) for c in categories])
+            st.subheader("Transactions")
+            page_size = st.selectbox("Строк на странице", [20, 50, 100],
+                                     key="data_page_size")
+            page = paged("data_cursor", ledger.keyset(user), size=page_size)
+            st.dataframe([asdict(t) for t in page.items], use_container_width=True)
+
+        # ----------------- Functional Core -----------------
+        elif choice == "Functional Core":
+            st.header("➕ Add Transaction")
+
+            if not user_accounts:
+                st.warning("У вас пока нет счетов. Обратитесь к администратору для их создания.")
             else:
-                st.info("⚠️ Эта транзакция уже помечена как удалённая.")
-
-        else:
-            st.info("У вас пока нет транзакций.")
+                acc = st.selectbox("💳 Account", user_accounts,
+                                   format_func=lambda a: a.name)
+                cat = st.selectbox("📂 Category", categories,
+                                   format_func=lambda c: c.name)
+                amount = st.number_input("💰 Amount", value=0, step=100)
+                note = st.text_input("📝 Note", placeholder="Например: продукты, зарплата...")
+
+                signed_amount = abs(int(amount)) if "income" in cat.id.lower() or "income" in cat.name.lower() else -abs(int(amount))
+
+                if st.button("Add Transaction"):
+                    t = Transaction(
+                        id=str(uuid4()),
+                        account_id=acc.id,
+                        user_id=user.username,
+                        cat_id=cat.id,
+                        amount=signed_amount,
+                        ts=now_ts(),
+                        note=note,
+                        deleted=False
+                    )
+                    # журнал + индексы; кэш прогнозов сбрасывается только для cat.id
+                    ledger.add(t)
+
+                    st.success("✅ Transaction added and saved successfully!")
+                    with st.expander("📜 View last transaction"):
+                        st.json(asdict(t))
+
+            # --- Просмотр и удаление ---
+            st.divider()
+            st.subheader("💼 Your Transactions")
+
+            from core.paging import KeysetIndex
+
+            # выборка: у админа — весь леджер, у остальных — свои неудалённые;
+            # в списке выбора — только одна страница (поиск — по индексу заметок)
+            picker = ledger.keyset(user, own=True)
+            search = st.text_input("🔎 Поиск по заметке", key="picker_search")
+            if search.strip():
+                found = ledger.notes.rows(ledger.transactions, search, prefix=True,
+                                          include_deleted=user.role == "admin")
+                if user.role != "admin":
+                    found = [t for t in found if t.user_id == user.username]
+                picker = KeysetIndex(found)
+            if st.session_state.get("picker_query") != search:
+                # новый запрос — с первой страницы
+                st.session_state.picker_query = search
+                st.session_state.pop("picker_cursor", None)
+
+            if len(picker):
+                page = paged("picker_cursor", picker, size=20)
+                selected = st.selectbox(
+                    "Выберите транзакцию для просмотра/удаления:",
+                    page.items,
+                    format_func=lambda t: f"{t.note or '(без заметки)'} — {t.amount} ({t.ts})"
+                )
+                with st.expander("📄 Детали транзакции", expanded=True):
+                    st.markdown(f"""
+                        **ID:** {selected.id}  
+                        **Account:** {selected.account_id}  
+                        **User:** {selected.user_id}  
+                        **Category:** {selected.cat_id}  
+                        **Amount:** {selected.amount}  
+                        **Timestamp:** {selected.ts}  
+                        **Note:** {selected.note}  
+                        **Deleted:** {"Yes" if selected.deleted else "No"}  
+                        """)
+
+                if not selected.deleted:
+                    if st.button("🗑️ Удалить транзакцию"):
+                        ledger.delete(selected.id)
+
+                        st.warning("🚫 Transaction marked as deleted (visible only to admin).")
+                else:
+                    st.info("⚠️ Эта транзакция уже помечена как удалённая.")
+
+            elif search.strip():
+                st.info("Ничего не найдено.")
+            else:
+                st.info("У вас пока нет транзакций.")
     
-        # ----------------- Pipelines (Лаба 2+3) — улучшенный -----------------
-    elif choice == "Pipelines":
-        import matplotlib.pyplot as plt
-        from datetime import datetime
-
-        st.header("🔄 Data Filters & Recursive Reports")
-        st.markdown("Примените фильтры для анализа транзакций и создайте рекурсивный отчёт по категориям.")
-
-        # --- Панель фильтров ---
-        with st.expander("🔍 Фильтры", expanded=True):
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                sel_cat = st.selectbox(
-                    "📂 Категория (опционально)",
-                    [None] + [c for c in categories],
-                    format_func=lambda c: c.name if c else "— Все категории —"
+            # ----------------- Pipelines (Лаба 2+3) — улучшенный -----------------
+        elif choice == "Pipelines":
+            import matplotlib.pyplot as plt
+            from datetime import datetime, timezone
+            from core.lazy import Query
+            from core.recursion import (flatten_categories, sum_expenses_recursive,
+                                        by_category, by_day_range, by_amount_range,
+                                        by_note)
+            from core.tree import category_tree
+
+            st.header("🔄 Data Filters & Recursive Reports")
+            st.markdown("Примените фильтры для анализа транзакций и создайте рекурсивный отчёт по категориям.")
+
+            # --- Панель фильтров ---
+            with st.expander("🔍 Фильтры", expanded=True):
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    sel_cat = st.selectbox(
+                        "📂 Категория (опционально)",
+                        [None] + [c for c in categories],
+                        format_func=lambda c: c.name if c else "— Все категории —"
+                    )
+                with col2:
+                    sel_from = st.date_input("📅 С (начало периода)", value=None)
+                with col3:
+                    sel_to = st.date_input("📅 По (конец периода)", value=None)
+
+                min_amt = st.number_input("💰 Мин. сумма", value=-1000000, step=100)
+                max_amt = st.number_input("💰 Макс. сумма", value=1000000, step=100)
+
+                col_note, col_prefix = st.columns([3, 1])
+                with col_note:
+                    note_text = st.text_input("📝 Поиск по заметкам",
+                                              placeholder="например: кофе такси")
+                with col_prefix:
+                    note_prefix = st.checkbox("По началу слова", value=True)
+
+                # Кнопка фильтрации
+                apply_filter = st.button("Применить фильтры")
+
+            # --- Построение фильтров ---
+            # Ленивый запрос: предикаты проверяются за один проход, диапазон дат
+            # уходит в timeline (bisect + срез), поиск по заметкам — в индекс
+            # ledger.notes; таблица берёт только первые 50.
+            query = Query.over(ledger).where(is_visible)
+            use_dates = apply_filter and sel_from and sel_to
+
+            if apply_filter:
+                # По категории
+                if sel_cat:
+                    query = query.where(by_category(sel_cat.id))
+
+                # По заметке (до дат: сужение через индекс слов обычно сильнее)
+                if note_text.strip():
+                    query = query.where(by_note(note_text, prefix=note_prefix))
+
+                # По диапазону дат (календарные даты, как записаны в ts)
+                if use_dates:
+                    query = query.where(by_day_range(sel_from, sel_to))
+
+                # По сумме
+                query = query.where(by_amount_range(min_amt, max_amt))
+
+            found = query.count()
+
+            # --- Результаты фильтра ---
+            st.divider()
+            st.subheader("📋 Результаты фильтрации")
+
+            st.info(f"Найдено транзакций: **{found}**")
+
+            if found:
+                st.dataframe(
+                    query.limit(50).select(lambda t: {
+                        "ID": t.id,
+                        "Account": t.account_id,
+                        "Category": t.cat_id,
+                        "Amount": t.amount,
+                        "Date": t.ts,
+                        "Note": t.note,
+                    }).to_list(),
+                    use_container_width=True
                 )
-            with col2:
-                sel_from = st.date_input("📅 С (начало периода)", value=None)
-            with col3:
-                sel_to = st.date_input("📅 По (конец периода)", value=None)
-
-            min_amt = st.number_input("💰 Мин. сумма", value=-1000000, step=100)
-            max_amt = st.number_input("💰 Макс. сумма", value=1000000, step=100)
-
-            # Кнопка фильтрации
-            apply_filter = st.button("Применить фильтры")
-
-        # --- Построение фильтров ---
-        def parse_ts(ts: str):
-            """Безопасное преобразование строки времени."""
-            try:
-                return datetime.fromisoformat(ts)
-            except Exception:
-                try:
-                    return datetime.strptime(ts.split(".")[0], "%Y-%m-%dT%H:%M:%S")
-                except Exception:
-                    return None
-
-        filtered = visible_transactions
-
-        if apply_filter:
-            # По категории
-            if sel_cat:
-                filtered = [t for t in filtered if getattr(t, "cat_id", None) == sel_cat.id]
 
-            # По диапазону дат
-            if sel_from and sel_to:
-                filtered = [
-                    t for t in filtered
-                    if (dt := parse_ts(getattr(t, "ts", "")))
-                    and sel_from <= dt.date() <= sel_to
-                ]
+                # --- Мини-график сумм по датам ---
+                try:
+                    # точки графика: те же предикаты по строкам timeline
+                    # (ts уже разобран)
+                    span = (sel_from, sel_to) if use_dates else (None, None)
+                    rows = [(e, t) for e, t in ledger.timeline.rows(*span)
+                            if query.matches(t)]
+                    dates = [datetime.fromtimestamp(e, tz=timezone.utc)
+                             .replace(tzinfo=None) for e, _ in rows]
+                    amounts = [t.amount for _, t in rows]
+                    if dates:
+                        st.subheader("📈 Динамика транзакций")
+                        fig, ax = plt.subplots()
+                        ax.plot(dates, amounts, marker="o", linestyle="-")
+                        ax.set_xlabel("Дата")
+                        ax.set_ylabel("Сумма")
+                        ax.set_title("График фильтрованных транзакций")
+                        ax.grid(True)
+                        plt.xticks(rotation=30)
+                        st.pyplot(fig)
+                except Exception as e:
+                    st.warning(f"⚠ Ошибка при построении графика: {e}")
 
-            # По сумме
-            filtered = [t for t in filtered if min_amt <= t.amount <= max_amt]
+            else:
+                st.warning("Транзакции не найдены по заданным условиям.")
 
-        # --- Результаты фильтра ---
-        st.divider()
-        st.subheader("📋 Результаты фильтрации")
+            # --- Рекурсивный отчёт ---
+            st.divider()
+            st.subheader("🧮 Recursive Report by Category")
 
-        st.info(f"Найдено транзакций: **{len(filtered)}**")
+            root_cat = st.selectbox(
+                "Выберите корневую категорию",
+                categories,
+                format_func=lambda c: f"{c.name} ({c.id})"
+            )
 
-        if filtered:
-            st.dataframe(
-                [
+            if st.button("Сгенерировать отчёт"):
+                try:
+                    flat_cats = flatten_categories(tuple(categories), root_cat.id)
+                    total = sum_expenses_recursive(flat_cats, visible_transactions, root_cat.id)
+                    st.success(f"💵 Total expenses recursively under **{root_cat.name}**: {total}")
+
+                    st.json([asdict(c) for c in flat_cats], expanded=False)
+                except Exception as e:
+                    st.error(f"Ошибка при рекурсивном отчёте: {e}")
+
+            # Всё дерево сразу: суммы по поддеревьям за один проход
+            with st.expander("🌳 Всё дерево категорий"):
+                tree = category_tree(tuple(categories))
+                tree_accounts = None if user.role == "admin" else visible_account_ids
+                rolled = ledger.cube.rollup(tree, accounts=tree_accounts)
+                st.table([
                     {
-                        "ID": t.id,
-                        "Account": t.account_id,
-                        "Category": t.cat_id,
-                        "Amount": t.amount,
-                        "Date": t.ts,
-                        "Note": t.note,
+                        "Категория": "\u00a0\u00a0" * tree.depth[c.id] + c.name,
+                        "ID": c.id,
+                        "Расходы (с подкатегориями)": rolled[c.id],
                     }
-                    for t in filtered[:50]
-                ],
-                use_container_width=True
-            )
+                    for c in tree.order
+                ])
+
+            # ----------------- Reports (Лаба 3+4) — улучшенный -----------------
+        elif choice == "Reports":
+            from collections import OrderedDict
+            import matplotlib.pyplot as plt
+            from core.forecast import forecast_table
+            from core.tree import category_tree
+
+            st.header("📈 Reports & Forecast")
+            st.markdown(
+                "Анализ и прогноз расходов по выбранной категории (по месяцам).")
+
+            # --- Список категорий: можно ограничить категориями расходов ---
+            # Покажем сначала только expense категории (чтобы прогноз был про расходы),
+            # но оставим опцию показать всё.
+            show_all = st.checkbox(
+                "Показывать все категории (включая доходы)", value=False)
+            if show_all:
+                cat_list = categories
+            else:
+                cat_list = [c for c in categories if getattr(c, "type", "").lower() != "income"]
 
-            # --- Мини-график сумм по датам ---
-            try:
-                dates = [parse_ts(t.ts) for t in filtered if parse_ts(t.ts)]
-                amounts = [t.amount for t in filtered if parse_ts(t.ts)]
-                if dates:
-                    st.subheader("📈 Динамика транзакций")
-                    fig, ax = plt.subplots()
-                    ax.plot(dates, amounts, marker="o", linestyle="-")
-                    ax.set_xlabel("Дата")
-                    ax.set_ylabel("Сумма")
-                    ax.set_title("График фильтрованных транзакций")
-                    ax.grid(True)
-                    plt.xticks(rotation=30)
-                    st.pyplot(fig)
-            except Exception as e:
-                st.warning(f"⚠ Ошибка при построении графика: {e}")
+            # Выбор категории (показываем человекочитаемые имена)
+            cat = st.selectbox("Выберите категорию для отчёта", cat_list, format_func=lambda c: f"{c.name} ({c.id})")
 
-        else:
-            st.warning("Транзакции не найдены по заданным условиям.")
-
-        # --- Рекурсивный отчёт ---
-        st.divider()
-        st.subheader("🧮 Recursive Report by Category")
-
-        root_cat = st.selectbox(
-            "Выберите корневую категорию",
-            categories,
-            format_func=lambda c: f"{c.name} ({c.id})"
-        )
-
-        if st.button("Сгенерировать отчёт"):
-            try:
-                flat_cats = flatten_categories(tuple(categories), root_cat.id)
-                total = sum_expenses_recursive(flat_cats, visible_transactions, root_cat.id)
-                st.success(f"💵 Total expenses recursively under **{root_cat.name}**: {total}")
-
-                st.json([c.__dict__ for c in flat_cats], expanded=False)
-            except Exception as e:
-                st.error(f"Ошибка при рекурсивном отчёте: {e}")
-
-        # ----------------- Reports (Лаба 3+4) — улучшенный -----------------
-    elif choice == "Reports":
-        import calendar
-        from datetime import datetime
-        from collections import defaultdict, OrderedDict
-        import matplotlib.pyplot as plt
-
-        st.header("📈 Reports & Forecast")
-        st.markdown("Анализ и прогноз расходов по выбранной категории (по месяцам).")
-
-        # --- Список категорий: можно ограничить категориями расходов ---
-        # Покажем сначала только expense категории (чтобы прогноз был про расходы),
-        # но оставим опцию показать всё.
-        show_all = st.checkbox("Показывать все категории (включая доходы)", value=False)
-        if show_all:
-            cat_list = categories
-        else:
-            cat_list = [c for c in categories if getattr(c, "type", "").lower() != "income"]
+            with_children = st.checkbox("Учитывать подкатегории", value=False)
 
-        # Выбор категории (показываем человекочитаемые имена)
-        cat = st.selectbox("Выберите категорию для отчёта", cat_list, format_func=lambda c: f"{c.name} ({c.id})")
+            # период в месяцах для прогноза/анализа
+            period = st.slider("Период для прогноза (месяцев, сколько последних месяцев учитывать)", 1, 24, 6)
 
-        # период в месяцах для прогноза/анализа
-        period = st.slider("Период для прогноза (месяцев, сколько последних месяцев учитывать)", 1, 24, 6)
+            # --- Собираем ежемесячные суммы для выбранной категории ---
+            # ключ: (год, месяц) -> сумма; срез куба леджера (обновляется по событиям)
+            view_accounts = None if user.role == "admin" else visible_account_ids
+            cube = ledger.cube
+            tree = category_tree(tuple(categories)) if with_children else None
+            # прогноз и таблица — по тем же категориям, что и график
+            if tree is not None:
+                report_cats = [c.id for c in tree.flatten(cat.id)]
+            else:
+                report_cats = [cat.id]
+            monthly = cube.monthly(cat.id, tree=tree, accounts=view_accounts)
 
-        # --- Собираем ежемесячные суммы для выбранной категории ---
-        def parse_ts(ts):
-            try:
-                return datetime.fromisoformat(ts)
-            except Exception:
-                # если формат другой — пробуем обрезать или вернуть None
+            # Если нет данных — показываем подсказку
+            if not monthly:
+                st.info("Нет транзакций по выбранной категории в видимой выборке.")
+            else:
+                # Сортируем месяца по времени
+                sorted_keys = sorted(monthly.keys())
+                # Превращаем в OrderedDict для стабильности отображения
+                monthly_ordered = OrderedDict((k, monthly[k]) for k in sorted_keys)
+
+                # Возьмём последние N месяцев (period)
+                last_keys = sorted_keys[-period:]
+                labels = [f"{k[0]}-{k[1]:02d}" for k in last_keys]
+                values = [monthly[k] for k in last_keys]
+
+                # Простая статистика (однопроходные ядра из core.aggregate)
+                stats = aggregate.summarize(values)
+                total = stats["sum"]
+                avg = stats["mean"]
+                median = sorted(values)[len(values)//2] if values else 0
+
+                # Получим прогноз из cached-функции (твоя функция)
                 try:
-                    return datetime.strptime(ts.split(".")[0], "%Y-%m-%dT%H:%M:%S")
-                except Exception:
-                    return None
-
-        monthly = defaultdict(int)  # ключ: (год, месяц) -> сумма
-        for t in visible_transactions:
-            try:
-                if getattr(t, "cat_id", None) != cat.id:
-                    continue
-                dt = parse_ts(getattr(t, "ts", ""))
-                if not dt:
-                    continue
-                key = (dt.year, dt.month)
-                monthly[key] += t.amount
-            except Exception:
-                continue
-
-        # Если нет данных — показываем подсказку
-        if not monthly:
-            st.info("Нет транзакций по выбранной категории в видимой выборке.")
-        else:
-            # Сортируем месяца по времени
-            sorted_keys = sorted(monthly.keys())
-            # Превращаем в OrderedDict для стабильности отображения
-            monthly_ordered = OrderedDict((k, monthly[k]) for k in sorted_keys)
-
-            # Возьмём последние N месяцев (period)
-            last_keys = sorted_keys[-period:]
-            labels = [f"{k[0]}-{k[1]:02d}" for k in last_keys]
-            values = [monthly[k] for k in last_keys]
-
-            # Простая статистика
-            total = sum(values)
-            avg = total / len(values) if values else 0
-            median = sorted(values)[len(values)//2] if values else 0
-
-            # Получим прогноз из cached-функции (твоя функция)
-            try:
-                forecast_val, ms = forecast_expenses_timed(cat.id, visible_transactions, period)
-            except Exception as e:
-                forecast_val, ms = None, None
-
-            # Отображение ключевых метрик
-            col1, col2, col3 = st.columns(3)
-            col1.metric("Период (месяцев)", f"{len(values)}")
-            col2.metric("Сумма за выбранный период", f"{total}")
-            col3.metric("Среднее / мес", f"{avg:.2f}")
-
-            if forecast_val is not None:
-                st.info(f"Прогноз (cached) для следующего периода: {forecast_val} (вычислено за {ms:.3f} ms)")
-
-            # Таблица с месяцами
-            st.subheader("Детали по месяцам")
-            rows = [{"month": labels[i], "amount": values[i]} for i in range(len(labels))]
-            st.table(rows)
-
-            # --- График (matplotlib) ---
-            st.subheader("График по месяцам")
-            fig, ax = plt.subplots()
-            ax.plot(labels, values, marker="o")  # не указываем цвета
-            ax.set_title(f"Monthly sums — {cat.name}")
-            ax.set_xlabel("Month")
-            ax.set_ylabel("Amount")
-            ax.grid(True)
-            plt.xticks(rotation=30)
-            st.pyplot(fig)
-
-            # --- Простейший тренд / прогноз на основе среднего ---
-            st.subheader("Простой прогноз (на основе среднего)")
-            next_period_estimate = avg
-            st.write(f"Оценка на следующий месяц (по среднему): **{next_period_estimate:.2f}**")
-
-            # Кнопка экспортировать CSV (последние N месяцев)
-            if st.button("Экспортировать данные (CSV)"):
-                import io, csv
-                buffer = io.StringIO()
-                writer = csv.writer(buffer)
-                writer.writerow(["month", "amount"])
-                for r in rows:
-                    writer.writerow([r["month"], r["amount"]])
-                st.download_button("Скачать CSV", data=buffer.getvalue(), file_name=f"report_{cat.id}.csv", mime="text/csv")
-
-        st.caption("Подсказка: если хотите прогнозы по доходам — отметьте 'Показывать все категории'.")
+                    t0 = time.perf_counter()
+                    forecast_val = ledger.forecasts.forecast_many(report_cats, period,
+                                                                  view_accounts)
+                    ms = (time.perf_counter() - t0) * 1000.0
+                except Exception as e:
+                    forecast_val, ms = None, None
+
+                # Отображение ключевых метрик
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Период (месяцев)", f"{len(values)}")
+                col2.metric("Сумма за выбранный период", f"{total}")
+                col3.metric("Среднее / мес", f"{avg:.2f}")
+
+                if forecast_val is not None:
+                    st.info(f"Прогноз (cached) для следующего периода: {forecast_val} (вычислено за {ms:.3f} ms)")
+
+                # Таблица с месяцами
+                st.subheader("Детали по месяцам")
+                rows = [{"month": labels[i], "amount": values[i]} for i in range(len(labels))]
+                st.table(rows)
+
+                # --- График (matplotlib) ---
+                st.subheader("График по месяцам")
+                fig, ax = plt.subplots()
+                ax.plot(labels, values, marker="o")  # не указываем цвета
+                ax.set_title(f"Monthly sums — {cat.name}")
+                ax.set_xlabel("Month")
+                ax.set_ylabel("Amount")
+                ax.grid(True)
+                plt.xticks(rotation=30)
+                st.pyplot(fig)
+
+                # --- Прогноз по моделям (календарные месяцы, пустые = 0) ---
+                st.subheader("Прогноз на следующий месяц")
+                window = min(period, 12)
+                model_rows = forecast_table(cube, [cat.id], view_accounts,
+                                            window=window, last=period + window,
+                                            tree=tree)
+                if model_rows:
+                    r = model_rows[0]
+                    m1, m2, m3 = st.columns(3)
+                    m1.metric("Скользящее среднее", f"{r['ma']:.2f}",
+                              help=f"MAE {r['ma_mae']}")
+                    m2.metric("Эксп. сглаживание", f"{r['ses']:.2f}",
+                              help=f"MAE {r['ses_mae']}")
+                    m3.metric("Линейный тренд", f"{r['trend']:.2f}",
+                              help=f"MAE {r['trend_mae']}")
+                    st.caption(f"Лучшая модель по MAE на истории: {r['best']}")
+
+                # Кнопка экспортировать CSV (последние N месяцев)
+                if st.button("Экспортировать данные (CSV)"):
+                    import io, csv
+                    buffer = io.StringIO()
+                    writer = csv.writer(buffer)
+                    writer.writerow(["month", "amount"])
+                    for r in rows:
+                        writer.writerow([r["month"], r["amount"]])
+                    st.download_button("Скачать CSV", data=buffer.getvalue(), file_name=f"report_{cat.id}.csv", mime="text/csv")
+
+            # Все категории сразу: одна матрица категория × месяц, модели векторно
+            with st.expander("📊 Прогноз по всем категориям"):
+                all_rows = forecast_table(ledger.cube, [c.id for c in cat_list],
+                                          view_accounts, window=min(period, 12))
+                st.dataframe(all_rows)
+
+            st.caption("Подсказка: если хотите прогнозы по доходам — отметьте 'Показывать все категории'.")
+
+        # ----------------- Diagnostics -----------------
+        elif choice == "Diagnostics":
+            st.header("🩺 Diagnostics")
+            # сбор метрик включается на весь процесс (все сессии)
+            instrument.enable(
+                st.checkbox("Собирать метрики", value=instrument.enabled()))
+            kind = st.selectbox("Профилировать следующую перерисовку страницы",
+                                ["—", "cprofile", "tracemalloc"])
+            st.session_state.profile_kind = None if kind == "—" else kind
+
+            metrics = instrument.snapshot()
+            if metrics:
+                st.dataframe([{"name": name, **m} for name, m in metrics.items()])
+            else:
+                st.info("Метрик пока нет: включите сбор и откройте другие страницы.")
+            # кэш прогнозов леджера — тот, что работает на странице Reports
+            fc = ledger.forecasts.stats()
+            st.subheader("Кэш прогнозов (ledger.forecasts)")
+            f1, f2, f3 = st.columns(3)
+            f1.metric("Попадания", fc["hits"])
+            f2.metric("Промахи", fc["misses"])
+            f3.metric("Hit rate", f"{fc['hit_rate']:.0%}")
+
+            c1, c2 = st.columns(2)
+            c1.download_button("Экспорт JSON", instrument.export_json(),
+                               file_name="diagnostics.json", mime="application/json")
+            if c2.button("Сбросить метрики"):
+                instrument.reset()
+
+            last = st.session_state.get("last_profile")
+            if last:
+                st.subheader(f"Профиль: {last['page']} ({last['kind']})")
+                st.code(last["report"])
+
+    finally:
+        # и при исключении, и при st.stop(): замер пишется, профиль останавливается
+        instrument.record(f"page:{choice}", time.perf_counter() - page_started)
+        if page_profile is not None:
+            st.session_state.profile_kind = None
+            st.session_state.last_profile = {
+                "page": choice, "kind": profile_kind, "report": page_profile.stop()}
 
@@ -0,0 +1,205 @@
+"""Core and app-path benchmarks on synthetic ledgers, recorded as JSON.
+
+    python -m benchmarks.bench_core --sizes 10000,100000 --out bench.json
+    python -m benchmarks.bench_core --sizes 10000 --compare bench.json
+
+--compare exits with status 1 when a case got slower than --threshold times
+the baseline median.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+from benchmarks.synth import write_seed
+from core.transforms import load_seed, account_balance
+from core.recursion import (flatten_categories, sum_expenses_recursive, by_category,
+                            by_date_range, by_amount_range)
+from core.memo import forecast_expenses
+from core.frp import ForecastView, MonthlyCategoryView
+from core.ftypes import check_budget
+from core.tree import CategoryTree, category_tree
+from core.lazy import Query
+from core.report import ReportCube
+from core.forecast import forecast_table
+from core.service import Ledger
+
+DATA_DIR = os.path.join(tempfile.gettempdir(), "financial_manager_bench")
+
+
+class Context:
+    # данные одного размера: файл seed, загруженные кортежи и леджер
+    def __init__(self, n: int, data_dir: str, seed: int = 42):
+        self.n = n
+        os.makedirs(data_dir, exist_ok=True)
+        self.path = os.path.join(data_dir, f"synth_{n}_{seed}.json")
+        if not os.path.exists(self.path):
+            write_seed(self.path, n, seed=seed)
+        self.accounts, self.cats, self.trans, self.budgets = load_seed(self.path)
+        self._ledger: Optional[Ledger] = None
+
+    @property
+    def ledger(self) -> Ledger:
+        if self._ledger is None:
+            journal = self.path + ".journal.jsonl"
+            if os.path.exists(journal):
+                os.remove(journal)
+            self._ledger = Ledger(self.path, journal)
+        return self._ledger
+
+
+def _forecast_cold(ctx: Context) -> Callable:
+    # без кэша: представление строится заново, как при первом вызове
+    return lambda: ForecastView(MonthlyCategoryView(ctx.trans)).forecast("c0_0", 6)
+
+
+def _sum_recursive(ctx: Context) -> Callable:
+    # плоский список категорий строится один раз, до замера
+    flat = flatten_categories(ctx.cats, "c0")
+    return lambda: sum_expenses_recursive(flat, ctx.trans, "c0")
+
+
+# (имя, фабрика: Context -> функция без аргументов)
+CASES: List[Tuple[str, Callable[[Context], Callable]]] = [
+    ("load_seed", lambda ctx: lambda: load_seed(ctx.path)),
+    ("account_balance",
+     lambda ctx: lambda: account_balance(ctx.trans, ctx.accounts[0].id)),
+    ("category_tree_build", lambda ctx: lambda: CategoryTree(ctx.cats)),
+    ("flatten_categories", lambda ctx: lambda: flatten_categories(ctx.cats, "c0")),
+    ("sum_expenses_recursive", _sum_recursive),
+    ("forecast_expenses_cold", _forecast_cold),
+    ("forecast_expenses_warm",
+     lambda ctx: lambda: forecast_expenses("c0_0", ctx.trans, 6)),
+    ("check_budget", lambda ctx: lambda: check_budget(ctx.budgets[0], ctx.trans)),
+    ("ledger_startup",
+     lambda ctx: lambda: Ledger(ctx.path, ctx.path + ".journal.jsonl")),
+    ("app_filter_count", lambda ctx: lambda: Query.over(ctx.ledger)
+        .where(by_date_range("2024-01-01T00:00:00", "2024-06-30T23:59:59"))
+        .where(by_category("c1_2"))
+        .where(by_amount_range(-5000, -100)).count()),
+    ("app_filter_page", lambda ctx: lambda: Query.over(ctx.ledger)
+        .where(by_category("c2")).limit(50).to_list()),
+    ("app_report_cube", lambda ctx: lambda: ReportCube(ctx.ledger.transactions)),
+    ("app_report_slice", lambda ctx: lambda: ctx.ledger.cube.monthly(
+        "c0", tree=category_tree(ctx.cats), last=6)),
+    ("app_forecast_table", lambda ctx: lambda: forecast_table(ctx.ledger.cube)),
+    ("app_budget_status", lambda ctx: lambda: ctx.ledger.budget_status()),
+]
+
+
+def measure(fn: Callable, repeat: int = 5, min_time: float = 0.02) -> Dict[str, float]:
+    # подбираем число вызовов на замер так, чтобы замер длился >= min_time
+    number = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        dt = time.perf_counter() - t0
+        if dt >= min_time or number >= 1 << 16:
+            break
+        number *= 2
+    samples = [dt / number]
+    for _ in range(repeat - 1):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - t0) / number)
+    return {
+        "median_ms": statistics.median(samples) * 1000.0,
+        "min_ms": min(samples) * 1000.0,
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def _meta() -> dict:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                             capture_output=True, text=True,
+                             timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        rev = None
+    try:
+        import numpy
+        np_version = numpy.__version__
+    except ImportError:
+        np_version = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git": rev,
+        "python": platform.python_version(),
+        "numpy": np_version,
+        "platform": platform.platform(),
+    }
+
+
+def run(sizes: List[int], data_dir: str, only: Optional[List[str]] = None,
+        repeat: int = 5) -> dict:
+    out = {"meta": _meta(), "sizes": {}}
+    for n in sizes:
+        ctx = Context(n, data_dir)
+        res = {}
+        for name, factory in CASES:
+            if only and name not in only:
+                continue
+            res[name] = measure(factory(ctx), repeat)
+            print(f"{n:>10}  {name:<26} {res[name]['median_ms']:10.3f} ms",
+                  file=sys.stderr)
+        out["sizes"][str(n)] = res
+    return out
+
+
+def compare(current: dict, baseline: dict, threshold: float = 1.25) -> List[dict]:
+    # случаи, ставшие медленнее порога
+    slower = []
+    for n, cases in current["sizes"].items():
+        for name, r in cases.items():
+            base = baseline.get("sizes", {}).get(n, {}).get(name)
+            if base and base["median_ms"] > 0:
+                ratio = r["median_ms"] / base["median_ms"]
+                if ratio > threshold:
+                    slower.append({"size": n, "case": name, "ratio": round(ratio, 2),
+                                   "median_ms": r["median_ms"],
+                                   "baseline_ms": base["median_ms"]})
+    return slower
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m benchmarks.bench_core")
+    p.add_argument("--sizes", default="10000,100000")
+    p.add_argument("--only", default="")
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--data-dir", default=DATA_DIR)
+    p.add_argument("--out", default="")
+    p.add_argument("--compare", default="")
+    p.add_argument("--threshold", type=float, default=1.25)
+    a = p.parse_args(argv)
+
+    sizes = [int(s) for s in a.sizes.split(",") if s]
+    only = [s for s in a.only.split(",") if s] or None
+    result = run(sizes, a.data_dir, only, a.repeat)
+    text = json.dumps(result, indent=2)
+    if a.out:
+        with open(a.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if a.compare:
+        with open(a.compare, encoding="utf-8") as f:
+            slower = compare(result, json.load(f), a.threshold)
+        for s in slower:
+            print(f"REGRESSION {s['size']} {s['case']}: x{s['ratio']} "
+                  f"({s['baseline_ms']:.3f} -> {s['median_ms']:.3f} ms)",
+                  file=sys.stderr)
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""Bytes per transaction: plain dataclass vs slotted + interned ids.
+
+    python -m benchmarks.bench_memory [N]
+"""
+import gc
+import json
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from core.domain import Transaction
+from core.transforms import interned
+
+
+@dataclass(frozen=True)
+class DictTransaction:
+    # прежний вариант модели: frozen, но с __dict__ у каждого экземпляра
+    id: str
+    account_id: str
+    user_id: str
+    cat_id: str
+    amount: int
+    ts: str
+    note: str
+    deleted: bool = False
+
+
+def _rows_json(n: int) -> str:
+    rows = [
+        {
+            "id": f"t{i:07d}",
+            "account_id": f"acc{i % 50}",
+            "user_id": f"user{i % 20}",
+            "cat_id": f"cat{i % 40}",
+            "amount": -(i % 10000),
+            "ts": f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}T12:00:00",
+            "note": "",
+        }
+        for i in range(n)
+    ]
+    return json.dumps(rows)
+
+
+def measure(build, text: str) -> int:
+    # удерживаемая память после разбора JSON и сборки объектов
+    gc.collect()
+    tracemalloc.start()
+    rows = json.loads(text)
+    objs = build(rows)
+    del rows
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objs
+    return current
+
+
+def run(n: int = 200_000) -> dict:
+    text = _rows_json(n)
+    legacy = measure(lambda rows: tuple(DictTransaction(**r) for r in rows), text)
+    compact = measure(lambda rows: tuple(interned(Transaction, r) for r in rows), text)
+    return {
+        "n": n,
+        "legacy_bytes_per_tx": legacy / n,
+        "slots_interned_bytes_per_tx": compact / n,
+        "saving": 1 - compact / legacy,
+    }
+
+
+if __name__ == "__main__":
+    res = run(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
+    print(json.dumps(res, indent=2))
@@ -0,0 +1,23 @@
+"""The same cases under pytest-benchmark (optional dependency).
+
+    BENCH_N=100000 python -m pytest benchmarks/bench_pytest.py --benchmark-json=out.json
+"""
+import os
+import tempfile
+import pytest
+from benchmarks.bench_core import CASES, Context
+
+pytest.importorskip("pytest_benchmark")
+
+N = int(os.environ.get("BENCH_N", "10000"))
+
+
+@pytest.fixture(scope="module")
+def ctx():
+    return Context(N, os.path.join(tempfile.gettempdir(), "financial_manager_bench"))
+
+
+@pytest.mark.parametrize("name,factory", CASES, ids=[name for name, _ in CASES])
+def test_bench(benchmark, ctx, name, factory):
+    benchmark.group = f"n={N}"
+    benchmark(factory(ctx))
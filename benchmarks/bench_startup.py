@@ -0,0 +1,147 @@
+"""Cold-start benchmark: import times and first loads, each in a fresh interpreter.
+
+    python -m benchmarks.bench_startup --out startup.json
+    python -m benchmarks.bench_startup --compare startup.json
+
+The "login" case imports what app/main.py needs before the login form and
+fails if it pulls in a heavy module (NumPy, matplotlib, core.service).
+--compare exits with status 1 when a case got slower than --threshold times
+the baseline median.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Optional, Tuple
+from benchmarks.bench_core import DATA_DIR, _meta, compare
+from benchmarks.synth import write_seed
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# модули, которых не должно быть в процессе до входа пользователя
+HEAVY = ("numpy", "matplotlib", "pandas",
+         "core.service", "core.report", "core.forecast")
+
+_CHILD = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+{stmt}
+dt = time.perf_counter() - t0
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"ms": dt * 1000.0, "heavy": heavy}}))
+"""
+
+# (имя, код, запрещены ли тяжёлые модули); {seed} — путь к seed.json
+CASES: List[Tuple[str, str, bool]] = [
+    ("login", "import core.transforms, core.domain, core.aggregate, core.instrument, "
+              "core.startup", True),
+    ("load_users", "from core.transforms import load_users; load_users({seed!r})",
+     False),
+    ("login_users", "from core import startup; startup.users({seed!r})", False),
+    ("import_data_layer", "import core.service", False),
+    ("import_reports", "import core.report, core.forecast, core.tree", False),
+    ("import_matplotlib", "import matplotlib.pyplot", False),
+    ("ledger_cold", "from core.service import get_ledger; get_ledger({seed!r})", False),
+    ("ledger_background", "from core import startup; startup.preload({seed!r}); "
+                          "startup.ledger({seed!r})", False),
+]
+
+
+def cold(stmt: str) -> dict:
+    # один запуск в новом интерпретаторе; время — без старта самого Python
+    code = _CHILD.format(root=ROOT, stmt=stmt, heavy=HEAVY)
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                          cwd=ROOT)
+    if proc.returncode != 0:
+        err = proc.stderr.strip()
+        raise RuntimeError(err.splitlines()[-1] if err else "failed")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _seed_copy(n: int, data_dir: str) -> str:
+    # свой каталог на каждый прогон: журнал и снапшот не переживают замер
+    src = os.path.join(data_dir, f"synth_{n}_42.json")
+    if not os.path.exists(src):
+        os.makedirs(data_dir, exist_ok=True)
+        write_seed(src, n, seed=42)
+    work = tempfile.mkdtemp(prefix="fm_startup_")
+    dst = os.path.join(work, "seed.json")
+    shutil.copy(src, dst)
+    return dst
+
+
+def run(n: int, data_dir: str, only: Optional[List[str]] = None,
+        repeat: int = 5) -> dict:
+    res: Dict[str, dict] = {}
+    failures = []
+    for name, stmt, light in CASES:
+        if only and name not in only:
+            continue
+        samples, heavy = [], []
+        try:
+            for _ in range(repeat):
+                seed = _seed_copy(n, data_dir)
+                try:
+                    r = cold(stmt.format(seed=seed))
+                finally:
+                    shutil.rmtree(os.path.dirname(seed), ignore_errors=True)
+                samples.append(r["ms"])
+                heavy = r["heavy"]
+        except RuntimeError as e:
+            # например, matplotlib не установлен
+            print(f"{name:<20} skipped: {e}", file=sys.stderr)
+            continue
+        res[name] = {
+            "median_ms": statistics.median(samples),
+            "min_ms": min(samples),
+            "repeat": repeat,
+            "heavy": heavy,
+        }
+        if light and heavy:
+            failures.append(f"{name} imports {', '.join(heavy)}")
+        print(f"{name:<20} {res[name]['median_ms']:10.3f} ms  {' '.join(heavy)}",
+              file=sys.stderr)
+    return {"meta": _meta(), "sizes": {str(n): res}, "failures": failures}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m benchmarks.bench_startup")
+    p.add_argument("--size", type=int, default=10000)
+    p.add_argument("--only", default="")
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--data-dir", default=DATA_DIR)
+    p.add_argument("--out", default="")
+    p.add_argument("--compare", default="")
+    p.add_argument("--threshold", type=float, default=1.25)
+    a = p.parse_args(argv)
+
+    only = [s for s in a.only.split(",") if s] or None
+    result = run(a.size, a.data_dir, only, a.repeat)
+    text = json.dumps(result, indent=2)
+    if a.out:
+        with open(a.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    status = 0
+    for failure in result["failures"]:
+        print(f"HEAVY IMPORT {failure}", file=sys.stderr)
+        status = 1
+    if a.compare:
+        with open(a.compare, encoding="utf-8") as f:
+            slower = compare(result, json.load(f), a.threshold)
+        for s in slower:
+            print(f"REGRESSION {s['case']}: x{s['ratio']} "
+                  f"({s['baseline_ms']:.3f} -> {s['median_ms']:.3f} ms)",
+                  file=sys.stderr)
+        status = status or (1 if slower else 0)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""Deterministic synthetic ledgers in the seed.json layout.
+
+    python -m benchmarks.synth N OUT.json [--users U] [--accounts A] [--depth D]
+                               [--fanout F] [--months M] [--seed S]
+
+The same arguments always produce the same file. Transactions are written
+as a stream, so 10M rows do not have to fit in memory as Python objects.
+"""
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Tuple
+
+START = datetime(2023, 1, 1)
+NOTES = ("Продукты", "Такси", "Кафе", "Аренда", "Зарплата", "Подарок", "Аптека",
+         "Кино", "Одежда", "Метро", "Супермаркет", "Ремонт", "Интернет", "Бензин")
+
+
+def category_tree(depth: int = 4, fanout: int = 4) -> List[dict]:
+    # корень доходов + fanout корней расходов, у каждого узла fanout детей до depth
+    cats = [{"id": "income", "name": "Доходы", "parent_id": None, "type": "income"}]
+    level = []
+    for i in range(fanout):
+        cid = f"c{i}"
+        cats.append({"id": cid, "name": f"Категория {cid}", "parent_id": None,
+                     "type": "expense"})
+        level.append(cid)
+    for _ in range(depth - 1):
+        nxt = []
+        for parent in level:
+            for i in range(fanout):
+                cid = f"{parent}_{i}"
+                cats.append({"id": cid, "name": f"Категория {cid}", "parent_id": parent,
+                             "type": "expense"})
+                nxt.append(cid)
+        level = nxt
+    return cats
+
+
+def entities(users: int = 100,
+             accounts_per_user: int = 3) -> Tuple[List[dict], List[dict]]:
+    us = [{"username": "admin", "password": "admin", "role": "admin"}]
+    us += [{"username": f"u{i}", "password": f"u{i}", "role": "user"}
+           for i in range(users)]
+    accs = [
+        {"id": f"a{i}_{j}", "name": f"Счёт {j}", "balance": 10000 * (j + 1),
+         "currency": "RUB", "user_id": u["username"]}
+        for i, u in enumerate(us) for j in range(accounts_per_user)
+    ]
+    return us, accs
+
+
+def iter_transactions(n: int, accounts: List[dict], cats: List[dict], months: int = 36,
+                      seed: int = 42) -> Iterator[dict]:
+    rnd = random.Random(seed)
+    expense = [c["id"] for c in cats if c["type"] == "expense"]
+    span = months * 30 * 86400
+    for i in range(n):
+        acc = accounts[rnd.randrange(len(accounts))]
+        income = rnd.random() < 0.08
+        ts = START + timedelta(seconds=span * i // max(1, n) + rnd.randrange(3600))
+        yield {
+            "id": f"t{i:08d}",
+            "account_id": acc["id"],
+            "user_id": acc["user_id"],
+            "cat_id": "income" if income else expense[rnd.randrange(len(expense))],
+            "amount": (rnd.randrange(30000, 200000) if income
+                       else -rnd.randrange(50, 20000)),
+            "ts": ts.isoformat(),
+            "note": NOTES[rnd.randrange(len(NOTES))],
+            "deleted": rnd.random() < 0.01,
+        }
+
+
+def budgets_for(cats: List[dict]) -> List[dict]:
+    tops = [c["id"] for c in cats if c["type"] == "expense" and c["parent_id"] is None]
+    return [{"id": f"b{i}", "cat_id": cid, "limit": 500000, "period": "month"}
+            for i, cid in enumerate(tops)]
+
+
+def generate(n: int, users: int = 100, accounts_per_user: int = 3, depth: int = 4,
+             fanout: int = 4, months: int = 36, seed: int = 42) -> Dict[str, list]:
+    us, accs = entities(users, accounts_per_user)
+    cats = category_tree(depth, fanout)
+    return {
+        "users": us,
+        "accounts": accs,
+        "categories": cats,
+        "transactions": list(iter_transactions(n, accs, cats, months, seed)),
+        "budgets": budgets_for(cats),
+    }
+
+
+def write_seed(path: str, n: int, users: int = 100, accounts_per_user: int = 3,
+               depth: int = 4, fanout: int = 4, months: int = 36,
+               seed: int = 42) -> str:
+    us, accs = entities(users, accounts_per_user)
+    cats = category_tree(depth, fanout)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{\n")
+        sections = (("users", us), ("accounts", accs), ("categories", cats),
+                    ("budgets", budgets_for(cats)))
+        for key, items in sections:
+            f.write(f'"{key}": {json.dumps(items, ensure_ascii=False)},\n')
+        f.write('"transactions": [\n')
+        for i, t in enumerate(iter_transactions(n, accs, cats, months, seed)):
+            f.write((",\n" if i else "") + json.dumps(t, ensure_ascii=False))
+        f.write("\n]\n}\n")
+    return path
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(prog="python -m benchmarks.synth")
+    p.add_argument("n", type=int)
+    p.add_argument("out")
+    p.add_argument("--users", type=int, default=100)
+    p.add_argument("--accounts", type=int, default=3)
+    p.add_argument("--depth", type=int, default=4)
+    p.add_argument("--fanout", type=int, default=4)
+    p.add_argument("--months", type=int, default=36)
+    p.add_argument("--seed", type=int, default=42)
+    a = p.parse_args()
+    print(write_seed(a.out, a.n, a.users, a.accounts, a.depth, a.fanout, a.months,
+                     a.seed))
@@ -0,0 +1,75 @@
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Sequence, Tuple
+from core.domain import Account, Transaction
+
+# ----------------- Ownership index -----------------
+# user -> счета -> позиции транзакций в леджере. Видимая пользователю выборка
+# собирается один раз и отдаётся одним и тем же кортежем, пока add/delete не
+# затронет этого пользователя.
+
+
+class OwnershipIndex:
+    def __init__(self, accounts: Iterable[Account], trans: Sequence[Transaction]):
+        self._accounts: Dict[str, Tuple[Account, ...]] = {}
+        self.owner: Dict[str, str] = {}
+        for a in accounts:
+            self._accounts[a.user_id] = self._accounts.get(a.user_id, ()) + (a,)
+            self.owner[a.id] = a.user_id
+        self._by_account: Dict[str, List[int]] = {}
+        self._by_author: Dict[str, List[int]] = {}
+        for i, t in enumerate(trans):
+            self._by_account.setdefault(t.account_id, []).append(i)
+            self._by_author.setdefault(t.user_id, []).append(i)
+        self._visible: Dict[str, Tuple[Transaction, ...]] = {}
+        self._own: Dict[str, Tuple[Transaction, ...]] = {}
+
+    # ---------- queries ----------
+    def accounts(self, username: str) -> Tuple[Account, ...]:
+        return self._accounts.get(username, ())
+
+    def visible(self, username: str,
+                trans: Sequence[Transaction]) -> Tuple[Transaction, ...]:
+        # транзакции по счетам пользователя, в порядке леджера
+        hit = self._visible.get(username)
+        if hit is None:
+            positions = sorted(i for a in self.accounts(username)
+                               for i in self._by_account.get(a.id, ()))
+            hit = self._visible[username] = tuple(trans[i] for i in positions)
+        return hit
+
+    def own(self, username: str,
+            trans: Sequence[Transaction]) -> Tuple[Transaction, ...]:
+        # транзакции, созданные пользователем (без удалённых)
+        hit = self._own.get(username)
+        if hit is None:
+            authored = (trans[i] for i in self._by_author.get(username, ()))
+            hit = self._own[username] = tuple(t for t in authored if not t.deleted)
+        return hit
+
+    # ---------- updates ----------
+    def _touch(self, t: Transaction) -> None:
+        self._visible.pop(self.owner.get(t.account_id), None)
+        self._own.pop(t.user_id, None)
+
+    def add(self, t: Transaction, pos: int) -> None:
+        self._by_account.setdefault(t.account_id, []).append(pos)
+        self._by_author.setdefault(t.user_id, []).append(pos)
+        self._touch(t)
+
+    def update(self, old: Transaction, t: Transaction, pos: int) -> None:
+        # замена на месте: при смене счёта или автора позиция переезжает,
+        # кэш сбрасывается и у прежнего, и у нового владельца
+        if old.account_id != t.account_id:
+            _move(self._by_account, old.account_id, t.account_id, pos)
+        if old.user_id != t.user_id:
+            _move(self._by_author, old.user_id, t.user_id, pos)
+        self._touch(old)
+        self._touch(t)
+
+
+def _move(lists: Dict[str, List[int]], src: str, dst: str, pos: int) -> None:
+    positions = lists.get(src, [])
+    i = bisect_left(positions, pos)
+    if i < len(positions) and positions[i] == pos:
+        del positions[i]
+    insort(lists.setdefault(dst, []), pos)
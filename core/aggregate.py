@@ -0,0 +1,90 @@
+from functools import lru_cache
+from typing import Iterable, Optional, Sequence
+
+# Однопроходные ядра агрегации вместо рекурсии по values[1:]:
+# O(N), без копий списка и без RecursionError на длинных категориях.
+# Для больших массивов (и при наличии NumPy) считаем векторно.
+VECTOR_THRESHOLD = 4096
+
+@lru_cache(maxsize=None)
+def _numpy():
+    # импорт при первом большом массиве, а не при импорте модуля (холодный старт)
+    try:
+        import numpy
+    except ImportError:  # NumPy необязателен: без него работают чистые Python-ядра
+        return None
+    return numpy
+
+def _as_array(values: Sequence[int]):
+    if len(values) < VECTOR_THRESHOLD:
+        return None
+    np = _numpy()
+    if np is None:
+        return None
+    return np.asarray(values, dtype=np.int64)
+
+def total(values: Iterable[int]) -> int:
+    if isinstance(values, Sequence):
+        arr = _as_array(values)
+        if arr is not None:
+            return int(arr.sum())
+    acc = 0
+    for v in values:
+        acc += v
+    return acc
+
+def total_abs(values: Iterable[int]) -> int:
+    if isinstance(values, Sequence):
+        arr = _as_array(values)
+        if arr is not None:
+            return int(abs(arr).sum())
+    acc = 0
+    for v in values:
+        acc += abs(v)
+    return acc
+
+def count(values: Iterable) -> int:
+    if isinstance(values, Sequence):
+        return len(values)
+    n = 0
+    for _ in values:
+        n += 1
+    return n
+
+def minimum(values: Iterable[int]) -> Optional[int]:
+    if isinstance(values, Sequence):
+        arr = _as_array(values)
+        if arr is not None:
+            return int(arr.min())
+    return min(values, default=None)
+
+def maximum(values: Iterable[int]) -> Optional[int]:
+    if isinstance(values, Sequence):
+        arr = _as_array(values)
+        if arr is not None:
+            return int(arr.max())
+    return max(values, default=None)
+
+def mean(values: Iterable[int]) -> float:
+    if isinstance(values, Sequence):
+        arr = _as_array(values)
+        if arr is not None:
+            return float(arr.mean())
+    n, acc = 0, 0
+    for v in values:
+        n += 1
+        acc += v
+    return acc / n if n else 0.0
+
+def summarize(values: Iterable[int]) -> dict:
+    # sum/count/min/max/mean за один проход
+    n, acc = 0, 0
+    lo = hi = None
+    for v in values:
+        n += 1
+        acc += v
+        if lo is None or v < lo:
+            lo = v
+        if hi is None or v > hi:
+            hi = v
+    return {"sum": acc, "count": n, "min": lo, "max": hi, "mean": acc / n if n else 0.0}
@@ -0,0 +1,179 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from core.domain import Transaction
+from core.transforms import ts_epoch
+
+# ----------------- Balance index -----------------
+# Итоги по счетам + префиксные суммы (дерево Фенвика) по дням: слот дерева —
+# день от origin счёта, внутри дня строки хранятся как есть. Вставка задним
+# числом меняет один слот, как и запись в конец, — без пересборки счёта.
+# Удалённые (deleted=True) транзакции в балансе не участвуют.
+#   balance / total          — O(1) / O(A)
+#   balance_as_of            — O(log D + k), k — строк счёта за этот день
+#   add / delete / restore   — O(log D) в любом месте истории
+# Дерево растёт удвоением, когда день выходит за диапазон слотов.
+
+DAY = 86400
+
+
+class _Fenwick:
+    def __init__(self, values: Iterable[int] = ()):
+        # O(n): каждый узел один раз добавляется к своему родителю
+        tree = [0]
+        tree.extend(values)
+        for i in range(1, len(tree)):
+            j = i + (i & -i)
+            if j < len(tree):
+                tree[j] += tree[i]
+        self._tree: List[int] = tree
+
+    def __len__(self) -> int:
+        return len(self._tree) - 1
+
+    def add(self, pos: int, delta: int) -> None:
+        i = pos + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def prefix(self, n: int) -> int:
+        # сумма первых n элементов
+        s = 0
+        while n > 0:
+            s += self._tree[n]
+            n -= n & -n
+        return s
+
+
+class _AccountHistory:
+    def __init__(self, days: Optional[Dict[int, Dict[str, Tuple[int, int]]]] = None):
+        # день -> {tx id: (epoch, текущий вклад)}; вклад удалённых — 0
+        self.days: Dict[int, Dict[str, Tuple[int, int]]] = days or {}
+        self.origin = 0
+        self.tree = _Fenwick()
+        if self.days:
+            self._resize(min(self.days), max(self.days) + 1)
+
+    def _resize(self, lo: int, hi: int) -> None:
+        # слоты [lo, hi) с запасом в сторону роста (обычно вперёд — новые
+        # записи свежие); O(D), амортизированно O(1) на вставку
+        size = max(64, 2 * (hi - lo))
+        backward = len(self.tree) and lo < self.origin
+        self.origin = hi - size if backward else lo
+        sums = [0] * size
+        for day, rows in self.days.items():
+            sums[day - self.origin] = sum(a for _, a in rows.values())
+        self.tree = _Fenwick(sums)
+
+    def _slot(self, day: int) -> int:
+        if not len(self.tree):
+            self._resize(day, day + 1)
+        elif not self.origin <= day < self.origin + len(self.tree):
+            self._resize(min(day, self.origin),
+                         max(day + 1, self.origin + len(self.tree)))
+        return day - self.origin
+
+    def put(self, tx_id: str, epoch: int, amount: int) -> int:
+        # новая строка или новый вклад существующей; возвращает изменение суммы
+        day = epoch // DAY
+        slot = self._slot(day)  # до записи: _resize пересчитывает слоты по days
+        rows = self.days.setdefault(day, {})
+        old = rows.get(tx_id, (epoch, 0))[1]
+        rows[tx_id] = (epoch, amount)
+        if amount != old:
+            self.tree.add(slot, amount - old)
+        return amount - old
+
+    def remove(self, tx_id: str, epoch: int) -> int:
+        day = epoch // DAY
+        rows = self.days[day]
+        _, amount = rows.pop(tx_id)
+        if not rows:
+            del self.days[day]
+        if amount:
+            self.tree.add(day - self.origin, -amount)
+        return -amount
+
+    def prefix(self, epoch: int) -> int:
+        # сумма вкладов строк с epoch <= заданного
+        day = epoch // DAY
+        if not len(self.tree) or day < self.origin:
+            return 0
+        n = min(day - self.origin, len(self.tree))
+        s = self.tree.prefix(n)
+        if n < len(self.tree):
+            s += sum(a for e, a in self.days.get(day, {}).values() if e <= epoch)
+        return s
+
+
+class BalanceIndex:
+    def __init__(self):
+        self._totals: Dict[str, int] = {}
+        self._history: Dict[str, _AccountHistory] = {}
+        self._where: Dict[str, Tuple[str, int]] = {}  # tx id -> (счёт, epoch)
+
+    @staticmethod
+    def build(trans: Iterable[Transaction]) -> 'BalanceIndex':
+        # одна раскладка по дням и O(D) сборка дерева на счёт
+        idx = BalanceIndex()
+        days: Dict[str, Dict[int, Dict[str, Tuple[int, int]]]] = {}
+        for t in trans:
+            epoch = ts_epoch(t.ts) or 0
+            amount = 0 if t.deleted else t.amount
+            where = idx._where.get(t.id)
+            if where is not None:
+                # повтор id — берём последнюю версию, как apply_entries
+                acc_id, e = where
+                old = days[acc_id][e // DAY].pop(t.id)[1]
+                idx._totals[acc_id] -= old
+            by_day = days.setdefault(t.account_id, {})
+            by_day.setdefault(epoch // DAY, {})[t.id] = (epoch, amount)
+            idx._where[t.id] = (t.account_id, epoch)
+            idx._totals[t.account_id] = idx._totals.get(t.account_id, 0) + amount
+        for acc_id, by_day in days.items():
+            idx._history[acc_id] = _AccountHistory(
+                {d: rows for d, rows in by_day.items() if rows})
+        return idx
+
+    # ---------- queries ----------
+    def balance(self, acc_id: str) -> int:
+        return self._totals.get(acc_id, 0)
+
+    def total(self, acc_ids: Optional[Iterable[str]] = None) -> int:
+        if acc_ids is None:
+            return sum(self._totals.values())
+        return sum(self._totals.get(a, 0) for a in acc_ids)
+
+    def balance_as_of(self, acc_id: str, ts: str) -> int:
+        # баланс счёта с учётом всех транзакций с ts <= заданного
+        h = self._history.get(acc_id)
+        epoch = ts_epoch(ts)
+        if h is None or epoch is None:
+            return 0
+        return h.prefix(epoch)
+
+    # ---------- updates ----------
+    def add(self, t: Transaction) -> None:
+        if t.id in self._where:
+            self.update(t)
+            return
+        epoch = ts_epoch(t.ts) or 0
+        h = self._history.setdefault(t.account_id, _AccountHistory())
+        delta = h.put(t.id, epoch, 0 if t.deleted else t.amount)
+        self._where[t.id] = (t.account_id, epoch)
+        self._totals[t.account_id] = self._totals.get(t.account_id, 0) + delta
+
+    def update(self, t: Transaction) -> None:
+        # замена транзакции с тем же id (например, мягкое удаление)
+        where = self._where.get(t.id)
+        if where is None:
+            self.add(t)
+            return
+        acc_id, epoch = where
+        if acc_id == t.account_id and epoch == (ts_epoch(t.ts) or 0):
+            delta = self._history[acc_id].put(t.id, epoch, 0 if t.deleted else t.amount)
+            self._totals[acc_id] += delta
+        else:
+            # сменился счёт или время: убираем старую запись, вставляем новую
+            self._totals[acc_id] += self._history[acc_id].remove(t.id, epoch)
+            del self._where[t.id]
+            self.add(t)
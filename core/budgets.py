@@ -0,0 +1,104 @@
+import calendar
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from core.domain import Budget, Transaction
+from core.ftypes import Either
+from core.transforms import ts_epoch
+
+# ----------------- Budget engine -----------------
+# Все бюджеты за один проход по леджеру: транзакции группируются по cat_id,
+# учитываются только расходы внутри окна периода бюджета и без deleted.
+# add/remove пересчитывают только бюджеты категории транзакции — O(1).
+
+Window = Tuple[Optional[int], Optional[int]]  # [start, end) в секундах от эпохи
+
+
+def period_window(period: str, as_of: datetime) -> Window:
+    d = as_of.date()
+    if period == "day":
+        start = d
+        end = d + timedelta(days=1)
+    elif period == "week":
+        start = d - timedelta(days=d.weekday())
+        end = start + timedelta(days=7)
+    elif period == "month":
+        start = d.replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1)
+    elif period == "quarter":
+        start = d.replace(month=(d.month - 1) // 3 * 3 + 1, day=1)
+        end = (start + timedelta(days=95)).replace(day=1)
+    elif period == "year":
+        start = d.replace(month=1, day=1)
+        end = start.replace(year=start.year + 1)
+    else:
+        # неизвестный период — вся история (как в check_budget)
+        return None, None
+    return calendar.timegm(start.timetuple()), calendar.timegm(end.timetuple())
+
+
+def _in_window(epoch: Optional[int], window: Window) -> bool:
+    lo, hi = window
+    if lo is None:
+        return True
+    return epoch is not None and lo <= epoch < hi
+
+
+class BudgetEngine:
+    def __init__(self, budgets: Iterable[Budget], trans: Iterable[Transaction],
+                 as_of: Optional[datetime] = None):
+        self.budgets: Tuple[Budget, ...] = tuple(budgets)
+        # as_of и ts — в UTC (наивные считаются UTC, см. transforms.now_ts)
+        self.as_of = as_of or datetime.now(timezone.utc)
+        self.windows: List[Window] = [period_window(b.period, self.as_of)
+                                      for b in self.budgets]
+        self._by_cat: Dict[str, List[int]] = {}
+        for i, b in enumerate(self.budgets):
+            self._by_cat.setdefault(b.cat_id, []).append(i)
+        self.spent: List[int] = [0] * len(self.budgets)
+        for t in trans:
+            self.add(t)
+
+    def _apply(self, t: Transaction, sign: int) -> List[str]:
+        if t.deleted or t.amount >= 0:
+            return []
+        slots = self._by_cat.get(t.cat_id)
+        if not slots:
+            return []
+        epoch = ts_epoch(t.ts)  # разбираем ts только у транзакций с бюджетом
+        changed = []
+        for i in slots:
+            if _in_window(epoch, self.windows[i]):
+                self.spent[i] += sign * abs(t.amount)
+                changed.append(self.budgets[i].id)
+        return changed
+
+    def add(self, t: Transaction) -> List[str]:
+        # возвращает id бюджетов, которые изменились
+        return self._apply(t, 1)
+
+    def remove(self, t: Transaction) -> List[str]:
+        return self._apply(t, -1)
+
+    def is_stale(self, as_of: datetime) -> bool:
+        # окно периода сдвинулось (наступил новый месяц/неделя)
+        return any(period_window(b.period, as_of) != w
+                   for b, w in zip(self.budgets, self.windows))
+
+    def result(self, i: int) -> Either:
+        b, spent = self.budgets[i], self.spent[i]
+        if spent > b.limit:
+            return Either.Left({"error": "over_budget", "budget_id": b.id,
+                                "cat_id": b.cat_id, "period": b.period,
+                                "spent": spent, "limit": b.limit})
+        return Either.Right(b)
+
+    def results(self) -> Dict[str, Either]:
+        return {b.id: self.result(i) for i, b in enumerate(self.budgets)}
+
+    def alerts(self) -> List[dict]:
+        return [e.left for e in self.results().values() if not e.is_right()]
+
+
+def check_budgets(budgets: Iterable[Budget], trans: Iterable[Transaction],
+                  as_of: Optional[datetime] = None) -> Dict[str, Either]:
+    return BudgetEngine(budgets, trans, as_of).results()
@@ -1,13 +1,16 @@
 from dataclasses import dataclass
 from typing import Optional
 
-@dataclass(frozen=True)
+# slots=True: без __dict__ у каждого экземпляра — заметно меньше памяти
+# на миллионе транзакций. Поля те же; для словаря используйте asdict().
+
+@dataclass(frozen=True, slots=True)
 class User:
     username: str
     password: str
     role: str 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Account:
     id: str
     name: str
@@ -15,14 +18,14 @@ class Account:
     currency: str
     user_id: str  
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Category:
     id: str
     name: str
     parent_id: Optional[str]
     type: str  
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Transaction:
     id: str
     account_id: str
@@ -33,14 +36,14 @@ class Transaction:
     note: str
     deleted: bool = False 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Budget:
     id: str
     cat_id: str
     limit: int
     period: str
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Event:
     id: str
     ts: str
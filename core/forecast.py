@@ -0,0 +1,202 @@
+from typing import Collection, Dict, List, Optional, Sequence, Tuple
+from core.report import Month, ReportCube, shift_month
+from core.tree import CategoryTree
+
+try:
+    import numpy as np
+except ImportError:  # без NumPy — те же модели построчно
+    np = None
+
+# ----------------- Forecasting -----------------
+# Матрица расходов категория × месяц (календарные месяцы подряд, пустые = 0)
+# строится один раз из ReportCube. Модели считаются сразу для всех строк:
+#   ma     — скользящее среднее за window месяцев
+#   ses    — экспоненциальное сглаживание (alpha)
+#   trend  — линейный тренд (МНК) по последним window месяцам
+# Для каждой модели: прогноз на следующий месяц и ошибки одношаговых
+# прогнозов на истории (MAE, RMSE, MAPE по месяцам с ненулевыми расходами).
+
+MODELS = ("ma", "ses", "trend")
+
+
+def month_range(first: Month, last: Month) -> Tuple[Month, ...]:
+    n = (last[0] - first[0]) * 12 + last[1] - first[1] + 1
+    return tuple(shift_month(first, i) for i in range(max(0, n)))
+
+
+def category_month_matrix(cube: ReportCube, cat_ids: Optional[Sequence[str]] = None,
+                          accounts: Optional[Collection[str]] = None,
+                          last: Optional[int] = None,
+                          tree: Optional[CategoryTree] = None):
+    # -> (cat_ids, months, matrix[C][M]) — расходы по модулю;
+    # tree — строка категории включает всё её поддерево
+    months = month_range(cube.months[0], cube.months[-1]) if cube.months else ()
+    if last:
+        months = months[-last:]
+    col = {m: j for j, m in enumerate(months)}
+    if cat_ids is None:
+        cat_ids = sorted({key[0] for key in cube.spent})
+    cat_ids = tuple(cat_ids)
+    members: Dict[str, List[int]] = {}
+    for i, c in enumerate(cat_ids):
+        for sub in ([x.id for x in tree.flatten(c)] if tree is not None else (c,)):
+            members.setdefault(sub, []).append(i)
+    rows = [[0.0] * len(months) for _ in cat_ids]
+    for key, v in cube.spent.items():
+        j = col.get(key[1])
+        if j is None or (accounts is not None and key[2] not in accounts):
+            continue
+        for i in members.get(key[0], ()):
+            rows[i][j] += v
+    if np is None:
+        return cat_ids, months, rows
+    matrix = np.array(rows, dtype=np.float64).reshape(len(cat_ids), len(months))
+    return cat_ids, months, matrix
+
+
+# ---------- vectorized (NumPy) ----------
+# F[:, t] — прогноз месяца t по месяцам [0, t); столбец M — прогноз вперёд.
+
+def _ma(X, window: int):
+    C, M = X.shape
+    cs = np.concatenate([np.zeros((C, 1)), np.cumsum(X, axis=1)], axis=1)
+    t = np.arange(1, M + 1)
+    lo = np.maximum(0, t - window)
+    F = (cs[:, t] - cs[:, lo]) / (t - lo)
+    return np.concatenate([X[:, :1], F], axis=1)
+
+
+def _ses(X, alpha: float):
+    C, M = X.shape
+    F = np.empty((C, M + 1))
+    level = X[:, 0].copy()
+    for t in range(M):
+        F[:, t] = level
+        level = alpha * X[:, t] + (1 - alpha) * level
+    F[:, M] = level
+    return F
+
+
+def _trend(X, window: int):
+    C, M = X.shape
+    i = np.arange(M, dtype=np.float64)
+    cs = np.concatenate([np.zeros((C, 1)), np.cumsum(X, axis=1)], axis=1)
+    csi = np.concatenate([np.zeros((C, 1)), np.cumsum(X * i, axis=1)], axis=1)
+    t = np.arange(1, M + 1)
+    lo = np.maximum(0, t - window)
+    n = (t - lo).astype(np.float64)
+    sx = cs[:, t] - cs[:, lo]
+    sjx = csi[:, t] - csi[:, lo] - lo * sx
+    sj = n * (n - 1) / 2
+    sjj = (n - 1) * n * (2 * n - 1) / 6
+    den = n * sjj - sj * sj
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where(den > 0, (n * sjx - sj * sx) / np.where(den > 0, den, 1), 0.0)
+    pred = (sx - slope * sj) / n + slope * n
+    return np.concatenate([X[:, :1], np.maximum(pred, 0.0)], axis=1)
+
+
+def _errors(X, F) -> Dict[str, object]:
+    # одношаговые ошибки по месяцам 1..M-1
+    A, P = X[:, 1:], F[:, 1:X.shape[1]]
+    e = P - A
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mae = np.abs(e).mean(axis=1) if e.shape[1] else np.zeros(X.shape[0])
+        rmse = np.sqrt((e * e).mean(axis=1)) if e.shape[1] else np.zeros(X.shape[0])
+        ape = np.where(A != 0, np.abs(e) / np.where(A != 0, A, 1), np.nan)
+        hits = (A != 0).sum(axis=1)
+        mape = np.where(hits > 0, np.nansum(ape, axis=1) / np.maximum(hits, 1), np.nan)
+    return {"mae": mae, "rmse": rmse, "mape": mape}
+
+
+# ---------- row-wise fallback ----------
+def _ma_row(x: List[float], window: int) -> List[float]:
+    f = [x[0]]
+    for t in range(1, len(x) + 1):
+        part = x[max(0, t - window):t]
+        f.append(sum(part) / len(part))
+    return f
+
+
+def _ses_row(x: List[float], alpha: float) -> List[float]:
+    level, f = x[0], []
+    for v in x:
+        f.append(level)
+        level = alpha * v + (1 - alpha) * level
+    return f + [level]
+
+
+def _trend_row(x: List[float], window: int) -> List[float]:
+    f = [x[0]]
+    for t in range(1, len(x) + 1):
+        part = x[max(0, t - window):t]
+        n = len(part)
+        if n < 2:
+            f.append(part[0])
+            continue
+        mj, mx = (n - 1) / 2, sum(part) / n
+        cov = sum((j - mj) * (v - mx) for j, v in enumerate(part))
+        slope = cov / sum((j - mj) ** 2 for j in range(n))
+        f.append(max(mx + slope * (n - mj), 0.0))
+    return f
+
+
+def _errors_row(x: List[float], f: List[float]) -> Dict[str, Optional[float]]:
+    pairs = list(zip(x[1:], f[1:len(x)]))
+    if not pairs:
+        return {"mae": 0.0, "rmse": 0.0, "mape": None}
+    mae = sum(abs(p - a) for a, p in pairs) / len(pairs)
+    rmse = (sum((p - a) ** 2 for a, p in pairs) / len(pairs)) ** 0.5
+    nz = [abs(p - a) / a for a, p in pairs if a != 0]
+    return {"mae": mae, "rmse": rmse, "mape": sum(nz) / len(nz) if nz else None}
+
+
+# ---------- API ----------
+def forecast_matrix(X, window: int = 3,
+                    alpha: float = 0.5) -> Dict[str, Dict[str, object]]:
+    # {модель: {"fitted": [C][M+1], "forecast": [C], "mae"/"rmse"/"mape": [C]}}
+    out: Dict[str, Dict[str, object]] = {}
+    if np is not None:
+        X = np.asarray(X, dtype=np.float64)
+        if X.size == 0:
+            return {m: {"fitted": X, "forecast": np.zeros(X.shape[0])} for m in MODELS}
+        models = (("ma", _ma(X, window)), ("ses", _ses(X, alpha)),
+                  ("trend", _trend(X, window)))
+        for name, F in models:
+            out[name] = {"fitted": F, "forecast": F[:, -1], **_errors(X, F)}
+        return out
+    fns = {"ma": lambda x: _ma_row(x, window),
+           "ses": lambda x: _ses_row(x, alpha),
+           "trend": lambda x: _trend_row(x, window)}
+    for name, fn in fns.items():
+        fitted = [fn(list(x)) if x else [0.0] for x in X]
+        errs = [_errors_row(list(x), f) for x, f in zip(X, fitted)]
+        out[name] = {"fitted": fitted, "forecast": [f[-1] for f in fitted],
+                     **{k: [e[k] for e in errs] for k in ("mae", "rmse", "mape")}}
+    return out
+
+
+def _num(v) -> Optional[float]:
+    v = float(v) if v is not None else None
+    return None if v is None or v != v else round(v, 2)
+
+
+def forecast_table(cube: ReportCube, cat_ids: Optional[Sequence[str]] = None,
+                   accounts: Optional[Collection[str]] = None, window: int = 3,
+                   alpha: float = 0.5, last: Optional[int] = None,
+                   tree: Optional[CategoryTree] = None) -> List[dict]:
+    # одна строка на категорию: прогнозы всех моделей, ошибки и лучшая по MAE
+    cats, months, X = category_month_matrix(cube, cat_ids, accounts, last, tree)
+    if not months:
+        return []
+    res = forecast_matrix(X, window, alpha)
+    rows = []
+    for i, c in enumerate(cats):
+        row = {"cat_id": c, "last": _num(X[i][-1])}
+        for m in MODELS:
+            row[m] = _num(res[m]["forecast"][i])
+            for k in ("mae", "rmse", "mape"):
+                row[f"{m}_{k}"] = _num(res[m][k][i])
+        row["best"] = min(MODELS, key=lambda m: row[f"{m}_mae"])
+        rows.append(row)
+    return rows
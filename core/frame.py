@@ -0,0 +1,233 @@
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from core.domain import Transaction
+from core.transforms import load_seed, ts_epoch
+
+try:
+    import numpy as np
+except ImportError:  # без NumPy колонки хранятся в array.array, операции — циклами
+    np = None
+
+# ----------------- Columnar ledger -----------------
+# Колонки вместо кортежа датаклассов:
+#   amount  — int64
+#   ts      — int64, секунды от эпохи (с NumPy доступен как datetime64[s])
+#   cat / account / user — int32-коды + словарь строковых значений
+#   deleted — bool
+# id и note остаются списками строк; Transaction собирается только по запросу.
+
+TimeLike = Union[str, int, None]
+
+
+def _ints(values, typecode: str = "q"):
+    if np is not None:
+        dtype = {"q": np.int64, "i": np.int32, "b": np.bool_}[typecode]
+        return np.fromiter(values, dtype=dtype)
+    return array(typecode, values)
+
+
+def _encode(values: Sequence[str]) -> Tuple[Tuple[str, ...], Dict[str, int], List[int]]:
+    codes: Dict[str, int] = {}
+    out = []
+    for v in values:
+        c = codes.get(v)
+        if c is None:
+            c = codes[v] = len(codes)
+        out.append(c)
+    return tuple(codes), codes, out
+
+
+def _epoch(value: TimeLike, default: int) -> int:
+    if value is None:
+        return default
+    if isinstance(value, int):
+        return value
+    e = ts_epoch(value)
+    return default if e is None else e
+
+
+class TransactionFrame:
+    def __init__(self, ids, notes, amount, ts, deleted, cat, account, user,
+                 cat_values, account_values, user_values, ts_raw=None):
+        self.ids: List[str] = ids
+        self.notes: List[str] = notes
+        self.amount = amount
+        self.ts = ts
+        self.deleted = deleted
+        self.cat = cat
+        self.account = account
+        self.user = user
+        self.cat_values: Tuple[str, ...] = cat_values
+        self.account_values: Tuple[str, ...] = account_values
+        self.user_values: Tuple[str, ...] = user_values
+        # исходные строки ts, которые не восстанавливаются из epoch без потерь
+        self.ts_raw: Dict[int, str] = ts_raw or {}
+        self._codes = {
+            "cat_id": {v: i for i, v in enumerate(cat_values)},
+            "account_id": {v: i for i, v in enumerate(account_values)},
+            "user_id": {v: i for i, v in enumerate(user_values)},
+        }
+
+    # ---------- build / convert ----------
+    @staticmethod
+    def from_transactions(trans: Sequence[Transaction]) -> 'TransactionFrame':
+        cat_values, _, cat = _encode([t.cat_id for t in trans])
+        account_values, _, account = _encode([t.account_id for t in trans])
+        user_values, _, user = _encode([t.user_id for t in trans])
+        epochs = [_epoch(t.ts, 0) for t in trans]
+        ts_raw = {i: t.ts for i, t in enumerate(trans) if _iso(epochs[i]) != t.ts}
+        return TransactionFrame(
+            [t.id for t in trans],
+            [t.note for t in trans],
+            _ints((t.amount for t in trans), "q"),
+            _ints(epochs, "q"),
+            _ints((bool(t.deleted) for t in trans), "b"),
+            _ints(cat, "i"),
+            _ints(account, "i"),
+            _ints(user, "i"),
+            cat_values,
+            account_values,
+            user_values,
+            ts_raw,
+        )
+
+    @staticmethod
+    def from_seed(path: str) -> 'TransactionFrame':
+        _, _, trans, _ = load_seed(path)
+        return TransactionFrame.from_transactions(trans)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def row(self, i: int) -> Transaction:
+        return Transaction(
+            id=self.ids[i],
+            account_id=self.account_values[self.account[i]],
+            user_id=self.user_values[self.user[i]],
+            cat_id=self.cat_values[self.cat[i]],
+            amount=int(self.amount[i]),
+            ts=self.ts_raw.get(i) or _iso(int(self.ts[i])),
+            note=self.notes[i],
+            deleted=bool(self.deleted[i]),
+        )
+
+    def to_transactions(self) -> Iterator[Transaction]:
+        return (self.row(i) for i in range(len(self)))
+
+    @property
+    def timestamps(self):
+        # datetime64[s] без копирования (только с NumPy)
+        if np is None:
+            raise RuntimeError("timestamps требует NumPy")
+        return self.ts.view("datetime64[s]")
+
+    # ---------- filtering ----------
+    def indices(self, cat_id: Optional[str] = None, account_id: Optional[str] = None,
+                user_id: Optional[str] = None,
+                start: TimeLike = None, end: TimeLike = None,
+                min_amount: Optional[int] = None, max_amount: Optional[int] = None,
+                include_deleted: bool = True):
+        eq = []
+        dims = (("cat_id", cat_id), ("account_id", account_id), ("user_id", user_id))
+        for name, value in dims:
+            if value is None:
+                continue
+            code = self._codes[name].get(value)
+            if code is None:
+                return _ints((), "q")
+            eq.append((self._column(name), code))
+        lo = _epoch(start, None) if start is not None else None
+        hi = _epoch(end, None) if end is not None else None
+
+        if np is not None:
+            mask = np.ones(len(self), dtype=bool)
+            for col, code in eq:
+                mask &= col == code
+            if lo is not None:
+                mask &= self.ts >= lo
+            if hi is not None:
+                mask &= self.ts <= hi
+            if min_amount is not None:
+                mask &= self.amount >= min_amount
+            if max_amount is not None:
+                mask &= self.amount <= max_amount
+            if not include_deleted:
+                mask &= ~self.deleted
+            return np.flatnonzero(mask)
+
+        idx = range(len(self))
+        for col, code in eq:
+            idx = [i for i in idx if col[i] == code]
+        if lo is not None:
+            idx = [i for i in idx if self.ts[i] >= lo]
+        if hi is not None:
+            idx = [i for i in idx if self.ts[i] <= hi]
+        if min_amount is not None:
+            idx = [i for i in idx if self.amount[i] >= min_amount]
+        if max_amount is not None:
+            idx = [i for i in idx if self.amount[i] <= max_amount]
+        if not include_deleted:
+            idx = [i for i in idx if not self.deleted[i]]
+        return array("q", idx)
+
+    def take(self, idx) -> 'TransactionFrame':
+        if np is not None:
+            idx = np.asarray(idx, dtype=np.int64)
+            pick = lambda col: col[idx]  # noqa: E731
+        else:
+            pick = lambda col: array(col.typecode, (col[i] for i in idx))  # noqa: E731
+        ts_raw = None
+        if self.ts_raw:
+            ts_raw = {j: self.ts_raw[i] for j, i in enumerate(idx) if i in self.ts_raw}
+        return TransactionFrame(
+            [self.ids[i] for i in idx],
+            [self.notes[i] for i in idx],
+            pick(self.amount), pick(self.ts), pick(self.deleted),
+            pick(self.cat), pick(self.account), pick(self.user),
+            self.cat_values, self.account_values, self.user_values,
+            ts_raw,
+        )
+
+    def where(self, **filters) -> 'TransactionFrame':
+        return self.take(self.indices(**filters))
+
+    # ---------- aggregation ----------
+    def sum(self, expenses_only: bool = False) -> int:
+        if np is not None:
+            col = self.amount[self.amount < 0] if expenses_only else self.amount
+            return int(col.sum())
+        return sum(a for a in self.amount if not expenses_only or a < 0)
+
+    def group_sum(self, by: str = "cat_id",
+                  expenses_only: bool = False) -> Dict[str, int]:
+        col, values = self._column(by), self._values(by)
+        if np is not None:
+            amount = self.amount
+            if expenses_only:
+                keep = amount < 0
+                col, amount = col[keep], amount[keep]
+            out = np.zeros(len(values), dtype=np.int64)
+            np.add.at(out, col, amount)
+            present = np.bincount(col, minlength=len(values)) > 0
+            return {values[i]: int(out[i]) for i in np.flatnonzero(present)}
+        sums: Dict[str, int] = {}
+        for c, a in zip(col, self.amount):
+            if expenses_only and a >= 0:
+                continue
+            key = values[c]
+            sums[key] = sums.get(key, 0) + a
+        return sums
+
+    def _column(self, name: str):
+        return {"cat_id": self.cat, "account_id": self.account,
+                "user_id": self.user}[name]
+
+    def _values(self, name: str) -> Tuple[str, ...]:
+        return {"cat_id": self.cat_values, "account_id": self.account_values,
+                "user_id": self.user_values}[name]
+
+
+def _iso(epoch: int) -> str:
+    dt = datetime.fromtimestamp(epoch, tz=timezone.utc)
+    return dt.replace(tzinfo=None).isoformat()
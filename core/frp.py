@@ -0,0 +1,197 @@
+import logging
+import threading
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from core.domain import Event, Transaction
+from core.transforms import now_ts, ts_month
+from core.memo import ForecastCache
+from core import instrument
+
+# ----------------- Event stream -----------------
+# Каждое изменение леджера — Event:
+#   tx_added   {"tx": t, "pos": i}
+#   tx_updated {"tx": new, "old": old, "pos": i}
+#   tx_deleted {"tx": new, "old": old, "pos": i}   (мягкое удаление)
+#   tx_batch   {"txs": (t, ...), "pos": i}         (новые, позиции i, i+1, ...)
+# Производные представления подписываются на поток и меняют только то, что
+# затронуто событием. Последние события хранятся в log — по seq можно узнать,
+# что поменялось с прошлой отрисовки.
+# Обработчики изолированы: исключение одного логируется, считается в errors
+# и передаётся его on_error, остальные подписчики событие всё равно получат.
+
+TX_ADDED = "tx_added"
+TX_UPDATED = "tx_updated"
+TX_DELETED = "tx_deleted"
+TX_BATCH = "tx_batch"
+ALL = "*"
+
+Handler = Callable[[Event], None]
+ErrorHandler = Callable[[Event, Exception], None]
+Month = Tuple[int, int]
+
+_log = logging.getLogger(__name__)
+
+
+class EventStream:
+    def __init__(self, keep: int = 1000):
+        self.seq = 0
+        self.errors = 0
+        self.log: deque = deque(maxlen=keep)
+        self._subs: Dict[str, List[Tuple[Handler, Optional[ErrorHandler]]]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, handler: Handler, *names: str,
+                  on_error: Optional[ErrorHandler] = None) -> Callable[[], None]:
+        # без names — все события; возвращает функцию отписки
+        names = names or (ALL,)
+        sub = (handler, on_error)
+        for name in names:
+            self._subs.setdefault(name, []).append(sub)
+
+        def unsubscribe() -> None:
+            for name in names:
+                self._subs[name].remove(sub)
+        return unsubscribe
+
+    def emit(self, name: str, payload: dict) -> Event:
+        with self._lock:
+            self.seq += 1
+            e = Event(str(self.seq), now_ts(), name, payload)
+            self.log.append(e)
+        for h, on_error in self._subs.get(name, []) + self._subs.get(ALL, []):
+            try:
+                h(e)
+            except Exception as exc:
+                self.errors += 1
+                _log.exception("handler %r failed on %s #%s", h, name, e.id)
+                if on_error is not None:
+                    on_error(e, exc)
+        return e
+
+    def since(self, seq: int) -> List[Event]:
+        # события после seq (из хранимого хвоста)
+        return [e for e in self.log if int(e.id) > seq]
+
+
+def on_tx(added: Callable[[Transaction, int], None],
+          replaced: Callable[[Transaction, Transaction, int], None],
+          added_many: Optional[Callable[[Tuple[Transaction, ...], int], None]] = None
+          ) -> Handler:
+    # обработчик событий транзакций из двух функций; пачку без added_many
+    # раскладываем в added по одной
+    def handler(e: Event) -> None:
+        p = e.payload
+        if e.name == TX_ADDED:
+            added(p["tx"], p["pos"])
+        elif e.name in (TX_UPDATED, TX_DELETED):
+            replaced(p["old"], p["tx"], p["pos"])
+        elif e.name == TX_BATCH:
+            if added_many is not None:
+                added_many(p["txs"], p["pos"])
+            else:
+                for i, t in enumerate(p["txs"]):
+                    added(t, p["pos"] + i)
+    return handler
+
+
+def replace_event(old: Transaction, new: Transaction) -> str:
+    return TX_DELETED if new.deleted and not old.deleted else TX_UPDATED
+
+
+# ----------------- Views -----------------
+def tx_month(t: Transaction) -> Optional[Month]:
+    return ts_month(t.ts)
+
+
+class MonthlyCategoryView:
+    # (cat_id, account_id) -> {(год, месяц): сумма} и сумма расходов по модулю;
+    # удалённые транзакции не учитываются, если не задан include_deleted
+    # (так считают memo.forecast_expenses, sum_expenses_recursive, check_budget)
+    def __init__(self, trans: Iterable[Transaction] = (),
+                 include_deleted: bool = False):
+        self.include_deleted = include_deleted
+        self.sums: Dict[Tuple[str, str], Dict[Month, int]] = {}
+        self.spent: Dict[Tuple[str, str], int] = {}
+        self._counts: Dict[Tuple[str, str], Dict[Month, int]] = {}
+        self._accounts: Dict[str, set] = {}
+        self.cat_versions: Dict[str, int] = {}
+        for t in trans:
+            self._apply(t, 1)
+
+    def _apply(self, t: Transaction, sign: int) -> None:
+        if t.deleted and not self.include_deleted:
+            return
+        key = (t.cat_id, t.account_id)
+        months = self.sums.setdefault(key, {})
+        month = tx_month(t)
+        # строка без разбираемой даты не попадает в помесячные суммы,
+        # но в расходах (а значит, и в прогнозе) учитывается
+        if month is not None:
+            counts = self._counts.setdefault(key, {})
+            counts[month] = counts.get(month, 0) + sign
+            if counts[month]:
+                months[month] = months.get(month, 0) + sign * t.amount
+            else:
+                # в месяце не осталось транзакций — убираем его,
+                # как Timeline.monthly_sums
+                del counts[month], months[month]
+        if t.amount < 0:
+            self.spent[key] = self.spent.get(key, 0) + sign * -t.amount
+        self._accounts.setdefault(t.cat_id, set()).add(t.account_id)
+        self.cat_versions[t.cat_id] = self.cat_versions.get(t.cat_id, 0) + 1
+
+    def added(self, t: Transaction, pos: int = 0) -> None:
+        self._apply(t, 1)
+
+    def replaced(self, old: Transaction, new: Transaction, pos: int = 0) -> None:
+        self._apply(old, -1)
+        self._apply(new, 1)
+
+    def _keys(self, cat_id: str,
+              account_ids: Optional[Iterable[str]]) -> List[Tuple[str, str]]:
+        accs = self._accounts.get(cat_id, ())
+        if account_ids is not None:
+            accs = [a for a in accs if a in account_ids]
+        return [(cat_id, a) for a in accs]
+
+    def monthly(self, cat_id: str,
+                account_ids: Optional[Iterable[str]] = None) -> Dict[Month, int]:
+        # account_ids=None — все счета
+        out: Dict[Month, int] = {}
+        for key in self._keys(cat_id, account_ids):
+            for month, s in self.sums[key].items():
+                out[month] = out.get(month, 0) + s
+        return out
+
+    def expenses(self, cat_id: str, account_ids: Optional[Iterable[str]] = None) -> int:
+        return sum(self.spent.get(key, 0) for key in self._keys(cat_id, account_ids))
+
+    def cat_version(self, cat_id: str) -> int:
+        return self.cat_versions.get(cat_id, 0)
+
+
+class ForecastView:
+    # расходы категорий // period поверх MonthlyCategoryView (удалённые
+    # транзакции — по его include_deleted); в ключе кэша — версии категорий, поэтому
+    # пересчёт только там, где были события
+    def __init__(self, monthly: MonthlyCategoryView, maxsize: int = 1024):
+        self.monthly = monthly
+        self.cache = ForecastCache(maxsize, name="frp.forecast")
+
+    def forecast(self, cat_id: str, period: int,
+                 account_ids: Optional[Iterable[str]] = None) -> int:
+        return self.forecast_many((cat_id,), period, account_ids)
+
+    @instrument.timed("frp.forecast")
+    def forecast_many(self, cat_ids: Iterable[str], period: int,
+                      account_ids: Optional[Iterable[str]] = None) -> int:
+        # несколько категорий (например, поддерево) как одна: сумма расходов // period
+        cats = tuple(cat_ids)
+        accs = None if account_ids is None else frozenset(account_ids)
+        version = tuple(self.monthly.cat_version(c) for c in cats)
+        return self.cache.lookup(
+            (version, cats, period, accs), cats,
+            lambda: sum(self.monthly.expenses(c, accs) for c in cats) // max(1, period))
+
+    def stats(self) -> dict:
+        return self.cache.stats()
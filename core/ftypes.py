@@ -1,4 +1,6 @@
-from typing import Callable, Generic, TypeVar, Optional, Tuple 
+from typing import Callable, Dict, Generic, Iterable, TypeVar, Optional, Sequence, Tuple
+from core import instrument
+from core.pvector import PVector
 T = TypeVar("T")
 E = TypeVar("E")
 
@@ -51,21 +53,82 @@ class Either(Generic[E, T]):
     def get_or_else(self, default):
         return self.right if self.right is not None else default
 
+# id -> объект; кэш по identity кортежа, чтобы не сканировать его на каждый вызов.
+# Кэшируются только неизменяемые последовательности (tuple, PVector): список
+# можно поменять на месте, и индекс по его identity устарел бы.
+_INDEXES: Dict[int, tuple] = {}
+
+def id_index(items: Sequence) -> Dict[str, object]:
+    if not isinstance(items, (tuple, PVector)):
+        return {x.id: x for x in items}
+    hit = _INDEXES.get(id(items))
+    if hit is not None and hit[0] is items:
+        return hit[1]
+    index = {x.id: x for x in items}
+    if len(_INDEXES) >= 16:
+        _INDEXES.clear()
+    _INDEXES[id(items)] = (items, index)
+    return index
+
 # helpers required by the lab
 def safe_category(cats: Tuple, cat_id: str) -> Maybe:
-    cat = next((c for c in cats if c.id == cat_id), None)
-    return Maybe(cat)
+    return Maybe(id_index(cats).get(cat_id))
 
+@instrument.timed()
 def validate_transaction(t, accs: Tuple, cats: Tuple) -> Either:
-    acc = next((a for a in accs if a.id == t.account_id), None)
-    if acc is None:
+    if t.account_id not in id_index(accs):
         return Either.Left({"error": "account_not_found"})
-    cat = next((c for c in cats if c.id == t.cat_id), None)
-    if cat is None:
+    if t.cat_id not in id_index(cats):
         return Either.Left({"error": "category_not_found"})
     return Either.Right(t)
 
+# ----------------- Batch validation -----------------
+def _record_errors(t, acc_ids, cat_ids) -> list:
+    errors = []
+    if t.account_id not in acc_ids:
+        errors.append({"error": "account_not_found", "account_id": t.account_id})
+    if t.cat_id not in cat_ids:
+        errors.append({"error": "category_not_found", "cat_id": t.cat_id})
+    return errors
+
+def _validate_chunk(args) -> list:
+    # верхний уровень модуля — чтобы функцию можно было отправить в процесс
+    start, chunk, acc_ids, cat_ids = args
+    out = []
+    for i, t in enumerate(chunk, start):
+        errors = _record_errors(t, acc_ids, cat_ids)
+        if errors:
+            out.append(Either.Left({"row": i, "id": t.id, "errors": errors}))
+        else:
+            out.append(Either.Right(t))
+    return out
+
+@instrument.timed()
+def validate_transactions(trans: Sequence, accs: Tuple, cats: Tuple,
+                          workers: int = 0,
+                          chunk_size: int = 10000) -> Tuple[Either, ...]:
+    # Один Either на запись (в том же порядке). Left собирает все ошибки
+    # записи вместе с номером строки. Индексы счетов/категорий строятся один
+    # раз; workers > 0 — проверка чанками в пуле процессов.
+    instrument.rows("ftypes.validate_transactions", trans)
+    acc_ids = frozenset(a.id for a in accs)
+    cat_ids = frozenset(c.id for c in cats)
+    chunks = [(i, trans[i:i + chunk_size], acc_ids, cat_ids)
+              for i in range(0, len(trans), chunk_size)]
+    if workers and len(chunks) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_validate_chunk, chunks))
+    else:
+        parts = [_validate_chunk(c) for c in chunks]
+    return tuple(e for part in parts for e in part)
+
+def collect_errors(results: Iterable[Either]) -> list:
+    return [r.left for r in results if not r.is_right()]
+
+@instrument.timed()
 def check_budget(b, trans: Tuple) -> Either:
+    instrument.rows("ftypes.check_budget", trans)
     spent = sum(abs(t.amount) for t in trans if t.cat_id == b.cat_id and t.amount < 0)
     if spent > b.limit:
         return Either.Left({"error": "over_budget", "spent": spent, "limit": b.limit})
@@ -0,0 +1,192 @@
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from core.domain import Transaction
+from core.ftypes import validate_transactions
+from core.transforms import interned, parse_ts
+
+# ----------------- Statement import -----------------
+# Поток: строки файла (генератор) -> Transaction -> пачка chunk_size ->
+# validate_transactions -> отсев дублей по id -> ledger.add_many (пачка
+# пишется в журнал одной записью и вливается в индексы одним событием).
+# В памяти одновременно только одна пачка, размер файла роли не играет.
+# Строки без id получают детерминированный id из содержимого, поэтому
+# повторный импорт той же выписки не создаёт дублей.
+
+Row = Tuple[int, dict]  # (номер строки в файле, поля)
+
+FIELDS = ("id", "account_id", "user_id", "cat_id", "amount", "ts", "note")
+
+
+class RowError(ValueError):
+    def __init__(self, error: str, **info):
+        super().__init__(error)
+        self.info = {"error": error, **info}
+
+
+# ---------- readers ----------
+def read_csv(path: str, delimiter: str = ",") -> Iterator[Row]:
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.DictReader(f, delimiter=delimiter)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def read_jsonl(path: str) -> Iterator[Row]:
+    with open(path, "r", encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                row = None
+            # валидный JSON, но не объект ([1, 2], 5, "x") — тоже битая строка
+            yield n, row if isinstance(row, dict) else {"_raw": line}
+
+
+def read_rows(path: str) -> Iterator[Row]:
+    if path.endswith((".jsonl", ".ndjson")):
+        return read_jsonl(path)
+    return read_csv(path)
+
+
+# ---------- mapping ----------
+def parse_amount(value) -> int:
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    try:
+        d = Decimal(str(value).replace("\u00a0", "").replace(" ", "").replace(",", "."))
+    except InvalidOperation:
+        raise RowError("bad_amount", amount=value)
+    if d != d.to_integral_value():
+        raise RowError("bad_amount", amount=value)
+    return int(d)
+
+
+def row_id(row: dict) -> str:
+    key = "|".join(str(row.get(k, "")) for k in ("account_id", "ts", "amount", "note"))
+    return "imp-" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+
+def to_transaction(row: dict, defaults: Optional[Dict[str, str]] = None) -> Transaction:
+    if not isinstance(row, dict):
+        raise RowError("bad_row")
+    if "_raw" in row:
+        raise RowError("bad_json")
+    given = {k: v for k, v in row.items() if k in FIELDS and v not in (None, "")}
+    row = {**(defaults or {}), **given}
+    for name in ("account_id", "user_id", "cat_id", "amount", "ts"):
+        if name not in row:
+            raise RowError("missing_field", field=name)
+    if parse_ts(row["ts"]) is None:
+        raise RowError("bad_ts", ts=row["ts"])
+    row["amount"] = parse_amount(row["amount"])
+    row.setdefault("note", "")
+    row.setdefault("id", row_id(row))
+    return interned(Transaction, row)
+
+
+# ---------- report ----------
+@dataclass
+class ImportReport:
+    rows: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    seconds: float = 0.0
+    errors: List[dict] = field(default_factory=list)  # первые max_errors отказов
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> dict:
+        return {"rows": self.rows, "imported": self.imported,
+                "duplicates": self.duplicates, "rejected": self.rejected,
+                "seconds": round(self.seconds, 3),
+                "rows_per_sec": round(self.rows_per_sec, 1), "errors": self.errors}
+
+
+# ---------- pipeline ----------
+def _chunks(it: Iterable, size: int) -> Iterator[list]:
+    it = iter(it)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def import_rows(ledger, rows: Iterable[Row], defaults: Optional[Dict[str, str]] = None,
+                chunk_size: int = 1000, max_errors: int = 100) -> ImportReport:
+    report = ImportReport()
+    started = time.perf_counter()
+
+    def reject(info: dict) -> None:
+        report.rejected += 1
+        if len(report.errors) < max_errors:
+            report.errors.append(info)
+
+    for chunk in _chunks(rows, chunk_size):
+        report.rows += len(chunk)
+        parsed, lines = [], []
+        for line, row in chunk:
+            try:
+                parsed.append(to_transaction(row, defaults))
+                lines.append(line)
+            except RowError as e:
+                reject({"row": line, **e.info})
+
+        batch, seen = [], set()
+        checked = validate_transactions(parsed, ledger.accounts, ledger.categories)
+        for line, r in zip(lines, checked):
+            if not r.is_right():
+                reject({**r.left, "row": line})
+                continue
+            t = r.right
+            if t.id in seen or ledger.get(t.id) is not None:
+                report.duplicates += 1
+                continue
+            seen.add(t.id)
+            batch.append(t)
+        if batch:
+            ledger.add_many(batch)
+            report.imported += len(batch)
+
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def import_statement(ledger, path: str, defaults: Optional[Dict[str, str]] = None,
+                     chunk_size: int = 1000, max_errors: int = 100) -> ImportReport:
+    return import_rows(ledger, read_rows(path), defaults, chunk_size, max_errors)
+
+
+USAGE = "usage: python -m core.importer STATEMENT.csv|.jsonl [user_id] [account_id]"
+
+if __name__ == "__main__":
+    from core.service import JournalBusy, get_ledger, open_journal
+    if not 1 <= len(sys.argv) - 1 <= 3:
+        print(USAGE, file=sys.stderr)
+        sys.exit(2)
+    path, *rest = sys.argv[1:]
+    defaults = dict(zip(("user_id", "account_id"), rest))
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    seed = os.path.join(root, "data", "seed.json")
+    try:
+        # журнал открыт другим процессом (например, приложением) — не импортируем
+        open_journal(seed, exclusive=True)
+    except JournalBusy as e:
+        print(f"{e}; stop it before importing", file=sys.stderr)
+        sys.exit(1)
+    report = import_statement(get_ledger(seed), path, defaults)
+    print(json.dumps(report.as_dict(), ensure_ascii=False, indent=2))
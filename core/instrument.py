@@ -0,0 +1,220 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+# ----------------- Instrumentation -----------------
+# Счётчики вызовов, задержки (p50/p95/p99 по последним WINDOW замерам),
+# попадания в кэш и число просмотренных строк — по имени точки.
+#   @timed("transforms.load_seed")       — декоратор
+#   with span("page:Reports"): ...       — контекстный менеджер
+#   rows("recursion.sum", trans)         — сколько строк просмотрела функция
+#   cache("memo.forecast", hit=True)     — попадание/промах кэша
+# Выключено по умолчанию (включается enable() или FM_INSTRUMENT=1): тогда
+# обёртка — одна проверка флага и прямой вызов функции.
+# capture("cprofile" | "tracemalloc") — разовый профиль участка кода.
+
+WINDOW = 2048
+
+
+class _State:
+    enabled = os.environ.get("FM_INSTRUMENT", "") not in ("", "0")
+
+
+STATE = _State()
+_LOCK = threading.Lock()
+
+
+class Metric:
+    __slots__ = ("calls", "total", "max", "samples", "rows", "hits", "misses", "errors")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: deque = deque(maxlen=WINDOW)
+        self.rows = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def as_dict(self) -> dict:
+        s = sorted(self.samples)
+        pct = lambda q: s[min(len(s) - 1, int(q * len(s)))] * 1000.0 if s else None  # noqa: E731
+        lookups = self.hits + self.misses
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_ms": self.total * 1000.0,
+            "mean_ms": self.total / self.calls * 1000.0 if self.calls else None,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "max_ms": self.max * 1000.0 if self.calls else None,
+            "rows": self.rows,
+            "cache_hit_rate": self.hits / lookups if lookups else None,
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+        }
+
+
+METRICS: Dict[str, Metric] = {}
+
+
+def _metric(name: str) -> Metric:
+    m = METRICS.get(name)
+    if m is None:
+        with _LOCK:
+            m = METRICS.setdefault(name, Metric())
+    return m
+
+
+def enable(on: bool = True) -> None:
+    STATE.enabled = on
+
+
+def enabled() -> bool:
+    return STATE.enabled
+
+
+def reset() -> None:
+    with _LOCK:
+        METRICS.clear()
+
+
+# ---------- recording ----------
+def record(name: str, seconds: float, error: bool = False) -> None:
+    if not STATE.enabled:
+        return
+    m = _metric(name)
+    with _LOCK:
+        m.calls += 1
+        m.total += seconds
+        m.samples.append(seconds)
+        if seconds > m.max:
+            m.max = seconds
+        if error:
+            m.errors += 1
+
+
+def rows(name: str, items) -> None:
+    # items — число или последовательность (берём len, только если включено)
+    if STATE.enabled:
+        try:
+            n = items if isinstance(items, int) else len(items)
+        except TypeError:
+            return
+        m = _metric(name)
+        with _LOCK:
+            m.rows += n
+
+
+def cache(name: str, hit: bool) -> None:
+    if STATE.enabled:
+        m = _metric(name)
+        with _LOCK:
+            if hit:
+                m.hits += 1
+            else:
+                m.misses += 1
+
+
+def timed(name: Optional[str] = None) -> Callable:
+    def deco(fn: Callable) -> Callable:
+        key = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not STATE.enabled:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception:
+                record(key, time.perf_counter() - t0, error=True)
+                raise
+            record(key, time.perf_counter() - t0)
+            return result
+        wrapper.metric_name = key
+        return wrapper
+    return deco
+
+
+class span:
+    # with span("page:Reports"): ... — то же, что @timed, для блока кода
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.t0 = 0.0
+
+    def __enter__(self) -> 'span':
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        record(self.name, time.perf_counter() - self.t0, error=exc_type is not None)
+
+
+# ---------- export ----------
+def snapshot() -> Dict[str, dict]:
+    with _LOCK:
+        return {name: m.as_dict() for name, m in sorted(METRICS.items())}
+
+
+def export_json(path: Optional[str] = None) -> str:
+    text = json.dumps({"enabled": STATE.enabled, "metrics": snapshot()}, indent=2)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+    return text
+
+
+# ---------- profiling ----------
+class capture:
+    # with capture("cprofile") as c: ...; c.report — текст топ-N
+    def __init__(self, kind: str = "cprofile", top: int = 25):
+        if kind not in ("cprofile", "tracemalloc"):
+            raise ValueError(f"unknown capture kind: {kind}")
+        self.kind = kind
+        self.top = top
+        self.report = ""
+        self._prof = None
+
+    def start(self) -> 'capture':
+        if self.kind == "cprofile":
+            import cProfile
+            self._prof = cProfile.Profile()
+            self._prof.enable()
+        else:
+            import tracemalloc
+            tracemalloc.start()
+        return self
+
+    def stop(self) -> str:
+        if self.kind == "cprofile":
+            import io
+            import pstats
+            self._prof.disable()
+            out = io.StringIO()
+            stats = pstats.Stats(self._prof, stream=out)
+            stats.sort_stats("cumulative").print_stats(self.top)
+            self.report = out.getvalue()
+        else:
+            import tracemalloc
+            snap = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            lines = [f"current={current} B peak={peak} B"]
+            lines += [str(s) for s in snap.statistics("lineno")[:self.top]]
+            self.report = "\n".join(lines)
+        return self.report
+
+    def __enter__(self) -> 'capture':
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
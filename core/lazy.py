@@ -0,0 +1,123 @@
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+from core import instrument
+
+# ----------------- Lazy query -----------------
+# Query(ledger).where(p1).where(p2).select(f).limit(50)
+# Ничего не считается до итерации: все предикаты проверяются в одном
+# генераторе, limit/first останавливают проход досрочно. Предикаты из
+# core.recursion (by_category / by_date_range / ...) несут kind/args —
+# если для kind есть индекс, источник сужается через него. Индекс обязан
+# вернуть надмножество подходящих строк в порядке источника — тогда
+# результат не зависит от того, какой предикат ушёл в индекс.
+# Предикат, добавленный после select, видит спроецированный элемент.
+
+Index = Callable[..., Iterable]
+
+
+class Query:
+    def __init__(self, source: Iterable, indexes: Optional[Dict[str, Index]] = None,
+                 preds: Tuple[Callable, ...] = (), proj: Optional[Callable] = None,
+                 n: Optional[int] = None):
+        self._source = source
+        self._indexes = indexes or {}
+        self._preds = preds
+        self._proj = proj
+        self._n = n
+
+    @staticmethod
+    def over(ledger) -> 'Query':
+        # леджер из core.service: диапазон дат уходит в timeline (bisect),
+        # поиск по заметкам — в инвертированный индекс
+        trans = ledger.transactions
+        n = len(trans)
+
+        def in_order(rows: Iterable) -> list:
+            # строки timeline (по времени) -> порядок и версии снимка trans
+            pos = {ledger.position(t.id) for t in rows}
+            pos.discard(None)
+            return [trans[i] for i in sorted(pos) if i < n]
+
+        return Query(trans, {
+            "date_range": lambda start, end: in_order(
+                ledger.timeline.candidates(start, end)),
+            "note": lambda text, prefix: ledger.notes.rows(trans, text, prefix),
+        })
+
+    def _with(self, **changes) -> 'Query':
+        state = {"preds": self._preds, "proj": self._proj, "n": self._n}
+        state.update(changes)
+        return Query(self._source, self._indexes, **state)
+
+    # ---------- building ----------
+    def where(self, pred: Callable) -> 'Query':
+        if self._proj is not None:
+            # предикаты проверяются до проекции: применяем её сами;
+            # без kind такой предикат в индекс не уходит
+            def projected(x, p=pred, f=self._proj):
+                return p(f(x))
+            pred = projected
+        return self._with(preds=self._preds + (pred,))
+
+    def select(self, fn: Callable) -> 'Query':
+        proj = fn if self._proj is None else (lambda x, f=self._proj: fn(f(x)))
+        return self._with(proj=proj)
+
+    def limit(self, n: int) -> 'Query':
+        return self._with(n=n if self._n is None else min(n, self._n))
+
+    # ---------- planning ----------
+    def _plan(self) -> Tuple[Iterable, Optional[Callable]]:
+        # первый предикат, для которого есть индекс, сужает источник;
+        # сам предикат всё равно проверяется — индекс возвращает надмножество
+        for pred in self._preds:
+            index = self._indexes.get(getattr(pred, "kind", None))
+            if index is not None:
+                return index(*pred.args), pred
+        return self._source, None
+
+    def explain(self) -> dict:
+        source, pushed = self._plan()
+        return {
+            "pushdown": getattr(pushed, "kind", None),
+            "predicates": [getattr(p, "kind", "custom") for p in self._preds],
+            "limit": self._n,
+        }
+
+    def matches(self, t) -> bool:
+        for p in self._preds:
+            if not p(t):
+                return False
+        return True
+
+    # ---------- execution ----------
+    def _filtered(self) -> Iterator:
+        source, pushed = self._plan()
+        # размер источника прохода: после сужения индексом или весь леджер
+        instrument.rows(f"lazy.query:{getattr(pushed, 'kind', None) or 'scan'}", source)
+        if not self._preds:
+            return iter(source)
+        match = self._preds[0] if len(self._preds) == 1 else self.matches
+        return (t for t in source if match(t))
+
+    def __iter__(self) -> Iterator:
+        it = self._filtered()
+        if self._n is not None:
+            it = islice(it, self._n)
+        if self._proj is not None:
+            it = map(self._proj, it)
+        return it
+
+    @instrument.timed("lazy.query.to_list")
+    def to_list(self) -> list:
+        return list(self)
+
+    def first(self, default=None):
+        return next(iter(self.limit(1)), default)
+
+    @instrument.timed("lazy.query.count")
+    def count(self) -> int:
+        n = 0
+        for _ in self:
+            n += 1
+        return n
@@ -1,26 +1,163 @@
-from functools import lru_cache
-from typing import Tuple
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
 from .domain import Transaction, Category
+from .pvector import PVector
+from . import instrument
 import time
 
-@lru_cache(maxsize=256)
+# ----------------- Ledger snapshot -----------------
+# Неизменяемый набор транзакций леджера: add/update возвращают новый снапшот,
+# старый остаётся как был. Версии для кэша прогнозов ведёт не снапшот, а
+# frp.MonthlyCategoryView (счётчик изменений по категории).
+
+@dataclass(frozen=True, eq=False)
+class LedgerSnapshot:
+    trans: Tuple[Transaction, ...]
+
+    @staticmethod
+    def of(trans) -> 'LedgerSnapshot':
+        # tuple и PVector — как есть, прочие последовательности — копией
+        return LedgerSnapshot(trans if _immutable(trans) else tuple(trans))
+
+    def add(self, t: Transaction) -> 'LedgerSnapshot':
+        # PVector: O(log N) со структурным разделением; кортеж — копия
+        if isinstance(self.trans, PVector):
+            return LedgerSnapshot(self.trans.append(t))
+        return LedgerSnapshot(tuple(self.trans) + (t,))
+
+    def extend(self, trans: Iterable[Transaction]) -> 'LedgerSnapshot':
+        if isinstance(self.trans, PVector):
+            return LedgerSnapshot(self.trans.extend(trans))
+        return LedgerSnapshot(tuple(self.trans) + tuple(trans))
+
+    def update(self, t: Transaction, pos: Optional[int] = None) -> 'LedgerSnapshot':
+        # замена по id (например, мягкое удаление); pos — известная позиция
+        if pos is None:
+            pos = next((i for i, x in enumerate(self.trans) if x.id == t.id), None)
+            if pos is None:
+                return self
+        if isinstance(self.trans, PVector):
+            return LedgerSnapshot(self.trans.set(pos, t))
+        head, tail = tuple(self.trans[:pos]), tuple(self.trans[pos + 1:])
+        return LedgerSnapshot(head + (t,) + tail)
+
+
+def _immutable(trans) -> bool:
+    # tuple и PVector не меняются при той же identity — их можно кэшировать
+    return isinstance(trans, (tuple, PVector))
+
+
+# ----------------- Forecast cache -----------------
+class ForecastCache:
+    # ограниченный LRU (+ TTL) для прогнозов; ключ содержит версии категорий,
+    # поэтому изменение категории просто перестаёт давать попадания по старым
+    # ключам. cat_ids записи — для явной инвалидации по категориям.
+    def __init__(self, maxsize: int = 256, ttl: Optional[float] = None,
+                 clock=time.monotonic, name: str = "memo.forecast_cache"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[tuple, Tuple[int, float, tuple]]" = OrderedDict()
+        self._by_cat: Dict[str, Set[tuple]] = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, key: tuple, cat_ids: Iterable[str],
+               compute: Callable[[], int]) -> int:
+        now = self.clock()
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is not None and (self.ttl is None or now - hit[1] < self.ttl):
+                self._data.move_to_end(key)
+                self.hits += 1
+                instrument.cache(self.name, True)
+                return hit[0]
+            self.misses += 1
+        instrument.cache(self.name, False)
+        value = compute()
+        cats = tuple(cat_ids)
+        with self._lock:
+            self._drop(key)
+            self._data[key] = (value, now, cats)
+            for cid in cats:
+                self._by_cat.setdefault(cid, set()).add(key)
+            while len(self._data) > self.maxsize:
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+        return value
+
+    def _drop(self, key: tuple) -> None:
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return
+        for cid in entry[2]:
+            keys = self._by_cat.get(cid)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_cat[cid]
+
+    def invalidate(self, cat_ids: Optional[Iterable[str]] = None) -> None:
+        with self._lock:
+            if cat_ids is None:
+                self._data.clear()
+                self._by_cat.clear()
+                return
+            for cid in set(cat_ids):
+                for key in list(self._by_cat.get(cid, ())):
+                    self._drop(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._data),
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+# ----------------- forecast_expenses -----------------
+# Прогноз без леджера: расходы категории // period, как и раньше — вместе
+# с удалёнными транзакциями (так же считают sum_expenses_recursive и
+# check_budget). Считается тем же frp.ForecastView, что и ledger.forecasts;
+# в леджере удалённые строки не учитываются. Представление строится один раз
+# на кортеж транзакций (по identity); для списка — на каждый вызов.
+_VIEWS: "OrderedDict[int, tuple]" = OrderedDict()
+_VIEWS_MAX = 8
+_VIEWS_LOCK = threading.Lock()
+
+def _forecast_view(trans):
+    from .frp import ForecastView, MonthlyCategoryView   # frp импортирует memo
+    if not _immutable(trans):
+        instrument.rows("memo.forecast_expenses", trans)
+        return ForecastView(MonthlyCategoryView(trans, include_deleted=True))
+    with _VIEWS_LOCK:
+        hit = _VIEWS.get(id(trans))
+        if hit is not None and hit[0] is trans:
+            _VIEWS.move_to_end(id(trans))
+            return hit[1]
+    instrument.rows("memo.forecast_expenses", trans)
+    view = ForecastView(MonthlyCategoryView(trans, include_deleted=True))
+    with _VIEWS_LOCK:
+        _VIEWS[id(trans)] = (trans, view)
+        while len(_VIEWS) > _VIEWS_MAX:
+            _VIEWS.popitem(last=False)
+    return view
+
+@instrument.timed()
 def forecast_expenses(cat_id: str, trans: Tuple[Transaction, ...], period: int) -> int:
-    def rec_sum(values):
-        if not values:
-            return 0
-        if len(values) == 1:
-            return abs(values[0])
-        return abs(values[0]) + rec_sum(values[1:])
-
-    relevant = [t.amount for t in trans if t.cat_id == cat_id and t.amount < 0]
-    if not relevant:
-        return 0
-    total = rec_sum(relevant)
-    avg = total // max(1, period)
-    return int(avg)
+    return _forecast_view(trans).forecast(cat_id, period)
 
 def forecast_expenses_timed(cat_id: str, trans: Tuple[Transaction, ...], period: int):
     t0 = time.perf_counter()
     val = forecast_expenses(cat_id, trans, period)
     t1 = time.perf_counter()
-    return val, (t1 - t0) * 1000.0
\ No newline at end of file
+    return val, (t1 - t0) * 1000.0
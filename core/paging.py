@@ -0,0 +1,128 @@
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from heapq import merge
+from typing import Iterable, List, Optional, Sequence, Tuple
+from core.domain import Transaction
+
+# ----------------- Keyset pagination -----------------
+# Транзакции отсортированы по ключу (ts, id). Страница — bisect по курсору
+# (ключ последней/первой строки предыдущей страницы) и срез размера size:
+# стоимость не зависит от номера страницы, а вставка новой строки не сдвигает
+# уже открытую страницу, как это бывает с OFFSET. total — длина индекса.
+#   page = index.page(size=50)                   — самые новые
+#   index.page(after=page.next, size=50)         — следующая (старше)
+#   index.page(before=page.prev, size=50)        — предыдущая (новее)
+
+Cursor = Tuple[str, str]
+
+
+def tx_key(t: Transaction) -> Cursor:
+    return (t.ts, t.id)
+
+
+@dataclass(frozen=True, slots=True)
+class Page:
+    items: Tuple[Transaction, ...]
+    total: int
+    offset: int                    # номер первой строки страницы в выбранном порядке
+    next: Optional[Cursor] = None  # курсор следующей страницы (None — дальше пусто)
+    prev: Optional[Cursor] = None  # курсор предыдущей страницы
+
+
+class KeysetIndex:
+    def __init__(self, trans: Iterable[Transaction] = ()):
+        self.trans: List[Transaction] = sorted(trans, key=tx_key)
+        self.keys: List[Cursor] = [tx_key(t) for t in self.trans]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    # ---------- queries ----------
+    def page(self, after: Optional[Cursor] = None, before: Optional[Cursor] = None,
+             size: int = 50, descending: bool = True) -> Page:
+        # after/before — курсоры в порядке выдачи; descending=True — новые сначала
+        n = len(self.keys)
+        if descending:
+            # порядок выдачи обратный: "после" курсора — ключи меньше него
+            if before is not None:
+                lo = bisect_right(self.keys, tuple(before))
+                hi = min(n, lo + size)
+            else:
+                hi = n if after is None else bisect_left(self.keys, tuple(after))
+                lo = max(0, hi - size)
+            items = tuple(reversed(self.trans[lo:hi]))
+            offset = n - hi
+            has_next, has_prev = lo > 0, hi < n
+        else:
+            if before is not None:
+                hi = bisect_left(self.keys, tuple(before))
+                lo = max(0, hi - size)
+            else:
+                lo = 0 if after is None else bisect_right(self.keys, tuple(after))
+                hi = min(n, lo + size)
+            items = tuple(self.trans[lo:hi])
+            offset = lo
+            has_next, has_prev = hi < n, lo > 0
+        return Page(
+            items=items,
+            total=n,
+            offset=offset,
+            next=tx_key(items[-1]) if items and has_next else None,
+            prev=tx_key(items[0]) if items and has_prev else None,
+        )
+
+    # ---------- updates ----------
+    def add(self, t: Transaction, pos: Optional[int] = None) -> None:
+        key = tx_key(t)
+        if not self.keys or key >= self.keys[-1]:
+            self.keys.append(key)
+            self.trans.append(t)
+        else:
+            i = bisect_right(self.keys, key)
+            self.keys.insert(i, key)
+            self.trans.insert(i, t)
+
+    def add_many(self, trans: Iterable[Transaction], pos: Optional[int] = None) -> None:
+        # пачка: одно слияние отсортированной пачки с хвостом индекса
+        batch = sorted(trans, key=tx_key)
+        if not batch:
+            return
+        lo = bisect_right(self.keys, tx_key(batch[0]))
+        tail = list(merge(self.trans[lo:], batch, key=tx_key))
+        self.trans[lo:] = tail
+        self.keys[lo:] = [tx_key(t) for t in tail]
+
+    def update(self, old: Transaction, t: Transaction,
+               pos: Optional[int] = None) -> None:
+        # замена на месте (мягкое удаление); при смене ключа — переставляем
+        i = bisect_left(self.keys, tx_key(old))
+        if i < len(self.keys) and self.keys[i] == tx_key(old):
+            if tx_key(t) == self.keys[i]:
+                self.trans[i] = t
+                return
+            del self.keys[i]
+            del self.trans[i]
+        self.add(t)
+
+
+# ---------- per-selection cache ----------
+# Выборки пользователя (OwnershipIndex.visible/own) — кортежи, identity которых
+# меняется только при изменении выборки: индекс строится один раз на версию.
+_INDEXES: "OrderedDict[int, Tuple[object, KeysetIndex]]" = OrderedDict()
+_INDEXES_MAX = 32
+_INDEXES_LOCK = threading.Lock()
+
+def keyset_index(trans: Sequence[Transaction]) -> KeysetIndex:
+    with _INDEXES_LOCK:
+        hit = _INDEXES.get(id(trans))
+        if hit is not None and hit[0] is trans:
+            _INDEXES.move_to_end(id(trans))
+            return hit[1]
+    index = KeysetIndex(trans)
+    with _INDEXES_LOCK:
+        _INDEXES[id(trans)] = (trans, index)
+        while len(_INDEXES) > _INDEXES_MAX:
+            _INDEXES.popitem(last=False)
+    return index
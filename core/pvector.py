@@ -0,0 +1,147 @@
+from collections.abc import Sequence
+from typing import Iterable, Iterator, Tuple
+
+# ----------------- Persistent vector -----------------
+# Неизменяемый вектор со структурным разделением (32-арное дерево + хвост,
+# как PersistentVector в Clojure). append и set возвращают новый вектор,
+# копируя только путь от корня — O(log32 N); остальные узлы общие со старой
+# версией. Узлы — кортежи, поэтому старые версии никогда не меняются.
+
+BITS = 5
+WIDTH = 1 << BITS
+MASK = WIDTH - 1
+
+
+def _new_path(level: int, node: tuple) -> tuple:
+    while level > 0:
+        node = (node,)
+        level -= BITS
+    return node
+
+
+class PVector(Sequence):
+    __slots__ = ("_count", "_shift", "_root", "_tail")
+
+    def __init__(self, items: Iterable = ()):
+        items = items if isinstance(items, (list, tuple)) else list(items)
+        n = len(items)
+        tailoff = ((n - 1) >> BITS) << BITS if n else 0
+        nodes = [tuple(items[i:i + WIDTH]) for i in range(0, tailoff, WIDTH)]
+        shift = BITS
+        while len(nodes) > WIDTH:
+            nodes = [tuple(nodes[i:i + WIDTH]) for i in range(0, len(nodes), WIDTH)]
+            shift += BITS
+        self._count = n
+        self._shift = shift
+        self._root: tuple = tuple(nodes)
+        self._tail: tuple = tuple(items[tailoff:])
+
+    @staticmethod
+    def _make(count: int, shift: int, root: tuple, tail: tuple) -> 'PVector':
+        v = PVector.__new__(PVector)
+        v._count, v._shift, v._root, v._tail = count, shift, root, tail
+        return v
+
+    def _tailoff(self) -> int:
+        return self._count - len(self._tail)
+
+    # ---------- read ----------
+    def __len__(self) -> int:
+        return self._count
+
+    def _get(self, i: int):
+        if i >= self._tailoff():
+            return self._tail[i - self._tailoff()]
+        node = self._root
+        level = self._shift
+        while level > 0:
+            node = node[(i >> level) & MASK]
+            level -= BITS
+        return node[i & MASK]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return tuple(self._get(j) for j in range(*i.indices(self._count)))
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("PVector index out of range")
+        return self._get(i)
+
+    def _leaves(self) -> Iterator[tuple]:
+        stack = [(self._root, self._shift)]
+        while stack:
+            node, level = stack.pop()
+            if level == 0:
+                yield node
+            else:
+                stack.extend((child, level - BITS) for child in reversed(node))
+
+    def __iter__(self) -> Iterator:
+        for leaf in self._leaves():
+            yield from leaf
+        yield from self._tail
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (PVector, tuple, list)):
+            return NotImplemented
+        return len(other) == self._count and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"PVector({list(self)!r})"
+
+    # ---------- persistent updates ----------
+    def append(self, value) -> 'PVector':
+        if len(self._tail) < WIDTH:
+            return PVector._make(self._count + 1, self._shift, self._root,
+                                 self._tail + (value,))
+        # хвост полон: переносим его в дерево
+        shift = self._shift
+        if (self._count >> BITS) > (1 << shift):
+            root = (self._root, _new_path(shift, self._tail))
+            shift += BITS
+        else:
+            root = self._push_tail(shift, self._root, self._tail)
+        return PVector._make(self._count + 1, shift, root, (value,))
+
+    def _push_tail(self, level: int, parent: tuple, tail: tuple) -> tuple:
+        sub = ((self._count - 1) >> level) & MASK
+        if level == BITS:
+            node = tail
+        elif sub < len(parent):
+            node = self._push_tail(level - BITS, parent[sub], tail)
+        else:
+            node = _new_path(level - BITS, tail)
+        return parent[:sub] + (node,) + parent[sub + 1:]
+
+    def set(self, i: int, value) -> 'PVector':
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("PVector index out of range")
+        off = self._tailoff()
+        if i >= off:
+            j = i - off
+            tail = self._tail[:j] + (value,) + self._tail[j + 1:]
+            return PVector._make(self._count, self._shift, self._root, tail)
+        root = self._assoc(self._shift, self._root, i, value)
+        return PVector._make(self._count, self._shift, root, self._tail)
+
+    def _assoc(self, level: int, node: tuple, i: int, value) -> tuple:
+        if level == 0:
+            j = i & MASK
+            return node[:j] + (value,) + node[j + 1:]
+        sub = (i >> level) & MASK
+        child = self._assoc(level - BITS, node[sub], i, value)
+        return node[:sub] + (child,) + node[sub + 1:]
+
+    def extend(self, values: Iterable) -> 'PVector':
+        v = self
+        for x in values:
+            v = v.append(x)
+        return v
+
+    def to_tuple(self) -> Tuple:
+        return tuple(self)
@@ -1,62 +1,64 @@
+from datetime import date
 from typing import Tuple
 from .domain import Category, Transaction
+from .aggregate import total
+from .tree import category_tree
+from .textindex import note_matches, tokenize
+from .transforms import parse_ts
+from . import instrument
+
+def _describe(pred, kind: str, *args):
+    # metadata lets core.lazy.Query recognize the closure and use an index
+    pred.kind = kind
+    pred.args = args
+    return pred
 
 def by_category(cat_id: str):
     # closure returning predicate
-    return lambda t: t.cat_id == cat_id
+    return _describe(lambda t: t.cat_id == cat_id, "category", cat_id)
 
 def by_date_range(start: str, end: str):
-    return lambda t: start <= t.ts <= end
-
-def by_amount_range(min_a: int, max_a: int):
-    return lambda t: min_a <= t.amount <= max_a
-from typing import Tuple
-from core.domain import Category
+    return _describe(lambda t: start <= t.ts <= end, "date_range", start, end)
 
-def flatten_categories(cats: Tuple[Category, ...], root: str) -> Tuple[Category, ...]:
-    lookup = {c.id: c for c in cats}
-    children = {}
-    for c in cats:
-        children.setdefault(c.parent_id, []).append(c)
-
-    result = []
+def by_day_range(start: date, end: date):
+    # calendar days as written in ts (parse_ts(ts).date(), no time zone shift),
+    # both ends inclusive: date-only, fractional and offset timestamps count
+    def pred(t):
+        dt = parse_ts(t.ts)
+        return dt is not None and start <= dt.date() <= end
+    return _describe(pred, "date_range", start, end)
 
-    def dfs(cid):
-        for child in children.get(cid, []):
-            result.append(child)
-            dfs(child.id)
+def by_amount_range(min_a: int, max_a: int):
+    return _describe(lambda t: min_a <= t.amount <= max_a, "amount_range", min_a, max_a)
 
-    if root == "null":
-        # создаём виртуальный корень
-        virtual_root = Category(id="null", name="Root", parent_id=None, type="virtual")
-        result.append(virtual_root)
-        # добавляем все категории без родителя
-        for c in cats:
-            if c.parent_id in (None, "null", ""):
-                result.append(c)
-                dfs(c.id)
-    elif root in lookup:
-        result.append(lookup[root])
-        dfs(root)
-    else:
-        dfs(root)
+def by_note(text: str, prefix: bool = False):
+    # all words of the query in the note (live rows only, same as NoteIndex.search)
+    terms = tokenize(text)
+    return _describe(lambda t: (bool(terms) and not t.deleted
+                                and note_matches(t.note, terms, prefix)),
+                     "note", text, prefix)
 
-    return tuple(result)
 
+@instrument.timed()
+def flatten_categories(cats: Tuple[Category, ...], root: str) -> Tuple[Category, ...]:
+    # preorder slice of the prebuilt tree index (no per-call dfs, no recursion limit)
+    return category_tree(cats).flatten(root)
 
 
+@instrument.timed()
 def sum_expenses_recursive(cats: Tuple[Category, ...], trans: Tuple[Transaction, ...], root_id: str) -> int:
-    # collects ids recursively and sums negative amounts
-    flat = flatten_categories(cats, root_id)
-    ids = {c.id for c in flat}
-    ids.add(root_id)
-    # recursion to sum by splitting set into head/tail (demonstrative recursion)
-    related = [t.amount for t in trans if t.cat_id in ids and t.amount < 0]
-
-    def rec(lst):
-        if not lst:
-            return 0
-        if len(lst) == 1:
-            return lst[0]
-        return lst[0] + rec(lst[1:])
-    return rec(related)
\ No newline at end of file
+    # subtree membership is an O(1) interval check on the tree index
+    instrument.rows("recursion.sum_expenses_recursive", trans)
+    tree = category_tree(cats)
+    if root_id != "null" and root_id not in tree.tin:
+        # root is not a category: children of a missing parent
+        ids = {c.id for c in tree.flatten(root_id)}
+        ids.add(root_id)
+        return total([t.amount for t in trans if t.cat_id in ids and t.amount < 0])
+    lo, hi = tree.span(root_id)
+    tin = tree.tin
+    related = [
+        t.amount for t in trans
+        if t.amount < 0 and (t.cat_id == root_id or lo <= tin.get(t.cat_id, -1) < hi)
+    ]
+    return total(related)
@@ -0,0 +1,367 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Collection, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from core.domain import Transaction
+from core import instrument
+from core.transforms import ts_month
+from core.tree import ROOT, CategoryTree
+
+# ----------------- Report cube -----------------
+# Материализованный куб (категория × месяц × счёт × пользователь) за один
+# проход по леджеру. Ячейка хранит сумму и сумму расходов (по модулю);
+# удалённые транзакции не учитываются. Любой срез (последние N месяцев,
+# поддерево категорий, отдельные счета/пользователи) — перебор ячеек
+# нужных категорий, без обхода транзакций. Леджер держит свой куб и
+# обновляет его по событиям (add / replace); для произвольной
+# последовательности — report_cube() с кэшем по identity.
+
+Month = Tuple[int, int]
+Cell = Tuple[str, Month, str, str]  # (cat_id, month, account_id, user_id)
+
+
+def shift_month(month: Month, n: int) -> Month:
+    k = month[0] * 12 + month[1] - 1 + n
+    return k // 12, k % 12 + 1
+
+
+class ReportCube:
+    def __init__(self, trans: Iterable[Transaction] = ()):
+        self.sums: Dict[Cell, int] = {}
+        self.spent: Dict[Cell, int] = {}
+        self.rows = 0
+        self._counts: Dict[Cell, int] = {}
+        self._month_counts: Dict[Month, int] = {}
+        self._months: Optional[Tuple[Month, ...]] = None
+        self._by_cat: Dict[str, List[Cell]] = {}
+        for t in trans:
+            self._apply(t, 1)
+
+    # ---------- updates ----------
+    def _apply(self, t: Transaction, sign: int) -> None:
+        if t.deleted:
+            return
+        m = ts_month(t.ts)
+        if m is None:
+            return
+        key = (t.cat_id, m, t.account_id, t.user_id)
+        n = self._counts.get(key, 0) + sign
+        if n:
+            if key not in self._counts:
+                self._by_cat.setdefault(t.cat_id, []).append(key)
+            self._counts[key] = n
+            self.sums[key] = self.sums.get(key, 0) + sign * t.amount
+            if t.amount < 0:
+                self.spent[key] = self.spent.get(key, 0) - sign * t.amount
+        else:
+            # в ячейке не осталось транзакций — убираем её
+            del self._counts[key]
+            self.sums.pop(key, None)
+            self.spent.pop(key, None)
+            self._by_cat[t.cat_id].remove(key)
+        mc = self._month_counts.get(m, 0) + sign
+        if mc:
+            self._month_counts[m] = mc
+        else:
+            del self._month_counts[m]
+        if (mc == 1 and sign > 0) or not mc:
+            self._months = None
+        self.rows += sign
+
+    def add(self, t: Transaction, pos: int = 0) -> None:
+        self._apply(t, 1)
+
+    def replace(self, old: Transaction, t: Transaction, pos: int = 0) -> None:
+        self._apply(old, -1)
+        self._apply(t, 1)
+
+    @property
+    def months(self) -> Tuple[Month, ...]:
+        if self._months is None:
+            self._months = tuple(sorted(self._month_counts))
+        return self._months
+
+    # ---------- slices ----------
+    def last_months(self, n: int) -> Tuple[Month, ...]:
+        # N календарных месяцев до последнего месяца с данными (включительно)
+        if not self.months or n <= 0:
+            return ()
+        last = self.months[-1]
+        return tuple(shift_month(last, -i) for i in range(n - 1, -1, -1))
+
+    def _cats(self, cat_id: Optional[str],
+              tree: Optional[CategoryTree]) -> Iterable[str]:
+        if cat_id is None:
+            return list(self._by_cat)
+        if tree is not None:
+            return [c.id for c in tree.flatten(cat_id)]
+        return (cat_id,)
+
+    def cells(self, cat_id: Optional[str] = None, tree: Optional[CategoryTree] = None,
+              months: Optional[Collection[Month]] = None,
+              accounts: Optional[Collection[str]] = None,
+              users: Optional[Collection[str]] = None) -> Iterable[Cell]:
+        # tree — учитывать поддерево cat_id
+        for c in self._cats(cat_id, tree):
+            for key in tuple(self._by_cat.get(c, ())):
+                if months is not None and key[1] not in months:
+                    continue
+                if accounts is not None and key[2] not in accounts:
+                    continue
+                if users is not None and key[3] not in users:
+                    continue
+                yield key
+
+    @instrument.timed("report.cube.monthly")
+    def monthly(self, cat_id: Optional[str] = None, last: Optional[int] = None,
+                expenses_only: bool = False, **filters) -> "OrderedDict[Month, int]":
+        # (год, месяц) -> сумма по срезу; с last — ровно N месяцев, пустые = 0
+        source = self.spent if expenses_only else self.sums
+        window = self.last_months(last) if last else None
+        out: Dict[Month, int] = dict.fromkeys(window, 0) if window else {}
+        months = set(window) if window else None
+        for key in self.cells(cat_id, months=months, **filters):
+            out[key[1]] = out.get(key[1], 0) + source.get(key, 0)
+        return OrderedDict(sorted(out.items()))
+
+    @instrument.timed("report.cube.total")
+    def total(self, cat_id: Optional[str] = None, expenses_only: bool = False,
+              **filters) -> int:
+        source = self.spent if expenses_only else self.sums
+        return sum(source.get(key, 0) for key in self.cells(cat_id, **filters))
+
+    @instrument.timed("report.cube.by")
+    def by(self, dim: str, cat_id: Optional[str] = None, expenses_only: bool = False,
+           **filters) -> Dict:
+        # разрез по одному измерению: "cat" | "month" | "account" | "user"
+        i = {"cat": 0, "month": 1, "account": 2, "user": 3}[dim]
+        source = self.spent if expenses_only else self.sums
+        out: Dict = {}
+        for key in self.cells(cat_id, **filters):
+            out[key[i]] = out.get(key[i], 0) + source.get(key, 0)
+        return out
+
+    @instrument.timed("report.cube.rollup")
+    def rollup(self, tree: CategoryTree, expenses_only: bool = True,
+               **filters) -> Dict[str, int]:
+        # суммы по поддеревьям для всех категорий, как CategoryTree.rollup
+        # (расходы со знаком минус)
+        own = self.by("cat", expenses_only=expenses_only, **filters)
+        if expenses_only:
+            own = {c: -v for c, v in own.items()}
+        totals = {c.id: own.get(c.id, 0) for c in tree.order}
+        totals[ROOT] = 0
+        for c in reversed(tree.order):
+            p = tree.parent.get(c.id)
+            if p in totals:
+                totals[p] += totals[c.id]
+        return totals
+
+
+_CUBES: "OrderedDict[int, Tuple[object, ReportCube]]" = OrderedDict()
+_CUBES_MAX = 8
+_CUBES_LOCK = threading.Lock()
+
+def report_cube(trans) -> ReportCube:
+    # один куб на версию леджера: PVector/кортеж меняет identity при каждом изменении
+    with _CUBES_LOCK:
+        hit = _CUBES.get(id(trans))
+        if hit is not None and hit[0] is trans:
+            _CUBES.move_to_end(id(trans))
+            return hit[1]
+    cube = ReportCube(trans)
+    with _CUBES_LOCK:
+        _CUBES[id(trans)] = (trans, cube)
+        while len(_CUBES) > _CUBES_MAX:
+            _CUBES.popitem(last=False)
+    return cube
+
+
+# ----------------- Batch reports -----------------
+# python -m core.report --all-users [--out reports] [--format json|csv] [--workers N]
+# Леджер (seed.json + журнал) один раз пишется в бинарный снапшот; воркеры
+# пула процессов отображают его в память (mmap — общие страницы, без
+# пересылки данных), берут транзакции счетов своего пользователя и пишут
+# отчёт в отдельный файл. Строки по счетам группируются один раз в run_batch,
+# задача получает номера строк своего пользователя. Результаты отдаются по
+# мере готовности.
+
+_MAPPED: Dict[str, object] = {}
+
+def _mapped(snap_path: str):
+    # один mmap на процесс-воркер
+    from core.snapshot import MappedSnapshot
+    snap = _MAPPED.get(snap_path)
+    if snap is None:
+        snap = _MAPPED[snap_path] = MappedSnapshot(snap_path)
+    return snap
+
+
+def _account_rows(frame, account_ids: Iterable[str]) -> List[int]:
+    # номера строк счетов по колонке frame — для вызова без готовой группировки
+    return sorted(int(i) for a in account_ids for i in frame.indices(account_id=a))
+
+
+def _partition(snap, rows: Sequence[int]) -> Tuple[Transaction, ...]:
+    return tuple(snap.frame.take(rows).to_transactions())
+
+
+def build_user_report(snap, username: str, as_of: Optional[datetime] = None,
+                      window: int = 3, rows: Optional[Sequence[int]] = None) -> dict:
+    # rows — номера строк пользователя в снапшоте, если уже известны
+    from core.balances import BalanceIndex
+    from core.budgets import BudgetEngine
+    from core.forecast import forecast_table
+    from core.tree import category_tree
+
+    accounts = [a for a in snap.accounts() if a.user_id == username]
+    if rows is None:
+        rows = _account_rows(snap.frame, [a.id for a in accounts])
+    trans = _partition(snap, rows)
+    index = BalanceIndex.build(trans)
+    budgets = BudgetEngine(snap.budgets(), trans, as_of)
+    cube = ReportCube(trans)
+    rollup = cube.rollup(category_tree(snap.categories()))
+    return {
+        "user": username,
+        "transactions": len(trans),
+        "balances": {a.id: a.balance + index.balance(a.id) for a in accounts},
+        "budgets": {b.id: {"cat_id": b.cat_id, "period": b.period,
+                           "spent": budgets.spent[i], "limit": b.limit,
+                           "over": budgets.spent[i] > b.limit}
+                    for i, b in enumerate(budgets.budgets)},
+        "rollup": {c: v for c, v in rollup.items() if v},
+        "forecasts": forecast_table(cube, window=window),
+    }
+
+
+def write_report(report: dict, path: str, fmt: str = "json") -> None:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if fmt == "json":
+            json.dump(report, f, ensure_ascii=False, indent=2)
+            return
+        # csv — длинный формат: section, key, metric, value
+        w = csv.writer(f)
+        w.writerow(["section", "key", "metric", "value"])
+        for acc, v in report["balances"].items():
+            w.writerow(["balance", acc, "balance", v])
+        for bid, b in report["budgets"].items():
+            for metric in ("spent", "limit", "over"):
+                w.writerow(["budget", bid, metric, b[metric]])
+        for cat, v in report["rollup"].items():
+            w.writerow(["rollup", cat, "expenses", v])
+        for row in report["forecasts"]:
+            for metric, v in row.items():
+                if metric != "cat_id":
+                    w.writerow(["forecast", row["cat_id"], metric, v])
+
+
+def report_path(out_dir: str, username: str, fmt: str) -> str:
+    # имя пользователя становится именем файла: только «голое» имя, без
+    # каталогов, "..", скрытых файлов и NUL — иначе отчёт ушёл бы из out_dir
+    if (not username or username.startswith(".") or "\0" in username
+            or "/" in username or "\\" in username
+            or os.path.basename(username) != username):
+        raise ValueError(f"unsafe user name for a report file: {username!r}")
+    return os.path.join(out_dir, f"{username}.{fmt}")
+
+
+def _user_task(args) -> dict:
+    # верхний уровень модуля — чтобы функцию можно было отправить в процесс
+    snap_path, username, rows, out_dir, fmt, as_of, window = args
+    started = time.perf_counter()
+    report = build_user_report(_mapped(snap_path), username,
+                               datetime.fromisoformat(as_of) if as_of else None, window,
+                               rows)
+    path = report_path(out_dir, username, fmt)
+    write_report(report, path, fmt)
+    return {"user": username, "path": path, "transactions": report["transactions"],
+            "seconds": round(time.perf_counter() - started, 4)}
+
+
+def run_batch(seed_path: str, out_dir: str, users: Optional[Sequence[str]] = None,
+              fmt: str = "json", workers: Optional[int] = None,
+              as_of: Optional[datetime] = None, window: int = 3) -> Iterator[dict]:
+    # workers=0 — всё в текущем процессе
+    from dataclasses import asdict
+    from core.service import load_ledger
+    from core.snapshot import write_snapshot
+
+    accounts, _, trans, _ = load_ledger(seed_path)
+    users = sorted({a.user_id for a in accounts}) if users is None else list(users)
+    for u in users:
+        report_path(out_dir, u, fmt)   # ValueError — до любой записи
+    os.makedirs(out_dir, exist_ok=True)
+    with open(seed_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    data["transactions"] = [asdict(t) for t in trans]
+    snap_path = os.path.join(out_dir, ".ledger.snap")
+    write_snapshot(data, snap_path)
+    del data
+
+    # строки снапшота (в порядке леджера) по счетам — один проход на все задачи
+    by_account: Dict[str, List[int]] = {}
+    for i, t in enumerate(trans):
+        by_account.setdefault(t.account_id, []).append(i)
+    owned: Dict[str, List[str]] = {}
+    for a in accounts:
+        owned.setdefault(a.user_id, []).append(a.id)
+
+    def rows_of(user: str) -> List[int]:
+        return sorted(i for a in owned.get(user, ()) for i in by_account.get(a, ()))
+
+    stamp = as_of.isoformat() if as_of else None
+    tasks = [(snap_path, u, rows_of(u), out_dir, fmt, stamp, window) for u in users]
+    try:
+        if workers == 0:
+            for task in tasks:
+                yield _user_task(task)
+            return
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for fut in as_completed([pool.submit(_user_task, t) for t in tasks]):
+                yield fut.result()
+    finally:
+        snap = _MAPPED.pop(snap_path, None)
+        if snap is not None:
+            snap.close()
+        os.remove(snap_path)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    p = argparse.ArgumentParser(prog="python -m core.report",
+                                description="Batch per-user reports")
+    who = p.add_mutually_exclusive_group(required=True)
+    who.add_argument("--all-users", action="store_true")
+    who.add_argument("--user", action="append", dest="users")
+    p.add_argument("--seed", default=os.path.join(root, "data", "seed.json"))
+    p.add_argument("--out", default="reports")
+    p.add_argument("--format", choices=("json", "csv"), default="json")
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--window", type=int, default=3)
+    args = p.parse_args(argv)
+
+    started = time.perf_counter()
+    n = 0
+    batch = run_batch(args.seed, args.out, None if args.all_users else args.users,
+                      args.format, args.workers, window=args.window)
+    try:
+        for done in batch:
+            n += 1
+            print(json.dumps(done, ensure_ascii=False), flush=True)
+    except ValueError as e:
+        p.error(str(e))
+    seconds = round(time.perf_counter() - started, 3)
+    print(json.dumps({"users": n, "seconds": seconds}), flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
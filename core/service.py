@@ -0,0 +1,547 @@
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from dataclasses import asdict, replace
+from typing import Callable, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+from core.domain import Event, Transaction, User
+from core.transforms import file_version, interned
+from core.memo import LedgerSnapshot
+from core.pvector import PVector
+from core.balances import BalanceIndex
+from core.timeline import Timeline
+from core.access import OwnershipIndex
+from core.budgets import BudgetEngine
+from core.frp import (EventStream, ForecastView, MonthlyCategoryView, TX_ADDED,
+                      TX_BATCH, on_tx, replace_event)
+from core.textindex import NoteIndex
+from core.paging import KeysetIndex, keyset_index
+from core.report import ReportCube
+from core.snapshot import (is_fresh, json_to_snapshot, load_base, snapshot_path_for,
+                           write_snapshot)
+
+try:
+    import fcntl
+except ImportError:  # не POSIX: журнал защищён только от потоков своего процесса
+    fcntl = None
+
+# ----------------- Journal -----------------
+# Каждая запись — одна строка JSONL:
+#   {"seq": 1, "op": "add", "tx": {...}}
+#   {"seq": 2, "op": "delete", "id": "t001"}
+# Запись O(1): дописываем строку в конец файла, fsync делаем пачками.
+# Журнал могут дописывать несколько процессов: запись, обрезка и сжатие идут
+# под блокировкой <журнал>.lock (fcntl.lockf). Взяв её, журнал сверяется с
+# диском: файл заменён (сжатие в другом процессе) — открываем заново, файл
+# вырос (чужие записи) — досчитываем count и seq по новому хвосту. Так seq
+# в файле не повторяются, а запись не уходит в удалённый inode.
+# Открытый журнал держит разделяемую блокировку владельца (второй байт .lock);
+# exclusive=True требует, чтобы журнал не был открыт ни одним другим
+# процессом (так работает консольный импорт), иначе — JournalBusy.
+
+class JournalBusy(RuntimeError):
+    pass
+
+
+class Journal:
+    def __init__(self, path: str, sync_every: int = 32, sync_interval: float = 1.0,
+                 exclusive: bool = False):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self.seq = self.count = 0
+        self.external = 0  # сколько раз файл менял другой процесс
+        self._f = None
+        self._lockf = open(path + ".lock", "a+b")
+        if fcntl is not None:
+            # разделяемая ждёт, пока журнал держит эксклюзивный владелец
+            mode = fcntl.LOCK_EX | fcntl.LOCK_NB if exclusive else fcntl.LOCK_SH
+            try:
+                fcntl.lockf(self._lockf, mode, 1, 1)
+            except OSError:
+                self._lockf.close()
+                raise JournalBusy(f"{path} is open in another process")
+        with self.locked():
+            _drop_torn_tail(path)
+            self._open()
+
+    def _open(self) -> None:
+        # (пере)открытие файла журнала и пересчёт count/seq по всему файлу
+        if self._f is not None:
+            self._f.close()
+        self._f = open(self.path, "a", encoding="utf-8")
+        entries = list(read_journal(self.path))
+        self.count = len(entries)
+        if entries:
+            self.seq = max(self.seq, entries[-1].get("seq", len(entries)))
+        st = os.fstat(self._f.fileno())
+        self._seen = (st.st_ino, st.st_size)
+
+    def _sync(self) -> None:
+        # под блокировкой: догоняем изменения файла другими процессами
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            st = None
+        if st is None or st.st_ino != self._seen[0]:
+            self.external += 1
+            self._open()
+            return
+        seen = self._seen[1]
+        if st.st_size == seen:
+            return
+        self.external += 1
+        with open(self.path, "rb+") as f:
+            f.seek(seen)
+            data = f.read()
+            if not data.endswith(b"\n"):
+                # чужой процесс упал посреди строки — обрезаем её
+                data = data[:data.rfind(b"\n") + 1]
+                f.truncate(seen + len(data))
+        entries = list(parse_entries(data))
+        self.count += len(entries)
+        if entries:
+            self.seq = max(self.seq, entries[-1].get("seq", self.seq))
+        self._seen = (st.st_ino, seen + len(data))
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        # межпроцессная блокировка; вложенный вход того же потока её не трогает
+        with self._lock:
+            if self._depth == 0:
+                if fcntl is not None:
+                    fcntl.lockf(self._lockf, fcntl.LOCK_EX, 1, 0)
+                if self._f is not None and not self._f.closed:
+                    self._sync()
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0 and fcntl is not None:
+                    fcntl.lockf(self._lockf, fcntl.LOCK_UN, 1, 0)
+
+    def changed(self) -> bool:
+        # журнал дописал или заменил другой процесс после нашей последней сверки
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return True
+        return (st.st_ino, st.st_size) != self._seen
+
+    def _write(self, entries: Iterable[dict]) -> int:
+        # несколько записей — одним write в файл
+        with self.locked():
+            lines = []
+            for entry in entries:
+                self.seq += 1
+                entry = {"seq": self.seq, **entry}
+                lines.append(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._f.write("".join(lines))
+            self._pending += len(lines)
+            self.count += len(lines)
+            if (self._pending >= self.sync_every
+                    or time.monotonic() - self._last_sync >= self.sync_interval):
+                self.flush()
+            else:
+                self._f.flush()
+            self._seen = (self._seen[0], os.fstat(self._f.fileno()).st_size)
+            return self.seq
+
+    def append_add(self, t: Transaction) -> int:
+        return self._write([{"op": "add", "tx": asdict(t)}])
+
+    def append_many(self, trans: Iterable[Transaction]) -> int:
+        return self._write({"op": "add", "tx": asdict(t)} for t in trans)
+
+    def append_delete(self, tx_id: str) -> int:
+        return self._write([{"op": "delete", "id": tx_id}])
+
+    def flush(self) -> None:
+        with self._lock:
+            self._f.flush()
+            os.fsync(self._f.fileno())
+            self._pending = 0
+            self._last_sync = time.monotonic()
+
+    def replay(self, upto: Optional[int] = None) -> Iterator[dict]:
+        return read_journal(self.path, upto)
+
+    def size(self) -> int:
+        with self._lock:
+            self._f.flush()
+            return self._f.tell()
+
+    def truncate_head(self, offset: int) -> None:
+        # убираем из журнала всё, что уже попало в снапшот
+        with self.locked():
+            self.flush()
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                tail = f.read()
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(tail)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            self._open()
+
+    @property
+    def closed(self) -> bool:
+        return self._f.closed
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._f.closed:
+                self.flush()
+                self._f.close()
+                self._lockf.close()
+
+
+def _drop_torn_tail(path: str) -> None:
+    # обрезаем недописанную строку, чтобы новые записи не склеились с ней
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+def read_journal(path: str, upto: Optional[int] = None) -> Iterator[dict]:
+    # upto — смещение в байтах, до которого читать журнал
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        data = f.read() if upto is None else f.read(upto)
+    yield from parse_entries(data)
+
+
+def parse_entries(data: bytes) -> Iterator[dict]:
+    for line in data.splitlines():
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            # недописанная последняя строка после сбоя — пропускаем
+            continue
+
+
+def apply_entries(trans: Tuple[Transaction, ...], entries) -> Tuple[Transaction, ...]:
+    result = list(trans)
+    pos: Dict[str, int] = {t.id: i for i, t in enumerate(result)}
+    for e in entries:
+        op = e.get("op")
+        if op == "add":
+            t = interned(Transaction, e["tx"])
+            if t.id in pos:
+                result[pos[t.id]] = t
+            else:
+                pos[t.id] = len(result)
+                result.append(t)
+        elif op == "delete" and e.get("id") in pos:
+            i = pos[e["id"]]
+            result[i] = replace(result[i], deleted=True)
+    return tuple(result)
+
+
+def journal_path_for(seed_path: str) -> str:
+    root, _ = os.path.splitext(seed_path)
+    return root + ".journal.jsonl"
+
+
+def load_ledger(seed_path: str, journal_path: Optional[str] = None):
+    # базовый снапшот + журнал поверх него
+    journal_path = journal_path or journal_path_for(seed_path)
+    accounts, categories, transactions, budgets = load_base(seed_path)
+    if os.path.exists(journal_path):
+        transactions = apply_entries(transactions, read_journal(journal_path))
+    return accounts, categories, transactions, budgets
+
+
+# ----------------- Compaction -----------------
+_JOURNALS: Dict[str, Journal] = {}
+_JOURNALS_LOCK = threading.Lock()
+_COMPACT_LOCK = threading.Lock()
+
+
+def open_journal(seed_path: str, journal_path: Optional[str] = None,
+                 **kwargs) -> Journal:
+    # один журнал на процесс для каждого файла
+    journal_path = journal_path or journal_path_for(seed_path)
+    with _JOURNALS_LOCK:
+        j = _JOURNALS.get(journal_path)
+        if j is None or j.closed:
+            j = _JOURNALS[journal_path] = Journal(journal_path, **kwargs)
+            atexit.register(j.close)
+        return j
+
+
+def compact(seed_path: str, journal: Journal) -> int:
+    # переносит журнал в новый снапшот seed.json; возвращает число записей
+    with _COMPACT_LOCK, journal.locked():
+        offset = journal.size()
+        journal.flush()
+        entries = list(journal.replay(upto=offset))
+        if not entries:
+            return 0
+        with open(seed_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        base = tuple(Transaction(**t) for t in data.get("transactions", []))
+        data["transactions"] = [asdict(t) for t in apply_entries(base, entries)]
+        tmp = seed_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, seed_path)
+        snap_path = snapshot_path_for(seed_path)
+        if os.path.exists(snap_path):
+            write_snapshot(data, snap_path)
+        journal.truncate_head(offset)
+        _after_compact(seed_path)
+        return len(entries)
+
+
+def ensure_snapshot(seed_path: str, journal: Journal) -> str:
+    # seed.snap рядом с seed.json, если его нет или он старше seed.json. Под
+    # блокировкой журнала, как и сжатие, которое переписывает оба файла: иначе
+    # снапшот старого seed.json мог бы оказаться новее сжатого
+    snap_path = snapshot_path_for(seed_path)
+    with journal.locked():
+        if not is_fresh(snap_path, seed_path):
+            json_to_snapshot(seed_path, snap_path)
+    return snap_path
+
+
+def compact_async(seed_path: str, journal: Journal) -> threading.Thread:
+    th = threading.Thread(target=compact, args=(seed_path, journal), daemon=True)
+    th.start()
+    return th
+
+
+def maybe_compact(seed_path: str, journal: Journal,
+                  threshold: int = 1000) -> Optional[threading.Thread]:
+    # сжатие в фоне, когда журнал разросся
+    if journal.count >= threshold and not _COMPACT_LOCK.locked():
+        return compact_async(seed_path, journal)
+    return None
+
+
+# ----------------- Ledger -----------------
+# Общий для процесса леджер: снапшот транзакций, индексы рядом с ним и
+# журнал. add/delete обновляют всё инкрементально, без перечитывания файлов.
+
+class Ledger:
+    def __init__(self, seed_path: str, journal_path: Optional[str] = None):
+        self.seed_path = seed_path
+        self.journal = open_journal(seed_path, journal_path)
+        self._lock = threading.RLock()
+        with self.journal.locked():
+            # seed.json и журнал читаются согласованно: чужие запись и сжатие
+            # ждут конца чтения, journal.changed() отсчитывается от него
+            self.seed_version = file_version(seed_path)
+            self.journal_external = self.journal.external
+            loaded = load_ledger(seed_path, self.journal.path)
+        self.accounts, self.categories, trans, self.budgets = loaded
+        # общий для всех сессий персистентный вектор: add/replace — O(log N)
+        self.snapshot = LedgerSnapshot.of(PVector(trans))
+        for name, build in self._builders().items():
+            setattr(self, name, build(trans))
+        self.forecasts = ForecastView(self.monthly)
+        self._pos: Dict[str, int] = {t.id: i for i, t in enumerate(trans)}
+        # производные представления обновляются по событиям леджера. Обработчик
+        # берёт представление из атрибута в момент события, поэтому его можно
+        # заменить; упавший обработчик помечает представление устаревшим, и
+        # оно пересобирается по снапшоту в конце изменения (_rebuild_stale).
+        self.stale: set = set()
+        self.events = EventStream()
+        handlers = {
+            "balances": on_tx(lambda t, pos: self.balances.add(t),
+                              lambda old, t, pos: self.balances.update(t)),
+            "timeline": on_tx(lambda t, pos: self.timeline.add(t),
+                              lambda old, t, pos: self.timeline.update(old, t),
+                              lambda txs, pos: self.timeline.add_many(txs)),
+            "ownership": on_tx(lambda t, pos: self.ownership.add(t, pos),
+                               lambda *a: self.ownership.update(*a)),
+            "budget_engine": on_tx(lambda t, pos: self.budget_engine.add(t),
+                                   self._rebudget),
+            "monthly": on_tx(lambda *a: self.monthly.added(*a),
+                             lambda *a: self.monthly.replaced(*a)),
+            "cube": on_tx(lambda *a: self.cube.add(*a),
+                          lambda *a: self.cube.replace(*a)),
+            "notes": on_tx(lambda *a: self.notes.add(*a),
+                           lambda *a: self.notes.update(*a)),
+            "pages": on_tx(lambda *a: self.pages.add(*a),
+                           lambda *a: self.pages.update(*a),
+                           lambda *a: self.pages.add_many(*a)),
+        }
+        for name, handler in handlers.items():
+            self.events.subscribe(handler, on_error=self._mark_stale(name))
+
+    def outdated(self) -> bool:
+        # seed.json изменили снаружи (не наше сжатие) или журнал дописал
+        # другой процесс — в том числе замеченное при нашей записи
+        return (self.seed_version != file_version(self.seed_path)
+                or self.journal.changed()
+                or self.journal.external != self.journal_external)
+
+    def _builders(self) -> Dict[str, Callable]:
+        # имя атрибута -> построение представления по транзакциям
+        return {
+            "balances": BalanceIndex.build,
+            "timeline": Timeline,
+            "ownership": lambda trans: OwnershipIndex(self.accounts, trans),
+            "budget_engine": lambda trans: BudgetEngine(self.budgets, trans),
+            "monthly": MonthlyCategoryView,
+            "cube": ReportCube,
+            "notes": NoteIndex,
+            "pages": KeysetIndex,
+        }
+
+    def _mark_stale(self, name: str) -> Callable[[Event, Exception], None]:
+        return lambda e, exc: self.stale.add(name)
+
+    def _rebuild_stale(self) -> None:
+        # вызывается под блокировкой после события
+        if not self.stale:
+            return
+        trans, builders = self.transactions, self._builders()
+        for name in sorted(self.stale):
+            setattr(self, name, builders[name](trans))
+        if "monthly" in self.stale:
+            self.forecasts = ForecastView(self.monthly)
+        self.stale.clear()
+
+    @property
+    def transactions(self) -> PVector:
+        return self.snapshot.trans
+
+    def visible_to(self, user: User) -> Sequence[Transaction]:
+        # админ видит весь леджер, остальные — транзакции своих счетов
+        if user.role == "admin":
+            return self.transactions
+        return self.ownership.visible(user.username, self.transactions)
+
+    def keyset(self, user: User, own: bool = False) -> KeysetIndex:
+        # индекс (ts, id) для постраничного просмотра: у админа — общий,
+        # обновляемый по событиям; у остальных — по кэшируемой выборке
+        if user.role == "admin":
+            return self.pages
+        if own:
+            return keyset_index(self.ownership.own(user.username, self.transactions))
+        return keyset_index(self.visible_to(user))
+
+    def position(self, tx_id: str) -> Optional[int]:
+        # позиция в леджере не меняется: замены и удаления — на месте
+        return self._pos.get(tx_id)
+
+    def get(self, tx_id: str) -> Optional[Transaction]:
+        i = self._pos.get(tx_id)
+        return None if i is None else self.snapshot.trans[i]
+
+    def _add(self, t: Transaction) -> LedgerSnapshot:
+        self.journal.append_add(t)
+        if t.id in self._pos:
+            return self._replace(t)
+        pos = self._pos[t.id] = len(self.snapshot.trans)
+        self.snapshot = self.snapshot.add(t)
+        self.events.emit(TX_ADDED, {"tx": t, "pos": pos})
+        self._rebuild_stale()
+        return self.snapshot
+
+    def add(self, t: Transaction) -> LedgerSnapshot:
+        with self._lock:
+            self._add(t)
+        maybe_compact(self.seed_path, self.journal)
+        return self.snapshot
+
+    def add_many(self, trans: Iterable[Transaction]) -> LedgerSnapshot:
+        # пачка под одной блокировкой: журнал — одной записью и одним fsync,
+        # новые транзакции — одним событием tx_batch (сортированные индексы
+        # вливают её разом); повтор id — обычная замена в порядке пачки
+        trans = list(trans)
+        with self._lock:
+            self.journal.append_many(trans)
+            fresh: list = []
+            for t in trans:
+                if t.id in self._pos:
+                    self._extend(fresh)
+                    fresh = []
+                    self._replace(t)
+                else:
+                    self._pos[t.id] = len(self.snapshot.trans) + len(fresh)
+                    fresh.append(t)
+            self._extend(fresh)
+            self.journal.flush()
+        maybe_compact(self.seed_path, self.journal)
+        return self.snapshot
+
+    def _extend(self, fresh: Sequence[Transaction]) -> None:
+        if not fresh:
+            return
+        pos = len(self.snapshot.trans)
+        self.snapshot = self.snapshot.extend(fresh)
+        self.events.emit(TX_BATCH, {"txs": tuple(fresh), "pos": pos})
+        self._rebuild_stale()
+
+    def delete(self, tx_id: str) -> Optional[Transaction]:
+        # мягкое удаление
+        with self._lock:
+            old = self.get(tx_id)
+            if old is None or old.deleted:
+                return old
+            self.journal.append_delete(tx_id)
+            self._replace(replace(old, deleted=True))
+        maybe_compact(self.seed_path, self.journal)
+        return self.get(tx_id)
+
+    def budget_status(self, as_of: Optional[datetime] = None):
+        # Either на каждый бюджет; новый месяц/неделя — один пересчёт окна
+        as_of = as_of or datetime.now(timezone.utc)
+        with self._lock:
+            if self.budget_engine.is_stale(as_of):
+                self.budget_engine = BudgetEngine(self.budgets, self.transactions,
+                                                  as_of)
+            return self.budget_engine.results()
+
+    def _replace(self, t: Transaction) -> LedgerSnapshot:
+        old, pos = self.get(t.id), self._pos[t.id]
+        self.snapshot = self.snapshot.update(t, pos)
+        self.events.emit(replace_event(old, t), {"tx": t, "old": old, "pos": pos})
+        self._rebuild_stale()
+        return self.snapshot
+
+    def _rebudget(self, old: Transaction, t: Transaction, pos: int) -> None:
+        self.budget_engine.remove(old)
+        self.budget_engine.add(t)
+
+
+_LEDGERS: Dict[str, Ledger] = {}
+
+
+def get_ledger(seed_path: str) -> Ledger:
+    # леджер устарел (Ledger.outdated) — перечитываем
+    with _JOURNALS_LOCK:
+        ledger = _LEDGERS.get(seed_path)
+    if ledger is None or ledger.outdated():
+        ledger = Ledger(seed_path)
+        with _JOURNALS_LOCK:
+            _LEDGERS[seed_path] = ledger
+    return ledger
+
+
+def _after_compact(seed_path: str) -> None:
+    with _JOURNALS_LOCK:
+        ledger = _LEDGERS.get(seed_path)
+    if ledger is not None:
+        ledger.seed_version = file_version(seed_path)
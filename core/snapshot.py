@@ -0,0 +1,292 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+from dataclasses import asdict
+from typing import Dict, List, Optional, Tuple
+from core.domain import Account, Budget, Category, Transaction, User
+from core.frame import TransactionFrame, np
+from core.transforms import interned, load_seed, load_users
+
+# ----------------- Binary snapshot -----------------
+# Файл:  MAGIC | u64 длина заголовка | JSON-заголовок | колонки (выровнены по 8)
+# Заголовок хранит всё, кроме транзакций (users/accounts/categories/budgets),
+# словари cat/account/user и смещения колонок. Колонки фиксированной ширины:
+#   amount <i8, ts <i8, deleted u1, cat/account/user <i4, id/note <i4 —
+#   ссылки в таблицу строк (смещения <u8 + utf-8 блоб).
+# MappedSnapshot отображает файл в память (mmap): с NumPy колонки — это
+# np.frombuffer без копии, страницы читаются лениво и делятся между процессами.
+# Так работают колоночные потребители (пакетные отчёты: frame.take по строкам
+# пользователя). Колонки frame живут, пока открыт mmap: close() (или
+# with MappedSnapshot(...)) освобождает отображение, после него frame недоступен.
+# Леджер строится из объектов Transaction, поэтому load_base разворачивает
+# снапшот целиком и сразу закрывает отображение: загрузка леджера по времени
+# примерно как разбор seed.json, без ленивого чтения колонок.
+# Приложение пишет seed.snap в фоне (service.ensure_snapshot), дальше его
+# обновляет сжатие журнала. Форма входа берёт пользователей из заголовка
+# (read_meta): это чтение нескольких килобайт без mmap и без колонок.
+
+MAGIC = b"FMSNAP1\0"
+
+_COLUMNS = (
+    ("amount", "<i8", "q"),
+    ("ts", "<i8", "q"),
+    ("deleted", "|u1", "b"),
+    ("cat", "<i4", "i"),
+    ("account", "<i4", "i"),
+    ("user", "<i4", "i"),
+    ("id_ref", "<i4", "i"),
+    ("note_ref", "<i4", "i"),
+    ("str_offsets", "<u8", "Q"),
+)
+
+
+def snapshot_path_for(seed_path: str) -> str:
+    root, _ = os.path.splitext(seed_path)
+    return root + ".snap"
+
+
+def _pack(values, typecode: str) -> bytes:
+    arr = array(typecode, values)
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def write_snapshot(data: dict, path: str) -> None:
+    # data — словарь в формате seed.json
+    trans = tuple(interned(Transaction, t) for t in data.get("transactions", []))
+    frame = TransactionFrame.from_transactions(trans)
+
+    strings: Dict[str, int] = {}
+    def ref(s: str) -> int:
+        i = strings.get(s)
+        if i is None:
+            i = strings[s] = len(strings)
+        return i
+    id_ref = [ref(t.id) for t in trans]
+    note_ref = [ref(t.note or "") for t in trans]
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = [0]
+    for b in encoded:
+        offsets.append(offsets[-1] + len(b))
+
+    raw = {
+        "amount": list(frame.amount), "ts": list(frame.ts),
+        "deleted": [int(d) for d in frame.deleted],
+        "cat": list(frame.cat), "account": list(frame.account),
+        "user": list(frame.user),
+        "id_ref": id_ref, "note_ref": note_ref, "str_offsets": offsets,
+    }
+    blobs: List[Tuple[str, bytes]] = [(name, _pack((int(v) for v in raw[name]), tc))
+                                      for name, _, tc in _COLUMNS]
+    blobs.append(("strings", b"".join(encoded)))
+
+    meta = {k: v for k, v in data.items() if k != "transactions"}
+    header = {
+        "count": len(trans),
+        "meta": meta,
+        "dicts": {"cat": frame.cat_values, "account": frame.account_values,
+                  "user": frame.user_values},
+        "ts_raw": {str(i): s for i, s in frame.ts_raw.items()},
+        "columns": {},
+    }
+    # смещения считаем от начала блока данных; блок выровнен по 8 байт
+    pos = 0
+    for name, blob in blobs:
+        header["columns"][name] = {"offset": pos, "size": len(blob)}
+        pos += (len(blob) + 7) // 8 * 8
+    head = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    data_start = (len(MAGIC) + 8 + len(head) + 7) // 8 * 8
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(head)))
+        f.write(head)
+        f.write(b"\0" * (data_start - f.tell()))
+        for name, blob in blobs:
+            f.write(blob)
+            f.write(b"\0" * ((len(blob) + 7) // 8 * 8 - len(blob)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_meta(path: str) -> dict:
+    # только JSON-заголовок: users/accounts/categories/budgets
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path}: not a snapshot file")
+        (head_len,) = struct.unpack("<Q", f.read(8))
+        return json.loads(f.read(head_len).decode("utf-8"))["meta"]
+
+
+class _Strings(Sequence):
+    # ленивая колонка строк: декодируем только то, что читают
+    def __init__(self, refs, offsets, blob):
+        self._refs = refs
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self) -> int:
+        return len(self._refs)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        r = int(self._refs[i])
+        lo, hi = int(self._offsets[r]), int(self._offsets[r + 1])
+        return bytes(self._blob[lo:hi]).decode("utf-8")
+
+
+class MappedSnapshot:
+    def __init__(self, path: str):
+        self.path = path
+        # mmap держит свой дескриптор — файл можно закрыть сразу
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path}: not a snapshot file")
+        (head_len,) = struct.unpack_from("<Q", self._mm, len(MAGIC))
+        head_start = len(MAGIC) + 8
+        header = json.loads(self._mm[head_start:head_start + head_len].decode("utf-8"))
+        self.header = header
+        self.count: int = header["count"]
+        base = (head_start + head_len + 7) // 8 * 8
+        cols = {}
+        for name, dtype, tc in _COLUMNS:
+            c = header["columns"][name]
+            cols[name] = self._column(base + c["offset"], c["size"], dtype, tc)
+        s = header["columns"]["strings"]
+        blob = memoryview(self._mm)[base + s["offset"]:base + s["offset"] + s["size"]]
+
+        d = header["dicts"]
+        self.frame = TransactionFrame(
+            _Strings(cols["id_ref"], cols["str_offsets"], blob),
+            _Strings(cols["note_ref"], cols["str_offsets"], blob),
+            cols["amount"], cols["ts"],
+            cols["deleted"].view(np.bool_) if np is not None else cols["deleted"],
+            cols["cat"], cols["account"], cols["user"],
+            tuple(d["cat"]), tuple(d["account"]), tuple(d["user"]),
+            {int(k): v for k, v in header.get("ts_raw", {}).items()},
+        )
+
+    def _column(self, offset: int, size: int, dtype: str, typecode: str):
+        if np is not None:
+            dt = np.dtype(dtype)
+            return np.frombuffer(self._mm, dtype=dt, count=size // dt.itemsize,
+                                 offset=offset)
+        # без NumPy — копия в array.array
+        arr = array(typecode)
+        arr.frombytes(self._mm[offset:offset + size])
+        if sys.byteorder != "little":
+            arr.byteswap()
+        return arr
+
+    def close(self) -> None:
+        # колонки — представления mmap: сначала отпускаем frame, потом отображение
+        # (BufferError, если кто-то ещё держит колонки frame)
+        self.frame = None
+        self._mm.close()
+
+    def __enter__(self) -> 'MappedSnapshot':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    # ---------- seed-like access ----------
+    @property
+    def meta(self) -> dict:
+        return self.header["meta"]
+
+    def accounts(self) -> Tuple[Account, ...]:
+        return tuple(interned(Account, a) for a in self.meta.get("accounts", []))
+
+    def categories(self) -> Tuple[Category, ...]:
+        return tuple(interned(Category, c) for c in self.meta.get("categories", []))
+
+    def budgets(self) -> Tuple[Budget, ...]:
+        return tuple(interned(Budget, b) for b in self.meta.get("budgets", []))
+
+    def transactions(self) -> Tuple[Transaction, ...]:
+        return tuple(self.frame.to_transactions())
+
+    def to_seed(self) -> dict:
+        # обратно в формат seed.json
+        data = dict(self.meta)
+        data["transactions"] = [asdict(t) for t in self.frame.to_transactions()]
+        return data
+
+
+def load_snapshot(path: str):
+    # тот же кортеж, что и transforms.load_seed. Транзакции материализуются
+    # целиком (леджеру нужны объекты Transaction), после чего mmap закрывается;
+    # колоночным потребителям (пакетные отчёты) — MappedSnapshot(path).frame
+    with MappedSnapshot(path) as snap:
+        return snap.accounts(), snap.categories(), snap.transactions(), snap.budgets()
+
+
+def is_fresh(snap_path: str, seed_path: str) -> bool:
+    # снапшот не старше seed.json — иначе seed.json правили руками
+    return (os.path.exists(snap_path)
+            and os.path.getmtime(snap_path) >= os.path.getmtime(seed_path))
+
+
+def load_base(seed_path: str):
+    # бинарный снапшот рядом с seed.json, если он актуален; иначе сам JSON
+    snap_path = snapshot_path_for(seed_path)
+    if is_fresh(snap_path, seed_path):
+        return load_snapshot(snap_path)
+    return load_seed(seed_path)
+
+
+def base_users(seed_path: str) -> Tuple[User, ...]:
+    # пользователи без разбора транзакций, если снапшот актуален
+    snap_path = snapshot_path_for(seed_path)
+    if is_fresh(snap_path, seed_path):
+        return tuple(User(**u) for u in read_meta(snap_path).get("users", []))
+    return load_users(seed_path)
+
+
+def json_to_snapshot(json_path: str, snap_path: Optional[str] = None) -> str:
+    snap_path = snap_path or snapshot_path_for(json_path)
+    with open(json_path, "r", encoding="utf-8") as f:
+        write_snapshot(json.load(f), snap_path)
+    return snap_path
+
+
+def snapshot_to_json(snap_path: str, json_path: str) -> None:
+    with MappedSnapshot(snap_path) as snap:
+        data = snap.to_seed()
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m core.snapshot",
+                                description="seed.json <-> binary snapshot")
+    cmds = p.add_subparsers(dest="cmd", required=True)
+    to_snap = cmds.add_parser("to-snap", help="seed.json -> .snap")
+    to_snap.add_argument("src")
+    to_snap.add_argument("dst", nargs="?")
+    to_json = cmds.add_parser("to-json", help=".snap -> seed.json")
+    to_json.add_argument("src")
+    to_json.add_argument("dst")
+    args = p.parse_args(argv)
+    if args.cmd == "to-snap":
+        print(json_to_snapshot(args.src, args.dst))
+    else:
+        snapshot_to_json(args.src, args.dst)
+    return 0
+
+
+if __name__ == "__main__":
+    # python -m core.snapshot to-snap data/seed.json [data/seed.snap]
+    # python -m core.snapshot to-json data/seed.snap data/seed.json
+    sys.exit(main())
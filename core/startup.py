@@ -0,0 +1,95 @@
+import threading
+from typing import Dict, Optional, Tuple
+from core.domain import User
+from core.transforms import file_version, load_users
+
+# ----------------- Background startup -----------------
+# Леджер (seed или снапшот + журнал + индексы) строится в фоновом потоке,
+# пока приложение показывает форму входа; страницы ждут его через ledger().
+# После загрузки отдельный поток пишет seed.snap, если его нет или он устарел
+# (ledger() этого не ждёт).
+# core.service (а с ним NumPy) импортируется в том же фоновом потоке.
+# Поток один на процесс и seed: Streamlit перезапускает скрипт, модуль — нет.
+# Первым делом поток читает пользователей (из заголовка seed.snap, если он
+# актуален): форма входа ждёт только их, а не весь леджер.
+
+_THREADS: Dict[str, threading.Thread] = {}
+_LOCK = threading.Lock()
+_USERS: Dict[str, Tuple[tuple, Tuple[User, ...]]] = {}  # seed -> (версия, users)
+_USERS_READY: Dict[str, threading.Event] = {}
+
+
+def _read_users(seed_path: str) -> Tuple[User, ...]:
+    from core.snapshot import base_users
+    version = file_version(seed_path)
+    users = base_users(seed_path)
+    _USERS[seed_path] = (version, users)
+    return users
+
+
+def _load(seed_path: str, users_ready: threading.Event) -> None:
+    try:
+        _read_users(seed_path)
+    except Exception:
+        pass  # users() прочитает их сам
+    finally:
+        users_ready.set()
+    from core.service import get_ledger
+    try:
+        ledger = get_ledger(seed_path)
+    except Exception:
+        # ошибка повторится (и будет показана) при синхронном вызове в ledger()
+        return
+    threading.Thread(target=_snapshot, args=(seed_path, ledger.journal),
+                     name=f"snapshot:{seed_path}", daemon=True).start()
+
+
+def _snapshot(seed_path: str, journal) -> None:
+    from core.service import ensure_snapshot
+    try:
+        ensure_snapshot(seed_path, journal)
+    except Exception:
+        # снапшот только ускоряет следующий старт; без него читается seed.json
+        pass
+
+
+def preload(seed_path: str) -> threading.Thread:
+    with _LOCK:
+        th = _THREADS.get(seed_path)
+        if th is None:
+            ready = _USERS_READY[seed_path] = threading.Event()
+            th = _THREADS[seed_path] = threading.Thread(
+                target=_load, args=(seed_path, ready), name=f"preload:{seed_path}",
+                daemon=True)
+            th.start()
+    return th
+
+
+def ready(seed_path: str) -> bool:
+    th = _THREADS.get(seed_path)
+    return th is not None and not th.is_alive()
+
+
+def users(seed_path: str, timeout: Optional[float] = None) -> Tuple[User, ...]:
+    # пользователи для формы входа: результат фонового чтения, если seed.json
+    # с тех пор не менялся; иначе читаем заново (после сжатия — из заголовка
+    # свежего seed.snap)
+    preload(seed_path)
+    _USERS_READY[seed_path].wait(timeout)
+    cached = _USERS.get(seed_path)
+    if cached is not None and cached[0] == file_version(seed_path):
+        return cached[1]
+    if _USERS_READY[seed_path].is_set():
+        return _read_users(seed_path)
+    return load_users(seed_path)
+
+
+def ledger(seed_path: str, timeout: Optional[float] = None):
+    # дожидаемся фоновой загрузки; дальше get_ledger — поиск в кэше
+    # (и перечитывание, если seed.json изменили снаружи)
+    th = preload(seed_path)
+    th.join(timeout)
+    if th.is_alive():
+        raise TimeoutError(f"ledger for {seed_path} is still loading")
+    from core.service import get_ledger
+    return get_ledger(seed_path)
@@ -0,0 +1,136 @@
+import re
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+from core.domain import Transaction
+from core import instrument
+
+# ----------------- Note index -----------------
+# Инвертированный индекс по Transaction.note: токен -> позиции в леджере
+# (по возрастанию). Токены — слова Unicode (\w+, кириллица тоже) в casefold,
+# «ё» приравнивается к «е». Словарь токенов отсортирован: префиксный запрос —
+# bisect по словарю и объединение списков позиций.
+# Запрос «продукты магаз» — все слова должны встретиться (AND); при
+# prefix=True каждое слово ищется как префикс. Удалённые транзакции по
+# умолчанию не возвращаются.
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [w for w in _WORD.findall(text.casefold().replace("ё", "е")) if w.strip("_")]
+
+
+def note_matches(note: Optional[str], terms: Sequence[str],
+                 prefix: bool = False) -> bool:
+    # то же условие, что и у индекса, для одной заметки
+    words = set(tokenize(note))
+    if prefix:
+        return all(any(w.startswith(q) for w in words) for q in terms)
+    return all(q in words for q in terms)
+
+
+class NoteIndex:
+    def __init__(self, trans: Iterable[Transaction] = ()):
+        self.postings: Dict[str, List[int]] = {}
+        self.vocab: List[str] = []
+        self.deleted: Set[int] = set()
+        for pos, t in enumerate(trans):
+            self.add(t, pos)
+
+    # ---------- updates ----------
+    def _insert(self, token: str, pos: int) -> None:
+        plist = self.postings.get(token)
+        if plist is None:
+            self.postings[token] = [pos]
+            insort(self.vocab, token)
+        elif plist[-1] < pos:
+            plist.append(pos)
+        elif plist[-1] != pos:
+            i = bisect_left(plist, pos)
+            if i == len(plist) or plist[i] != pos:
+                plist.insert(i, pos)
+
+    def _remove(self, token: str, pos: int) -> None:
+        plist = self.postings.get(token)
+        if not plist:
+            return
+        i = bisect_left(plist, pos)
+        if i < len(plist) and plist[i] == pos:
+            del plist[i]
+        if not plist:
+            del self.postings[token]
+            del self.vocab[bisect_left(self.vocab, token)]
+
+    def add(self, t: Transaction, pos: int) -> None:
+        for token in set(tokenize(t.note)):
+            self._insert(token, pos)
+        if t.deleted:
+            self.deleted.add(pos)
+
+    def update(self, old: Transaction, t: Transaction, pos: int) -> None:
+        # замена на месте: мягкое удаление или новая заметка
+        if old.note != t.note:
+            before, after = set(tokenize(old.note)), set(tokenize(t.note))
+            for token in before - after:
+                self._remove(token, pos)
+            for token in after - before:
+                self._insert(token, pos)
+        if t.deleted:
+            self.deleted.add(pos)
+        else:
+            self.deleted.discard(pos)
+
+    # ---------- queries ----------
+    def terms(self, prefix: str, limit: Optional[int] = None) -> List[str]:
+        # токены словаря с данным префиксом (для подсказок)
+        lo = bisect_left(self.vocab, prefix)
+        out = []
+        for token in self.vocab[lo:]:
+            if not token.startswith(prefix):
+                break
+            if limit is not None and len(out) >= limit:
+                break
+            out.append(token)
+        return out
+
+    def _term_positions(self, term: str, prefix: bool):
+        if not prefix:
+            return self.postings.get(term, ())
+        tokens = self.terms(term)
+        if len(tokens) == 1:
+            return self.postings[tokens[0]]
+        out: Set[int] = set()
+        for token in tokens:
+            out.update(self.postings[token])
+        return out
+
+    def search(self, text: str, prefix: bool = False,
+               include_deleted: bool = False) -> List[int]:
+        # позиции в леджере по возрастанию; пустой запрос — пустой ответ
+        terms = tokenize(text)
+        if not terms:
+            return []
+        lists = sorted((self._term_positions(q, prefix) for q in set(terms)), key=len)
+        if not lists[0]:
+            return []
+        hits = set(lists[0])
+        for other in lists[1:]:
+            hits.intersection_update(other)
+            if not hits:
+                return []
+        if not include_deleted:
+            hits -= self.deleted
+        return sorted(hits)
+
+    def count(self, text: str, prefix: bool = False,
+              include_deleted: bool = False) -> int:
+        return len(self.search(text, prefix, include_deleted))
+
+    @instrument.timed("textindex.rows")
+    def rows(self, trans: Sequence[Transaction], text: str, prefix: bool = False,
+             include_deleted: bool = False) -> List[Transaction]:
+        # trans — снимок леджера; позиции, добавленные после него, отбрасываются
+        n = len(trans)
+        return [trans[i] for i in self.search(text, prefix, include_deleted) if i < n]
@@ -0,0 +1,175 @@
+import calendar
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timezone
+from heapq import merge
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from core.domain import Transaction
+from core.transforms import ts_epoch
+from core import instrument
+
+# ----------------- Time-sorted ledger -----------------
+# Транзакции отсортированы по времени, ts разобран один раз в epoch (int).
+# Диапазон дат — два bisect и срез; группировка по (год, месяц) — bisect по
+# границам месяцев, без повторного разбора строк. Транзакции с неразбираемым
+# ts в индекс не попадают (как и раньше в помесячных отчётах) — они лежат
+# отдельно в undated.
+
+TimeLike = Union[str, int, date, datetime, None]
+DAY = 86400
+
+
+def to_epoch(value: TimeLike, end_of_day: bool = False) -> Optional[int]:
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, datetime):
+        return calendar.timegm(value.utctimetuple())
+    if isinstance(value, date):
+        e = calendar.timegm(value.timetuple())
+        return e + 86399 if end_of_day else e
+    return ts_epoch(value)
+
+
+def month_start(year: int, month: int) -> int:
+    return calendar.timegm((year, month, 1, 0, 0, 0))
+
+
+class Timeline:
+    def __init__(self, trans: Iterable[Transaction] = ()):
+        rows = []
+        self.undated: List[Transaction] = []
+        for i, t in enumerate(trans):
+            e = ts_epoch(t.ts)
+            if e is None:
+                self.undated.append(t)
+            else:
+                rows.append((e, i, t))
+        rows.sort(key=lambda r: r[:2])
+        self.epochs: List[int] = [r[0] for r in rows]
+        self.trans: List[Transaction] = [r[2] for r in rows]
+        self._months: Optional[Dict[Tuple[int, int], Tuple[int, int]]] = None
+
+    def __len__(self) -> int:
+        return len(self.trans)
+
+    # ---------- queries ----------
+    def span(self, start: TimeLike = None, end: TimeLike = None) -> Tuple[int, int]:
+        # индексы [lo, hi) для start <= ts <= end (даты включаются целиком)
+        lo_e = to_epoch(start)
+        hi_e = to_epoch(end, end_of_day=True)
+        lo = 0 if lo_e is None else bisect_left(self.epochs, lo_e)
+        hi = len(self.epochs) if hi_e is None else bisect_right(self.epochs, hi_e)
+        return lo, max(lo, hi)
+
+    @instrument.timed("timeline.between")
+    def between(self, start: TimeLike = None,
+                end: TimeLike = None) -> List[Transaction]:
+        lo, hi = self.span(start, end)
+        instrument.rows("timeline.between", hi - lo)
+        return self.trans[lo:hi]
+
+    def candidates(self, start: TimeLike, end: TimeLike) -> List[Transaction]:
+        # надмножество строк с start <= ts <= end при сравнении строк, как в
+        # by_date_range, или дат, как в by_day_range: диапазон шире на сутки
+        # (смещения часовых поясов, разная запись времени) плюс строки без
+        # разбираемого ts
+        lo, hi = to_epoch(start), to_epoch(end, end_of_day=True)
+        rows = self.between(None if lo is None else lo - DAY,
+                            None if hi is None else hi + DAY)
+        return rows + self.undated
+
+    def rows(self, start: TimeLike = None,
+             end: TimeLike = None) -> Iterable[Tuple[int, Transaction]]:
+        # пары (epoch, транзакция) — для графиков без повторного разбора ts
+        lo, hi = self.span(start, end)
+        instrument.rows("timeline.rows", hi - lo)
+        return zip(self.epochs[lo:hi], self.trans[lo:hi])
+
+    def month_slices(self) -> Dict[Tuple[int, int], Tuple[int, int]]:
+        # (год, месяц) -> [lo, hi); считается один раз до следующего изменения
+        if self._months is None:
+            months: Dict[Tuple[int, int], Tuple[int, int]] = {}
+            if self.epochs:
+                first = datetime.fromtimestamp(self.epochs[0], tz=timezone.utc)
+                y, m = first.year, first.month
+                lo = 0
+                while lo < len(self.epochs):
+                    ny, nm = (y + 1, 1) if m == 12 else (y, m + 1)
+                    hi = bisect_left(self.epochs, month_start(ny, nm), lo)
+                    if hi > lo:
+                        months[(y, m)] = (lo, hi)
+                    else:
+                        # пропускаем пустые месяцы одним прыжком
+                        nxt = datetime.fromtimestamp(self.epochs[lo], tz=timezone.utc)
+                        ny, nm = nxt.year, nxt.month
+                    lo, y, m = hi, ny, nm
+            self._months = months
+        return self._months
+
+    @instrument.timed("timeline.monthly_sums")
+    def monthly_sums(self, pred=None) -> Dict[Tuple[int, int], int]:
+        # суммы по месяцам; месяцы без подходящих транзакций не попадают
+        out: Dict[Tuple[int, int], int] = {}
+        for key, (lo, hi) in self.month_slices().items():
+            s, hit = 0, False
+            instrument.rows("timeline.monthly_sums", hi - lo)
+            for t in self.trans[lo:hi]:
+                if pred is None or pred(t):
+                    s += t.amount
+                    hit = True
+            if hit:
+                out[key] = s
+        return out
+
+    # ---------- updates ----------
+    def add(self, t: Transaction) -> None:
+        epoch = ts_epoch(t.ts)
+        if epoch is None:
+            self.undated.append(t)
+            return
+        if not self.epochs or epoch >= self.epochs[-1]:
+            self.epochs.append(epoch)
+            self.trans.append(t)
+        else:
+            pos = bisect_right(self.epochs, epoch)
+            self.epochs.insert(pos, epoch)
+            self.trans.insert(pos, t)
+        self._months = None
+
+    def add_many(self, trans: Iterable[Transaction]) -> None:
+        # пачка: сортировка пачки и одно слияние с хвостом индекса от первой
+        # точки вставки — O(k log k + сдвиг хвоста) вместо k вставок в список
+        rows = []
+        for t in trans:
+            epoch = ts_epoch(t.ts)
+            if epoch is None:
+                self.undated.append(t)
+            else:
+                rows.append((epoch, t))
+        if not rows:
+            return
+        rows.sort(key=itemgetter(0))
+        lo = bisect_right(self.epochs, rows[0][0])
+        tail = merge(zip(self.epochs[lo:], self.trans[lo:]), rows, key=itemgetter(0))
+        self.epochs[lo:], self.trans[lo:] = map(list, zip(*tail))
+        self._months = None
+
+    def update(self, old: Transaction, t: Transaction) -> None:
+        # замена по id: старая строка ищется по своему ts; при том же ts —
+        # замена на месте (мягкое удаление), иначе — удаление и вставка
+        epoch = ts_epoch(old.ts)
+        if epoch is not None:
+            lo, hi = bisect_left(self.epochs, epoch), bisect_right(self.epochs, epoch)
+            for i in range(lo, hi):
+                if self.trans[i].id == old.id:
+                    if ts_epoch(t.ts) == epoch:
+                        self.trans[i] = t
+                        return
+                    del self.epochs[i]
+                    del self.trans[i]
+                    self._months = None
+                    break
+        else:
+            self.undated = [x for x in self.undated if x.id != old.id]
+        self.add(t)
+
@@ -1,7 +1,14 @@
+import calendar
 import json
+import os
+import re
+import sys
+from datetime import datetime, timezone
 from functools import reduce, lru_cache
-from typing import Tuple
+from typing import Optional, Tuple
 from core.domain import User, Account, Category, Transaction, Budget
+from core.pvector import PVector
+from core import instrument
 
 # ----------------- Users -----------------
 @lru_cache
@@ -17,18 +24,90 @@ def authenticate(users: Tuple[User, ...], username: str, password: str):
     return None
 
 # ----------------- Seed -----------------
+# Повторяющиеся идентификаторы (cat_id, account_id, user_id, ...) интернируются:
+# миллион транзакций ссылается на несколько десятков строк, а не на миллионы копий.
+INTERNED_FIELDS = {
+    Account: ("user_id", "currency"),
+    Category: ("parent_id", "type"),
+    Transaction: ("account_id", "user_id", "cat_id"),
+    Budget: ("cat_id", "period"),
+}
+
+def interned(cls, d: dict):
+    d = dict(d)
+    for name in INTERNED_FIELDS.get(cls, ()):
+        v = d.get(name)
+        if isinstance(v, str):
+            d[name] = sys.intern(v)
+    return cls(**d)
+
+@instrument.timed()
 def load_seed(path: str) -> Tuple[Tuple[Account, ...], Tuple[Category, ...], Tuple[Transaction, ...], Tuple[Budget, ...]]:
     with open(path, "r", encoding="utf-8") as f:
         data = json.load(f)
-    accounts = tuple(Account(**a) for a in data.get("accounts", []))
-    categories = tuple(Category(**c) for c in data.get("categories", []))
-    transactions = tuple(Transaction(**t) for t in data.get("transactions", []))
-    budgets = tuple(Budget(**b) for b in data.get("budgets", []))
+    accounts = tuple(interned(Account, a) for a in data.get("accounts", []))
+    categories = tuple(interned(Category, c) for c in data.get("categories", []))
+    transactions = tuple(interned(Transaction, t) for t in data.get("transactions", []))
+    budgets = tuple(interned(Budget, b) for b in data.get("budgets", []))
     return accounts, categories, transactions, budgets
 
+# ----------------- Timestamps -----------------
+# Время в леджере — UTC: наивные ts (seed.json, импорт) считаются UTC, новые
+# записи пишутся с явным +00:00 (now_ts). Окна бюджетов, месяцы отчётов и
+# timeline считаются в тех же границах.
+def now_ts() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+def parse_ts(ts: str) -> Optional[datetime]:
+    # безопасное преобразование строки времени
+    try:
+        return datetime.fromisoformat(ts)
+    except (TypeError, ValueError):
+        try:
+            return datetime.strptime(ts.split(".")[0], "%Y-%m-%dT%H:%M:%S")
+        except (AttributeError, ValueError):
+            return None
+
+def ts_epoch(ts: str) -> Optional[int]:
+    # секунды от эпохи; наивное время считаем UTC
+    dt = parse_ts(ts)
+    return calendar.timegm(dt.utctimetuple()) if dt is not None else None
+
+_NAIVE_ISO = re.compile(r"\d{4}-(0[1-9]|1[0-2])-\d{2}(?:[T ][\d:.]*Z?)?$")
+
+def ts_month(ts: str) -> Optional[Tuple[int, int]]:
+    # (год, месяц) в UTC — те же границы месяцев, что у ts_epoch (timeline,
+    # бюджеты); общая функция для всех помесячных представлений
+    if _NAIVE_ISO.match(ts):
+        # наивное (или Z) ISO-время: месяц — срез строки, без datetime
+        y, m = int(ts[:4]), int(ts[5:7])
+        if 1 <= int(ts[8:10]) <= calendar.monthrange(y, m)[1]:
+            return y, m
+        return None
+    dt = parse_ts(ts)
+    if dt is None:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+    return dt.year, dt.month
+
+# ----------------- File version -----------------
+# mtime + размер: по нему леджер и форма входа замечают, что seed.json переписали
+def file_version(*paths: str) -> tuple:
+    version = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+            version.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            version.append(None)
+    return tuple(version)
+
 # ----------------- Functional Core -----------------
 def add_transaction(trans: Tuple[Transaction, ...], t: Transaction) -> Tuple[Transaction, ...]:
-    # Добавляем новую транзакцию в кортеж
+    # Добавляем новую транзакцию в кортеж (персистентный вектор — без копии)
+    if isinstance(trans, PVector):
+        return trans.append(t)
     return trans + (t,)
 
 def update_budget(budgets: Tuple[Budget, ...], bid: str, new_limit: int) -> Tuple[Budget, ...]:
@@ -42,6 +121,8 @@ def update_budget(budgets: Tuple[Budget, ...], bid: str, new_limit: int) -> Tupl
         for b in budgets
     )
 
+@instrument.timed()
 def account_balance(trans: Tuple[Transaction, ...], acc_id: str) -> int:
+    instrument.rows("transforms.account_balance", trans)
     filtered = tuple(filter(lambda t: t.account_id == acc_id, trans))
     return reduce(lambda acc, t: acc + t.amount, filtered, 0)
@@ -0,0 +1,138 @@
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+from core.domain import Category, Transaction
+from core.pvector import PVector
+
+# ----------------- Category tree index -----------------
+# Строится один раз на набор категорий: итеративный обход в прямом порядке
+# (без рекурсии) даёт каждому узлу интервал [tin, tout) в order.
+#   is_descendant / принадлежность поддереву — O(1)
+#   descendants / subtree                    — O(k), срез order
+#   rollup                                   — все поддеревья за один проход
+
+ROOT = "null"  # виртуальный корень для категорий без родителя
+
+
+def _is_top(parent_id: Optional[str]) -> bool:
+    return parent_id in (None, "null", "")
+
+
+class CategoryTree:
+    def __init__(self, cats: Tuple[Category, ...]):
+        self.lookup: Dict[str, Category] = {c.id: c for c in cats}
+        self.children: Dict[Optional[str], List[str]] = {}
+        for c in cats:
+            self.children.setdefault(c.parent_id, []).append(c.id)
+
+        order: List[Category] = []
+        self.tin: Dict[str, int] = {}
+        self.tout: Dict[str, int] = {}
+        self.depth: Dict[str, int] = {}
+        self.parent: Dict[str, str] = {}
+
+        def walk(start: str, parent: str) -> None:
+            # стек: (id, глубина, выход?) — вместо рекурсивного dfs
+            stack = [(start, 0, False)]
+            self.parent[start] = parent
+            while stack:
+                cid, d, leaving = stack.pop()
+                if leaving:
+                    self.tout[cid] = len(order)
+                    continue
+                if cid in self.tin:  # цикл в parent_id
+                    continue
+                self.tin[cid] = len(order)
+                self.depth[cid] = d
+                order.append(self.lookup[cid])
+                stack.append((cid, d, True))
+                for child in reversed(self.children.get(cid, [])):
+                    if child not in self.tin:
+                        self.parent[child] = cid
+                        stack.append((child, d + 1, False))
+
+        for c in cats:
+            if _is_top(c.parent_id):
+                walk(c.id, ROOT)
+        self.top_end = len(order)
+        # «сироты»: родитель указан, но такой категории нет
+        for c in cats:
+            if (c.id not in self.tin and c.parent_id not in self.lookup
+                    and not _is_top(c.parent_id)):
+                walk(c.id, c.parent_id)
+        self.order: Tuple[Category, ...] = tuple(order)
+
+    # ---------- queries ----------
+    def span(self, root_id: str) -> Tuple[int, int]:
+        if root_id == ROOT:
+            return 0, self.top_end
+        if root_id in self.tin:
+            return self.tin[root_id], self.tout[root_id]
+        return 0, 0
+
+    def is_descendant(self, root_id: str, cid: str) -> bool:
+        # cid лежит в поддереве root_id (включая сам root_id)
+        pos = self.tin.get(cid)
+        if pos is None:
+            return False
+        lo, hi = self.span(root_id)
+        return lo <= pos < hi
+
+    def subtree(self, root_id: str) -> Tuple[Category, ...]:
+        lo, hi = self.span(root_id)
+        return self.order[lo:hi]
+
+    def descendants(self, root_id: str) -> Tuple[Category, ...]:
+        lo, hi = self.span(root_id)
+        return self.order[lo + 1:hi] if root_id in self.tin else self.order[lo:hi]
+
+    def flatten(self, root: str) -> Tuple[Category, ...]:
+        # тот же результат, что и recursion.flatten_categories
+        if root == ROOT:
+            root_cat = Category(id=ROOT, name="Root", parent_id=None, type="virtual")
+            return (root_cat,) + self.order[:self.top_end]
+        if root in self.lookup:
+            return self.subtree(root)
+        result: Tuple[Category, ...] = ()
+        for child in self.children.get(root, []):
+            result += self.subtree(child)
+        return result
+
+    def rollup(self, trans: Iterable[Transaction],
+               expenses_only: bool = True) -> Dict[str, int]:
+        # суммы по поддеревьям для всех узлов: один проход по транзакциям
+        # и один проход снизу вверх по order
+        own: Dict[str, int] = {}
+        for t in trans:
+            if expenses_only and t.amount >= 0:
+                continue
+            own[t.cat_id] = own.get(t.cat_id, 0) + t.amount
+        totals = {c.id: own.get(c.id, 0) for c in self.order}
+        totals[ROOT] = 0
+        for c in reversed(self.order):
+            p = self.parent.get(c.id)
+            if p in totals:
+                totals[p] += totals[c.id]
+        return totals
+
+
+@lru_cache(maxsize=8)
+def _tree_by_value(cats: Tuple[Category, ...]) -> CategoryTree:
+    return CategoryTree(cats)
+
+
+_TREES: Dict[int, Tuple[tuple, CategoryTree]] = {}
+
+def category_tree(cats: Tuple[Category, ...]) -> CategoryTree:
+    # один индекс на версию набора категорий: сначала по identity кортежа
+    # (без хэширования), затем по значению. Список можно поменять на месте —
+    # для него индекс строится заново, как ftypes.id_index
+    if not isinstance(cats, (tuple, PVector)):
+        return CategoryTree(tuple(cats))
+    hit = _TREES.get(id(cats))
+    if hit is not None and hit[0] is cats:
+        return hit[1]
+    tree = _tree_by_value(tuple(cats))
+    if len(_TREES) >= 8:
+        _TREES.clear()
+    _TREES[id(cats)] = (cats, tree)
+    return tree
@@ -0,0 +1,18 @@
+import shutil
+import pytest
+from core.service import Ledger
+
+
+@pytest.fixture
+def seed_path(tmp_path):
+    # копия data/seed.json: журнал, снапшот и сжатие пишут рядом с ней
+    seed = tmp_path / "seed.json"
+    shutil.copy("data/seed.json", seed)
+    return str(seed)
+
+
+@pytest.fixture
+def ledger(seed_path):
+    ledger = Ledger(seed_path)
+    yield ledger
+    ledger.journal.close()
@@ -0,0 +1,52 @@
+from dataclasses import replace
+from core.access import OwnershipIndex
+from core.transforms import load_seed
+from core.domain import Transaction, User
+
+# Test 1: visible/own match the list comprehensions the app used to run
+def test_ownership_matches_scans():
+    accs, _, trans, _ = load_seed("data/seed.json")
+    idx = OwnershipIndex(accs, trans)
+    for username in ("admin", "user1", "user2", "nobody"):
+        acc_ids = [a.id for a in accs if a.user_id == username]
+        assert [a.id for a in idx.accounts(username)] == acc_ids
+        visible = tuple(t for t in trans if t.account_id in acc_ids)
+        own = tuple(t for t in trans if t.user_id == username and not t.deleted)
+        assert idx.visible(username, trans) == visible
+        assert idx.own(username, trans) == own
+
+# Test 2: cached view is reused until a change touches that user
+def test_ledger_visible_cache_invalidation(ledger):
+    user1, user2 = User("user1", "", "user"), User("user2", "", "user")
+    v1, v2 = ledger.visible_to(user1), ledger.visible_to(user2)
+    assert ledger.visible_to(user1) is v1
+
+    ledger.add(Transaction("tx_u1", "acc4", "user1", "food", -10,
+                           "2031-01-01T00:00:00", ""))
+    assert ledger.visible_to(user2) is v2
+    assert ledger.visible_to(user1)[-1].id == "tx_u1"
+    ledger.delete("tx_u1")
+    assert ledger.visible_to(user1)[-1].deleted
+    own = ledger.ownership.own("user1", ledger.transactions)
+    assert all(t.id != "tx_u1" for t in own)
+    assert ledger.visible_to(User("admin", "", "admin")) is ledger.transactions
+
+# Test 3: re-adding a transaction under another account moves it to the new owner
+def test_replace_moves_transaction_between_owners(ledger):
+    old = ledger.get("t033")
+    assert old.account_id == "acc4" and old.user_id == "user1"
+    ledger.visible_to(User("user1", "", "user"))
+    ledger.ownership.own("user1", ledger.transactions)
+    ledger.ownership.visible("admin", ledger.transactions)
+
+    ledger.add(replace(old, account_id="acc1", user_id="admin"))
+    trans = ledger.transactions
+    assert "t033" not in {t.id for t in ledger.ownership.visible("user1", trans)}
+    assert "t033" not in {t.id for t in ledger.ownership.own("user1", trans)}
+    assert "t033" in {t.id for t in ledger.ownership.visible("admin", trans)}
+    assert "t033" in {t.id for t in ledger.ownership.own("admin", trans)}
+    fresh = OwnershipIndex(ledger.accounts, trans)
+    for username in ("admin", "user1", "user2"):
+        visible = ledger.ownership.visible(username, trans)
+        assert visible == fresh.visible(username, trans)
+        assert ledger.ownership.own(username, trans) == fresh.own(username, trans)
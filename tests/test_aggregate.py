@@ -0,0 +1,27 @@
+from core.aggregate import total, total_abs, count, minimum, maximum, mean, summarize
+from core.recursion import sum_expenses_recursive
+from core.memo import forecast_expenses
+from core.transforms import load_seed
+from core.domain import Transaction
+
+# Test 1: kernels on lists, generators and empty input
+def test_kernels_basic():
+    vals = [3, -1, 7, -5]
+    assert total(vals) == 4 and total(iter(vals)) == 4
+    assert total_abs(vals) == 16
+    assert count(vals) == 4 and count(iter(vals)) == 4
+    assert minimum(vals) == -5 and maximum(vals) == 7
+    assert mean(vals) == 1.0
+    empty = {"sum": 0, "count": 0, "min": None, "max": None, "mean": 0.0}
+    assert summarize([]) == empty
+    assert summarize(vals)["max"] == 7
+
+# Test 2: long categories no longer hit the recursion limit
+def test_long_category_no_recursion_error():
+    _, cats, _, _ = load_seed("data/seed.json")
+    trans = tuple(
+        Transaction(f"t{i}", "acc1", "admin", "food", -10, "2025-01-01T00:00:00", "")
+        for i in range(20000)
+    )
+    assert sum_expenses_recursive(cats, trans, "food") == -200000
+    assert forecast_expenses("food", trans, 4) == 50000
@@ -0,0 +1,79 @@
+import random
+from dataclasses import replace
+from core.balances import BalanceIndex
+from core.service import Ledger
+from core.transforms import load_seed
+from core.domain import Transaction
+
+
+def _live_balance(trans, acc_id, upto=None):
+    return sum(t.amount for t in trans
+               if t.account_id == acc_id and not t.deleted
+               and (upto is None or t.ts <= upto))
+
+# Test 1: totals and "as of" balances match a full scan
+def test_balance_index_matches_scan():
+    accs, _, trans, _ = load_seed("data/seed.json")
+    idx = BalanceIndex.build(trans)
+    for a in accs:
+        assert idx.balance(a.id) == _live_balance(trans, a.id)
+        mid = "2025-03-15T00:00:00"
+        assert idx.balance_as_of(a.id, mid) == _live_balance(trans, a.id, mid)
+    assert idx.total() == sum(_live_balance(trans, a.id) for a in accs)
+
+# Test 2: incremental add (in order and back-dated) and soft delete
+def test_balance_index_incremental_updates():
+    _, _, trans, _ = load_seed("data/seed.json")
+    idx = BalanceIndex.build(trans)
+    late = Transaction("tx_late", "acc1", "admin", "food", -700,
+                       "2030-01-01T00:00:00", "")
+    early = Transaction("tx_early", "acc1", "admin", "food", -300,
+                        "2024-01-01T00:00:00", "")
+    idx.add(late)
+    idx.add(early)
+    trans = trans + (late, early)
+    victim = next(t for t in trans if t.account_id == "acc1" and not t.deleted)
+    idx.update(replace(victim, deleted=True))
+    trans = tuple(replace(t, deleted=True) if t.id == victim.id else t for t in trans)
+
+    assert idx.balance("acc1") == _live_balance(trans, "acc1")
+    for ts in ("2024-06-01T00:00:00", "2025-06-01T00:00:00", "2031-01-01T00:00:00"):
+        assert idx.balance_as_of("acc1", ts) == _live_balance(trans, "acc1", ts)
+
+# Test 3: Ledger keeps the index in sync with add/delete
+def test_ledger_add_delete_updates_balances(ledger):
+    before = ledger.balances.balance("acc2")
+    t = Transaction("tx_l", "acc2", "admin", "food", -1000, "2031-01-01T00:00:00", "")
+    ledger.add(t)
+    assert ledger.balances.balance("acc2") == before - 1000
+    assert ledger.delete("tx_l").deleted
+    assert ledger.balances.balance("acc2") == before
+    ledger.journal.close()
+    fresh = Ledger(ledger.seed_path)
+    assert fresh.get("tx_l").deleted
+    fresh.journal.close()
+
+# Test 4: back-dated inserts and moves between accounts/dates stay exact
+def test_balance_index_backdated_and_moves():
+    rnd = random.Random(7)
+    _, _, trans, _ = load_seed("data/seed.json")
+    rows = {t.id: t for t in trans}
+    idx = BalanceIndex.build(trans)
+    for i in range(500):
+        ts = f"{rnd.randint(2018, 2032)}-{rnd.randint(1, 12):02d}-15T12:00:00"
+        if i % 2:
+            t = Transaction(f"tx_r{i}", rnd.choice(("acc1", "acc2")), "admin",
+                            "food", rnd.randint(-500, 500), ts, "")
+            idx.add(t)
+        else:
+            old = rnd.choice(list(rows.values()))
+            t = replace(old, ts=ts, account_id=rnd.choice(("acc1", "acc2")),
+                        deleted=rnd.random() < 0.3)
+            idx.update(t)
+        rows[t.id] = t
+    trans = tuple(rows.values())
+    for acc in ("acc1", "acc2"):
+        assert idx.balance(acc) == _live_balance(trans, acc)
+        for y in range(2017, 2034):
+            ts = f"{y}-06-15T12:00:00"
+            assert idx.balance_as_of(acc, ts) == _live_balance(trans, acc, ts)
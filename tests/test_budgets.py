@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, timezone
+from core.budgets import BudgetEngine, period_window, check_budgets
+from core.ftypes import check_budget
+from core.transforms import load_seed, now_ts, parse_ts
+from core.domain import Budget, Transaction
+
+
+def _tx(tid, cat, amount, ts, deleted=False):
+    return Transaction(tid, "acc1", "admin", cat, amount, ts, "", deleted)
+
+# Test 1: unknown period behaves like check_budget over the whole history
+def test_engine_matches_check_budget_for_whole_history():
+    _, _, trans, _ = load_seed("data/seed.json")
+    buds = (Budget("bf", "food", 1000, "all"), Budget("bh", "housing", 10 ** 9, "all"))
+    res = check_budgets(buds, trans)
+    for b in buds:
+        assert res[b.id].is_right() == check_budget(b, trans).is_right()
+
+# Test 2: period windows and the deleted flag are respected
+def test_engine_period_and_deleted():
+    as_of = datetime(2025, 3, 12, 10, 0)
+    trans = (
+        _tx("a", "food", -600, "2025-03-01T00:00:00"),
+        _tx("b", "food", -600, "2025-02-28T23:59:59"),      # прошлый месяц
+        _tx("c", "food", -600, "2025-03-11T00:00:00", True),  # удалена
+        _tx("d", "food", -300, "2025-03-10T08:00:00"),      # эта неделя
+    )
+    budgets = (Budget("m", "food", 1000, "month"), Budget("w", "food", 200, "week"))
+    engine = BudgetEngine(budgets, trans, as_of)
+    assert engine.spent == [900, 300]
+    assert engine.results()["m"].is_right()
+    assert engine.alerts()[0]["budget_id"] == "w"
+    monday = period_window("day", datetime(2025, 3, 10))[0]
+    assert period_window("week", as_of)[0] == monday
+
+# Test 3: incremental add touches only budgets of that category
+def test_engine_incremental():
+    as_of = datetime(2025, 3, 12)
+    budgets = (Budget("m", "food", 1000, "month"),
+               Budget("t", "transport", 10, "month"))
+    engine = BudgetEngine(budgets, (), as_of)
+    assert engine.add(_tx("x", "food", -1500, "2025-03-02T00:00:00")) == ["m"]
+    assert not engine.results()["m"].is_right() and engine.results()["t"].is_right()
+    engine.remove(_tx("x", "food", -1500, "2025-03-02T00:00:00"))
+    assert engine.results()["m"].is_right()
+
+# Test 4: Ledger keeps budget status current on add/delete
+def test_ledger_budget_status(ledger):
+    b = ledger.budgets[0]
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    ledger.add(Transaction("big", "acc1", "admin", b.cat_id, -(b.limit + 1),
+                           now.isoformat(timespec="seconds"), ""))
+    assert not ledger.budget_status()[b.id].is_right()
+    ledger.delete("big")
+    assert ledger.budget_status()[b.id].is_right()
+
+# Test 5: one UTC convention for timestamps written by the app and budget windows
+def test_now_ts_is_utc_in_current_window():
+    ts = now_ts()
+    as_of = parse_ts(ts)
+    assert as_of.utcoffset() == timedelta(0)
+    day = Budget("d", "food", 10, "day")
+    assert BudgetEngine((day,), (_tx("n", "food", -5, ts),), as_of).spent == [5]
+    # +03:00 ещё в марте по UTC; наивное время — UTC
+    as_of = datetime(2025, 3, 31, 23, 0, tzinfo=timezone.utc)
+    trans = (_tx("a", "food", -1, "2025-04-01T01:00:00+03:00"),
+             _tx("b", "food", -2, "2025-03-31T23:30:00"),
+             _tx("c", "food", -4, "2025-04-01T00:30:00"))
+    assert BudgetEngine((Budget("m", "food", 10, "month"),), trans, as_of).spent == [3]
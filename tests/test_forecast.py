@@ -0,0 +1,46 @@
+import core.forecast as fc
+from core.forecast import category_month_matrix, forecast_matrix, forecast_table, MODELS
+from core.report import ReportCube
+from core.transforms import load_seed
+from core.domain import Transaction
+
+# Test 1: matrix covers every calendar month, gaps are zero
+def test_category_month_matrix():
+    trans = (
+        Transaction("a", "acc1", "u", "food", -100, "2025-01-05T00:00:00", ""),
+        Transaction("b", "acc1", "u", "food", -50, "2025-03-05T00:00:00", ""),
+        Transaction("c", "acc2", "u", "fun", -7, "2025-03-06T00:00:00", ""),
+        Transaction("d", "acc2", "u", "salary", 900, "2025-02-01T00:00:00", ""),
+    )
+    cats, months, X = category_month_matrix(ReportCube(trans))
+    assert cats == ("food", "fun")
+    assert months == ((2025, 1), (2025, 2), (2025, 3))
+    assert [list(r) for r in X] == [[100, 0, 50], [0, 0, 7]]
+    _, _, Y = category_month_matrix(ReportCube(trans), accounts={"acc1"})
+    assert [list(r) for r in Y] == [[100, 0, 50], [0, 0, 0]]
+
+# Test 2: models on known series
+def test_forecast_models():
+    res = forecast_matrix([[10.0, 20.0, 30.0, 40.0]], window=3, alpha=0.5)
+    assert float(res["ma"]["forecast"][0]) == 30.0
+    assert abs(float(res["trend"]["forecast"][0]) - 50.0) < 1e-9
+    # ses: 10 -> 15 -> 22.5 -> 31.25
+    assert float(res["ses"]["forecast"][0]) == 31.25
+    assert float(res["trend"]["mae"][0]) < float(res["ma"]["mae"][0])
+
+# Test 3: vectorized and row-wise paths agree for all seed categories
+def test_forecast_table_paths_agree():
+    _, _, trans, _ = load_seed("data/seed.json")
+    cube = ReportCube(trans)
+    table = forecast_table(cube, window=4, alpha=0.3)
+    assert {r["cat_id"] for r in table} == {k[0] for k in cube.spent}
+    assert all(r["best"] in MODELS for r in table)
+
+    saved, fc.np = fc.np, None
+    try:
+        rowwise = forecast_table(cube, window=4, alpha=0.3)
+    finally:
+        fc.np = saved
+    for a, b in zip(table, rowwise):
+        for k, v in a.items():
+            assert v == b[k] or abs(v - b[k]) <= 0.01, (k, v, b[k])
@@ -0,0 +1,36 @@
+from core.frame import TransactionFrame
+from core.transforms import load_seed, account_balance
+from core.ftypes import check_budget
+
+# Test 1: frame round-trips back to the same Transaction objects
+def test_frame_round_trip():
+    _, _, trans, _ = load_seed("data/seed.json")
+    frame = TransactionFrame.from_transactions(trans)
+    assert len(frame) == len(trans)
+    assert tuple(frame.to_transactions()) == trans
+
+# Test 2: filters and sums agree with the tuple-based functions
+def test_frame_filters_match_scans():
+    _, _, trans, buds = load_seed("data/seed.json")
+    frame = TransactionFrame.from_seed("data/seed.json")
+    assert frame.where(account_id="acc3").sum() == account_balance(trans, "acc3")
+
+    start, end = "2025-01-01T00:00:00", "2025-01-31T23:59:59"
+    jan = frame.where(start=start, end=end)
+    assert len(jan) == sum(1 for t in trans if start <= t.ts <= end)
+
+    food = frame.where(cat_id="food", max_amount=-1)
+    assert food.sum() == sum(
+        t.amount for t in trans if t.cat_id == "food" and t.amount < 0)
+    assert len(frame.where(cat_id="missing")) == 0
+
+    spent = -frame.where(cat_id=buds[0].cat_id).sum(expenses_only=True)
+    assert check_budget(buds[0], trans).is_right() == (spent <= buds[0].limit)
+
+# Test 3: group_sum by dictionary-encoded column
+def test_frame_group_sum():
+    _, _, trans, _ = load_seed("data/seed.json")
+    frame = TransactionFrame.from_transactions(trans)
+    groups = frame.group_sum("user_id")
+    users = {t.user_id for t in trans}
+    assert groups == {u: sum(t.amount for t in trans if t.user_id == u) for u in users}
@@ -0,0 +1,82 @@
+from dataclasses import replace
+from core.frp import (EventStream, MonthlyCategoryView, ForecastView, TX_ADDED,
+                      TX_DELETED)
+from core.memo import forecast_expenses
+from core.domain import Transaction
+from core.transforms import load_seed
+from core.report import ReportCube
+
+
+# Test 1: subscribers get events by name, unsubscribe stops delivery
+def test_event_stream_subscribe():
+    stream = EventStream()
+    seen, everything = [], []
+    off = stream.subscribe(seen.append, TX_ADDED)
+    stream.subscribe(everything.append)
+    stream.emit(TX_ADDED, {"x": 1})
+    stream.emit(TX_DELETED, {"x": 2})
+    off()
+    stream.emit(TX_ADDED, {"x": 3})
+    assert [e.payload["x"] for e in seen] == [1]
+    assert [e.name for e in everything] == [TX_ADDED, TX_DELETED, TX_ADDED]
+    assert [e.payload["x"] for e in stream.since(1)] == [2, 3]
+
+# Test 2: monthly view matches a full scan and forecasts match memo
+def test_monthly_view_matches_scan():
+    _, _, trans, _ = load_seed("data/seed.json")
+    view = MonthlyCategoryView(trans)
+    expected = {}
+    for t in trans:
+        if t.cat_id == "food" and not t.deleted:
+            key = (int(t.ts[:4]), int(t.ts[5:7]))
+            expected[key] = expected.get(key, 0) + t.amount
+    assert view.monthly("food") == expected
+    forecasts = ForecastView(view)
+    assert forecasts.forecast("food", 3) == forecast_expenses("food", trans, 3)
+    accs = ("acc1", "acc2")
+    assert forecasts.forecast("food", 3, set(accs)) == sum(
+        -t.amount for t in trans
+        if t.cat_id == "food" and t.amount < 0 and t.account_id in accs) // 3
+
+# Test 3: ledger changes flow into balances, monthly totals, budgets and forecasts
+def test_ledger_views_follow_events(ledger):
+    events = []
+    ledger.events.subscribe(events.append)
+    before = ledger.monthly.monthly("food").get((2030, 1), 0)
+    f0 = ledger.forecasts.forecast("food", 1)
+    bal = ledger.balances.balance("acc2")
+
+    t = Transaction("tx_frp", "acc2", "admin", "food", -700,
+                    "2030-01-15T10:00:00", "frp")
+    ledger.add(t)
+    assert ledger.monthly.monthly("food")[(2030, 1)] == before - 700
+    assert ledger.forecasts.forecast("food", 1) == f0 + 700
+    assert ledger.balances.balance("acc2") == bal - 700
+
+    ledger.delete("tx_frp")
+    assert [e.name for e in events] == [TX_ADDED, TX_DELETED]
+    assert events[1].payload["old"] == t
+    assert events[1].payload["tx"] == replace(t, deleted=True)
+    assert (2030, 1) not in ledger.monthly.monthly("food")
+    assert ledger.forecasts.forecast("food", 1) == f0
+    assert ledger.balances.balance("acc2") == bal
+
+# Test 4: a failing handler does not stop the others; its view is rebuilt
+def test_failing_handler_is_isolated(ledger):
+    seen = []
+    ledger.events.subscribe(lambda e: 1 / 0, TX_ADDED)
+    ledger.events.subscribe(seen.append)
+    broken = ledger.cube
+
+    def boom(*args):
+        raise RuntimeError("cube")
+    broken.add = boom
+    bal = ledger.balances.balance("acc2")
+
+    t = Transaction("tx_iso", "acc2", "admin", "food", -300, "2030-03-01T10:00:00", "")
+    ledger.add(t)
+    assert [e.name for e in seen] == [TX_ADDED] and ledger.events.errors == 2
+    assert ledger.balances.balance("acc2") == bal - 300
+    assert ledger.cube is not broken and not ledger.stale
+    rebuilt = ReportCube(ledger.transactions)
+    assert sorted(ledger.cube.cells()) == sorted(rebuilt.cells())
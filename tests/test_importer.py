@@ -0,0 +1,79 @@
+import json
+import pytest
+from core.importer import import_statement, to_transaction, RowError
+from core.service import Ledger
+
+
+# Test 1: CSV rows are mapped, validated and committed; bad rows are counted
+def test_import_csv_statement(ledger, tmp_path):
+    before = len(ledger.transactions)
+    path = tmp_path / "statement.csv"
+    path.write_text(
+        "ts,amount,cat_id,note\n"
+        "2025-06-01T10:00:00,-1 200,food,Магазин\n"
+        "2025-06-02T11:00:00,\"-350,00\",transport,Метро\n"
+        "2025-06-03T12:00:00,-99,nope,Неизвестно\n"
+        "not-a-date,-1,food,Битая дата\n"
+        "2025-06-04T12:00:00,-1.5,food,Копейки\n",
+        encoding="utf-8",
+    )
+    defaults = {"user_id": "admin", "account_id": "acc2"}
+    report = import_statement(ledger, str(path), defaults, chunk_size=2)
+    counts = (report.rows, report.imported, report.rejected, report.duplicates)
+    assert counts == (5, 2, 3, 0)
+    by_row = {e["row"]: e for e in report.errors}
+    assert by_row[4]["errors"] == [{"error": "category_not_found", "cat_id": "nope"}]
+    assert by_row[5]["error"] == "bad_ts" and by_row[6]["error"] == "bad_amount"
+    assert len(ledger.transactions) == before + 2
+    assert ledger.transactions[-1].amount == -350
+
+    # повторный импорт той же выписки — только дубли
+    again = import_statement(ledger, str(path), defaults)
+    assert again.imported == 0 and again.duplicates == 2
+
+# Test 2: JSONL with explicit ids deduplicates against the ledger and within the file
+def test_import_jsonl_dedupes(ledger, tmp_path):
+    existing = ledger.transactions[0]
+    base = {"account_id": "acc1", "user_id": "admin", "cat_id": "food",
+            "ts": "2025-06-01T00:00:00"}
+    rows = [
+        {**base, "id": existing.id, "amount": -1},
+        {**base, "id": "new1", "amount": -2},
+        {**base, "id": "new1", "amount": -3},
+    ]
+    path = tmp_path / "statement.jsonl"
+    broken = "\n{broken\n[1, 2]\n5\n\"x\"\n"
+    path.write_text("\n".join(json.dumps(r) for r in rows) + broken, encoding="utf-8")
+    report = import_statement(ledger, str(path))
+    assert (report.imported, report.duplicates, report.rejected) == (1, 2, 4)
+    assert ledger.get(existing.id) == existing
+    assert ledger.get("new1").amount == -2
+    assert report.rows_per_sec > 0
+
+# Test 3: missing fields are reported per row
+def test_to_transaction_missing_field():
+    with pytest.raises(RowError) as e:
+        to_transaction({"ts": "2025-01-01T00:00:00", "amount": "1"})
+    assert e.value.info == {"error": "missing_field", "field": "account_id"}
+    with pytest.raises(RowError) as e:
+        to_transaction([1, 2])
+    assert e.value.info == {"error": "bad_row"}
+
+# Test 4: a batch lands as one event and leaves the views as a reload would
+def test_add_many_bulk_matches_reload(ledger):
+    from core.frp import TX_BATCH
+    from core.domain import Transaction
+    events = []
+    ledger.events.subscribe(events.append)
+    rows = [Transaction(f"b{i}", "acc1", "admin", "food", -i,
+                        f"20{20 + i % 9}-0{i % 9 + 1}-1{i % 10}T08:00:00", "bulk")
+            for i in range(40)]
+    ledger.add_many(rows + [Transaction("b3", "acc2", "admin", "food", -99,
+                                        "2019-01-01T00:00:00", "moved")])
+    assert [e.name for e in events][0] == TX_BATCH
+    fresh = Ledger(ledger.seed_path)
+    assert [t.id for t in ledger.timeline.trans] == [t.id for t in fresh.timeline.trans]
+    assert ledger.pages.keys == fresh.pages.keys
+    for acc in ("acc1", "acc2"):
+        assert ledger.balances.balance(acc) == fresh.balances.balance(acc)
+    assert ledger.get("b3").account_id == "acc2" and not ledger.stale
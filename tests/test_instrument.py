@@ -0,0 +1,83 @@
+import json
+from core import instrument
+from core.instrument import capture, span, timed
+from core.transforms import load_seed, account_balance
+from core.recursion import flatten_categories, sum_expenses_recursive
+from core.memo import forecast_expenses
+from core.recursion import by_date_range
+from core.lazy import Query
+
+
+def _fresh(on: bool = True):
+    instrument.reset()
+    instrument.enable(on)
+
+# Test 1: disabled instrumentation records nothing
+def test_disabled_records_nothing():
+    _fresh(False)
+    _, _, trans, _ = load_seed("data/seed.json")
+    account_balance(trans, "acc1")
+    with span("block"):
+        pass
+    assert instrument.snapshot() == {}
+
+# Test 2: calls, latency percentiles, rows and cache hit rates
+def test_core_functions_are_instrumented():
+    _fresh()
+    try:
+        _, cats, trans, _ = load_seed("data/seed.json")
+        for _ in range(3):
+            account_balance(trans, "acc1")
+        sum_expenses_recursive(flatten_categories(cats, "null"), trans, "null")
+        fresh = tuple(trans)
+        forecast_expenses("food", fresh, 3)
+        forecast_expenses("food", fresh, 3)
+        m = instrument.snapshot()
+    finally:
+        instrument.enable(False)
+    assert m["transforms.load_seed"]["calls"] == 1
+    bal = m["transforms.account_balance"]
+    assert bal["calls"] == 3 and bal["rows"] == 3 * len(trans)
+    assert bal["p50_ms"] <= bal["p95_ms"] <= bal["p99_ms"] <= bal["max_ms"]
+    assert m["recursion.sum_expenses_recursive"]["rows"] == len(trans)
+    assert m["frp.forecast"]["cache_hit_rate"] == 0.5
+    assert json.loads(instrument.export_json())["metrics"].keys() == m.keys()
+
+# Test 3: decorator keeps errors and names; capture produces a report
+def test_timed_errors_and_capture():
+    _fresh()
+    try:
+        @timed("custom.boom")
+        def boom():
+            raise ValueError("x")
+        try:
+            boom()
+        except ValueError:
+            pass
+        with capture("cprofile") as prof:
+            sum(range(1000))
+        with capture("tracemalloc") as mem:
+            _ = [0] * 1000
+        m = instrument.snapshot()["custom.boom"]
+    finally:
+        instrument.enable(False)
+    assert m["calls"] == 1 and m["errors"] == 1
+    assert "function calls" in prof.report
+    assert mem.report.startswith("current=")
+
+# Test 4: ledger paths used by the pages report their metrics
+def test_ledger_paths_are_instrumented(ledger):
+    _fresh()
+    try:
+        query = Query.over(ledger).where(by_date_range("2025-01-01", "2025-12-31"))
+        found = query.count()
+        ledger.forecasts.forecast("food", 3)
+        ledger.forecasts.forecast("food", 3)
+        ledger.cube.monthly("food", last=3)
+        m = instrument.snapshot()
+    finally:
+        instrument.enable(False)
+    assert m["lazy.query.count"]["calls"] == 1
+    assert m["timeline.between"]["rows"] == m["lazy.query:date_range"]["rows"] >= found
+    assert m["frp.forecast"]["calls"] == 2 and m["frp.forecast"]["cache_hits"] == 1
+    assert m["report.cube.monthly"]["calls"] == 1
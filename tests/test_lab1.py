@@ -40,3 +40,9 @@ def test_immutability_dataclass_frozen():
     b = Budget("bx", "cat6", 100, "month")
     with pytest.raises(Exception):
         b.limit = 200
+
+def test_slotted_models_share_interned_ids():
+    _, _, trans, _ = load_seed(str(DATA))
+    assert not hasattr(trans[0], "__dict__")
+    same_cat = [t for t in trans if t.cat_id == "food"]
+    assert all(t.cat_id is same_cat[0].cat_id for t in same_cat)
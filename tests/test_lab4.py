@@ -1,7 +1,8 @@
 import pytest
-from core.ftypes import Maybe, Either, safe_category, validate_transaction, check_budget
+from core.ftypes import (Maybe, Either, safe_category, validate_transaction,
+                         validate_transactions, collect_errors, check_budget)
 from core.transforms import load_seed
-from core.domain import Transaction
+from core.domain import Category, Transaction
 
 # Test 1: Tests how Maybe works with map, bind, and get_or_else
 def test_maybe_map_bind_get_or_else():
@@ -41,3 +42,36 @@ def test_check_budget_over_and_ok():
     b = buds[0]                                  # take the first budget
     res = check_budget(b, trans)                 # validate against transactions
     assert isinstance(res, Either)               # result must always be Either type
+
+# Test 6: batch validation collects every error of every bad row with its index
+def test_validate_transactions_collects_all_errors():
+    accs, cats, trans, _ = load_seed("data/seed.json")
+    bad = Transaction("bad", "noacc", "admin", "nocat", -1, "2025-01-01", "")
+    batch = list(trans[:5]) + [bad] + list(trans[5:10])
+    res = validate_transactions(batch, accs, cats)
+    assert len(res) == len(batch)
+    errors = collect_errors(res)
+    assert len(errors) == 1 and errors[0]["row"] == 5
+    kinds = [e["error"] for e in errors[0]["errors"]]
+    assert kinds == ["account_not_found", "category_not_found"]
+    assert all(r.is_right() for i, r in enumerate(res) if i != 5)
+
+# Test 7: chunked process-pool validation gives the same results as one pass
+def test_validate_transactions_process_pool():
+    accs, cats, trans, _ = load_seed("data/seed.json")
+    bad = Transaction("bad", "acc1", "admin", "nocat", -1, "2025-01-01", "")
+    batch = list(trans) + [bad]
+    serial = validate_transactions(batch, accs, cats)
+    pooled = validate_transactions(batch, accs, cats, workers=2, chunk_size=20)
+    assert [r.left for r in pooled] == [r.left for r in serial]
+    assert collect_errors(pooled)[-1]["row"] == len(trans)
+
+# Test 8: a list edited in place is not served a stale id index
+def test_validate_against_mutated_list():
+    accs, cats, _, _ = load_seed("data/seed.json")
+    cats = list(cats)
+    t = Transaction("x", "acc1", "admin", "new_cat", -1, "2025-01-01", "")
+    assert not validate_transaction(t, accs, cats).is_right()
+    cats.append(Category("new_cat", "New", None, "expense"))
+    assert validate_transaction(t, accs, cats).is_right()
+    assert safe_category(tuple(cats), "new_cat").is_some()
@@ -0,0 +1,80 @@
+from datetime import date
+from core.lazy import Query
+from core.recursion import by_category, by_date_range, by_day_range, by_amount_range
+from core.compose import pipe
+from core.transforms import load_seed, parse_ts
+from core.domain import Transaction
+
+# Test 1: fused query gives the same rows as chained eager filters
+def test_query_matches_eager_pipeline():
+    _, _, trans, _ = load_seed("data/seed.json")
+    preds = (by_category("food"), by_amount_range(-5000, 0))
+    eager = pipe(trans, *[lambda xs, p=p: [t for t in xs if p(t)] for p in preds])
+    q = Query(trans).where(preds[0]).where(preds[1])
+    assert q.to_list() == eager
+    assert q.count() == len(eager)
+    assert q.select(lambda t: t.id).limit(3).to_list() == [t.id for t in eager[:3]]
+    assert q.first() == eager[0]
+
+# Test 2: limit stops the scan early
+def test_query_limit_is_lazy():
+    seen = []
+
+    def source():
+        for i in range(10 ** 6):
+            seen.append(i)
+            yield i
+
+    assert Query(source()).where(lambda x: x % 2 == 0).limit(3).to_list() == [0, 2, 4]
+    assert len(seen) == 5
+
+# Test 3: date range predicates are pushed down to the ledger timeline
+def test_query_pushdown_to_timeline(ledger):
+    pred = by_date_range("2025-02-01T00:00:00", "2025-02-28T23:59:59")
+    q = Query.over(ledger).where(by_category("food")).where(pred)
+    assert q.explain()["pushdown"] == "date_range"
+    scan = [t for t in ledger.transactions if pred(t) and t.cat_id == "food"]
+    assert sorted(t.id for t in q) == sorted(t.id for t in scan)
+
+# Test 4: pushed-down results keep ledger order and match a plain scan
+def test_query_pushdown_keeps_source_order(ledger):
+    # позже по времени, раньше в леджере; смещение пояса; неразбираемая дата
+    for tx_id, ts in (("tx_late", "2025-02-27T10:00:00"),
+                      ("tx_tz", "2025-02-01T05:00:00+14:00"),
+                      ("tx_bad", "2025-02-15T25:00:00"),
+                      ("tx_early", "2025-02-02T10:00:00")):
+        ledger.add(Transaction(tx_id, "acc1", "admin", "food", -5, ts, ""))
+    pred = by_date_range("2025-02-01T00:00:00", "2025-02-28T23:59:59")
+    pushed = Query.over(ledger).where(pred)
+    scan = Query(ledger.transactions).where(pred)
+    assert pushed.explain()["pushdown"] == "date_range"
+    assert pushed.to_list() == scan.to_list()
+    assert {"tx_late", "tx_tz", "tx_bad", "tx_early"} <= {t.id for t in pushed}
+
+# Test 5: a predicate after select sees the projected items
+def test_where_after_select():
+    _, _, trans, _ = load_seed("data/seed.json")
+    q = Query(trans).where(by_category("food")).select(lambda t: -t.amount)
+    q = q.where(lambda a: a > 1000)
+    food = [-t.amount for t in trans if t.cat_id == "food"]
+    assert q.to_list() == [a for a in food if a > 1000]
+    assert q.explain()["predicates"] == ["category", "custom"]
+
+# Test 6: the day filter keeps the baseline parse_ts(ts).date() boundaries
+def test_day_range_boundaries(ledger):
+    for tx_id, ts in (("d_start", "2025-02-01"),
+                      ("d_frac", "2025-02-28T23:59:59.500000"),
+                      ("d_offset", "2025-02-28T23:30:00-05:00"),
+                      ("d_east", "2025-02-01T01:00:00+05:00"),
+                      ("d_before", "2025-01-31T23:59:59"),
+                      ("d_after", "2025-03-01T00:00:00")):
+        ledger.add(Transaction(tx_id, "acc1", "admin", "food", -5, ts, ""))
+    first, last = date(2025, 2, 1), date(2025, 2, 28)
+    pushed = Query.over(ledger).where(by_day_range(first, last))
+    scan = [t for t in ledger.transactions
+            if (dt := parse_ts(t.ts)) and first <= dt.date() <= last]
+    assert pushed.explain()["pushdown"] == "date_range"
+    assert pushed.to_list() == scan
+    ids = {t.id for t in pushed}
+    assert {"d_start", "d_frac", "d_offset", "d_east"} <= ids
+    assert not {"d_before", "d_after"} & ids
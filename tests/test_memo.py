@@ -0,0 +1,85 @@
+from core import memo
+from core.memo import LedgerSnapshot, ForecastCache, forecast_expenses
+from core.transforms import load_seed
+from core.domain import Budget, Transaction, User
+from core.ftypes import check_budget
+from core.recursion import sum_expenses_recursive
+from core.frp import ForecastView, MonthlyCategoryView
+
+# Test 1: a snapshot keeps tuples as they are and copies lists
+def test_snapshot_of_keeps_immutable_input():
+    _, _, trans, _ = load_seed("data/seed.json")
+    assert LedgerSnapshot.of(trans).trans is trans
+    as_list = list(trans)
+    snap = LedgerSnapshot.of(as_list)
+    as_list.pop()
+    assert snap.trans == trans
+
+# Test 2: adding a transaction invalidates only its own category
+def test_add_invalidates_only_touched_category():
+    _, _, trans, _ = load_seed("data/seed.json")
+    view = MonthlyCategoryView(trans)
+    forecasts = ForecastView(view)
+    forecasts.forecast("food", 3)
+    housing = forecasts.forecast("housing", 3)
+
+    t = Transaction("tx_m", "acc1", "admin", "food", -900, "2025-06-01T00:00:00", "")
+    view.added(t)
+    assert forecasts.forecast("housing", 3) == housing
+    after = tuple(trans) + (t,)
+    assert forecasts.forecast("food", 3) == forecast_expenses("food", after, 3)
+    assert forecasts.stats()["misses"] == 3 and forecasts.stats()["hits"] == 1
+
+# Test 3: bounded size with LRU eviction and TTL expiry
+def test_cache_lru_and_ttl():
+    now = [0.0]
+    cache = ForecastCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    for cat in ("food", "housing", "transport"):
+        cache.lookup((cat, 1), (cat,), lambda: 1)
+    assert cache.stats()["size"] == 2 and cache.stats()["evictions"] == 1
+
+    cache.lookup(("transport", 1), ("transport",), lambda: 1)
+    assert cache.stats()["hits"] == 1
+    now[0] = 11.0
+    cache.lookup(("transport", 1), ("transport",), lambda: 1)
+    assert cache.stats()["misses"] == 4 and cache.stats()["size"] == 2
+
+# Test 4: explicit invalidation by category
+def test_invalidate_categories():
+    cache = ForecastCache()
+    cache.lookup(("food", 1), ("food",), lambda: 1)
+    cache.lookup(("housing", 1), ("housing",), lambda: 2)
+    cache.lookup(("both", 1), ("food", "housing"), lambda: 3)
+    cache.invalidate(["food"])
+    assert cache.stats()["size"] == 1
+
+# Test 5: forecast_expenses keeps counting soft-deleted rows, like
+# sum_expenses_recursive and check_budget; the ledger view skips them
+def test_forecast_counts_deleted_like_other_reports():
+    _, cats, trans, _ = load_seed("data/seed.json")
+    t = Transaction("tx_d", "acc1", "admin", "food", -900, "2025-06-01T00:00:00", "",
+                    deleted=True)
+    with_deleted = tuple(trans) + (t,)
+    before = forecast_expenses("food", trans, 3)
+    spent = -sum_expenses_recursive(cats, with_deleted, "food")
+    assert forecast_expenses("food", with_deleted, 3) == spent // 3
+    assert forecast_expenses("food", with_deleted, 3) == (
+        sum(-x.amount for x in trans if x.cat_id == "food" and x.amount < 0) + 900) // 3
+    budget = Budget("b", "food", 0, "month")
+    assert check_budget(budget, with_deleted).left["spent"] == spent
+    live = ForecastView(MonthlyCategoryView(with_deleted))
+    assert live.forecast("food", 3) == before
+
+# Test 6: the non-admin selection is a cached tuple; lists are never cached
+def test_non_admin_selection_and_lists(ledger):
+    owner = next(a.user_id for a in ledger.accounts if a.user_id != "admin")
+    u = User(owner, "x", "user")
+    visible = ledger.visible_to(u)
+    assert ledger.visible_to(u) is visible
+    food = forecast_expenses("food", visible, 3)
+
+    lists = [list(ledger.visible_to(u)) for _ in range(3)]
+    for as_list in lists:
+        assert forecast_expenses("food", as_list, 3) == food
+    cached = [v[0] for v in memo._VIEWS.values()]
+    assert not any(c is x for c in cached for x in lists)
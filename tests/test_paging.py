@@ -0,0 +1,71 @@
+from dataclasses import replace
+from core.paging import KeysetIndex, keyset_index, tx_key
+from core.domain import Transaction, User
+
+
+def _tx(i, ts):
+    return Transaction(f"t{i:03d}", "acc1", "admin", "food", -i, ts, f"note {i}")
+
+
+def _walk(index, size, descending=True):
+    pages, page = [], index.page(size=size, descending=descending)
+    while True:
+        pages.append(page)
+        if page.next is None:
+            return pages
+        page = index.page(after=page.next, size=size, descending=descending)
+
+# Test 1: forward walk covers every row once in (ts, id) order, backward walk mirrors it
+def test_keyset_walk():
+    trans = [_tx(i, f"2030-01-{i % 7 + 1:02d}T10:00:00") for i in range(23)]
+    index = KeysetIndex(trans)
+    expected = sorted(trans, key=tx_key, reverse=True)
+    pages = _walk(index, 5)
+    assert [t for p in pages for t in p.items] == expected
+    assert [p.offset for p in pages] == [0, 5, 10, 15, 20]
+    assert {p.total for p in pages} == {23}
+    assert pages[0].prev is None and pages[-1].next is None
+    back = index.page(before=pages[2].prev, size=5)
+    assert back.items == pages[1].items and back.offset == 5
+
+    asc = _walk(index, 10, descending=False)
+    assert [t for p in asc for t in p.items] == expected[::-1]
+    back = index.page(before=asc[1].prev, size=10, descending=False)
+    assert back.items == asc[0].items
+
+# Test 2: inserts do not shift an open page; soft-delete replaces in place
+def test_keyset_stable_under_inserts():
+    trans = [_tx(i, f"2030-01-{i + 1:02d}T10:00:00") for i in range(10)]
+    index = KeysetIndex(trans)
+    first = index.page(size=4)
+    second = index.page(after=first.next, size=4)
+    index.add(_tx(99, "2030-02-01T10:00:00"))
+    index.add(_tx(98, "2029-12-31T10:00:00"))
+    again = index.page(after=first.next, size=4)
+    assert again.items == second.items and again.total == 12
+    old = trans[5]
+    index.update(old, replace(old, deleted=True))
+    assert replace(old, deleted=True) in index.page(after=first.next, size=4).items
+    assert len(index) == 12
+
+# Test 3: ledger keysets follow events (admin) and cached selections (users)
+def test_ledger_keyset(ledger):
+    admin = User("admin", "x", "admin")
+    newest_first = tuple(sorted(ledger.transactions, key=tx_key, reverse=True))
+    assert ledger.keyset(admin).page(size=10**6).items == newest_first
+
+    owner = next(a.user_id for a in ledger.accounts if a.user_id != "admin")
+    u = User(owner, "x", "user")
+    visible = ledger.keyset(u)
+    assert visible is ledger.keyset(u) and visible is keyset_index(ledger.visible_to(u))
+    assert visible.page(size=1).total == len(ledger.visible_to(u))
+
+    acc = next(a.id for a in ledger.accounts if a.user_id == owner)
+    t = Transaction("tx_page", acc, owner, "food", -10, "2099-01-01T00:00:00", "newest")
+    ledger.add(t)
+    assert ledger.keyset(admin).page(size=1).items == (t,)
+    assert ledger.keyset(u).page(size=1).items == (t,)
+    assert ledger.keyset(u, own=True).page(size=1).items == (t,)
+    ledger.delete("tx_page")
+    assert ledger.keyset(admin).page(size=1).items[0].deleted
+    assert t.id not in {x.id for x in ledger.keyset(u, own=True).page(size=10**6).items}
@@ -0,0 +1,36 @@
+from dataclasses import replace
+from core.pvector import PVector
+from core.memo import LedgerSnapshot
+from core.transforms import load_seed, add_transaction
+from core.domain import Transaction
+
+# Test 1: append/set return new versions and never change the old ones
+def test_pvector_persistence():
+    base = PVector(range(2000))
+    grown = base
+    for i in range(2000, 3100):
+        grown = grown.append(i)
+    changed = grown.set(5, -5).set(3050, -1)
+    assert list(base) == list(range(2000))
+    assert list(grown) == list(range(3100))
+    assert changed[5] == -5 and changed[3050] == -1 and changed[-1] == 3099
+    assert len(changed) == 3100 and changed[10:13] == (10, 11, 12)
+
+# Test 2: untouched subtrees are shared between versions
+def test_pvector_structural_sharing():
+    v1 = PVector(range(5000))
+    v2 = v1.set(4000, "x")
+    assert v1._root[0] is v2._root[0]
+    assert v1._root is not v2._root
+
+# Test 3: ledger snapshot on a PVector appends and replaces without copying the tuple
+def test_snapshot_on_pvector():
+    _, _, trans, _ = load_seed("data/seed.json")
+    snap = LedgerSnapshot.of(PVector(trans))
+    t = Transaction("tx_pv", "acc1", "admin", "food", -1, "2025-06-01T00:00:00", "")
+    added = snap.add(t)
+    assert isinstance(added.trans, PVector) and added.trans[-1] == t
+    deleted = added.update(replace(t, deleted=True), len(trans))
+    assert deleted.trans[-1].deleted and not added.trans[-1].deleted
+    assert tuple(deleted.trans[:-1]) == trans
+    assert isinstance(add_transaction(snap.trans, t), PVector)
@@ -0,0 +1,130 @@
+import csv
+import json
+import pytest
+from dataclasses import replace
+import core.report
+from core.report import ReportCube, report_cube, report_path, run_batch
+from core.service import load_ledger
+from core.balances import BalanceIndex
+from core.tree import category_tree
+from core.transforms import load_seed, ts_month
+from core.forecast import category_month_matrix, forecast_table
+from core.domain import Category, Transaction
+
+# Test 1: cube slices agree with direct scans
+def test_cube_slices_match_scans():
+    _, cats, trans, _ = load_seed("data/seed.json")
+    live = [t for t in trans if not t.deleted]
+    cube = ReportCube(trans)
+
+    food = {}
+    for t in live:
+        if t.cat_id == "food":
+            key = (int(t.ts[:4]), int(t.ts[5:7]))
+            food[key] = food.get(key, 0) + t.amount
+    assert dict(cube.monthly("food")) == food
+    acc1 = sum(t.amount for t in live if t.cat_id == "food" and t.account_id == "acc1")
+    assert cube.total("food", accounts={"acc1"}) == acc1
+    assert cube.by("user", expenses_only=True) == {
+        u: sum(-t.amount for t in live if t.user_id == u and t.amount < 0)
+        for u in {t.user_id for t in live}}
+
+    last = cube.monthly("food", last=3)
+    assert list(last) == list(cube.last_months(3)) and len(last) == 3
+    assert all(last[m] == food.get(m, 0) for m in last)
+
+# Test 2: subtree slices and rollups follow the category tree
+def test_cube_subtree_rollup():
+    cats = (
+        Category("home", "Дом", None, "expense"),
+        Category("rent", "Аренда", "home", "expense"),
+        Category("repair", "Ремонт", "home", "expense"),
+    )
+    trans = (
+        Transaction("a", "acc1", "u", "rent", -100, "2025-01-05T00:00:00", ""),
+        Transaction("b", "acc1", "u", "repair", -40, "2025-02-05T00:00:00", ""),
+        Transaction("c", "acc2", "u", "home", -5, "2025-02-06T00:00:00", ""),
+        Transaction("d", "acc2", "u", "repair", -1000, "2025-02-07T00:00:00", "",
+                    deleted=True),
+    )
+    tree = category_tree(cats)
+    cube = ReportCube(trans)
+    assert dict(cube.monthly("home", tree=tree)) == {(2025, 1): -100, (2025, 2): -45}
+    assert dict(cube.monthly("home")) == {(2025, 2): -5}
+    rolled = cube.rollup(tree)
+    assert rolled["home"] == -145 and rolled["repair"] == -40
+    assert cube.rollup(tree, accounts={"acc2"})["home"] == -5
+
+# Test 3: one cube per ledger version
+def test_report_cube_cached_by_identity():
+    _, _, trans, _ = load_seed("data/seed.json")
+    assert report_cube(trans) is report_cube(trans)
+    changed = trans[:-1] + (replace(trans[-1], deleted=True),)
+    assert report_cube(changed) is not report_cube(trans)
+
+# Test 4: batch reports per user match the interactive ledger numbers
+def test_batch_reports_per_user(seed_path, tmp_path):
+    out = tmp_path / "out"
+    batch = run_batch(seed_path, str(out), fmt="json", workers=0)
+    done = [next(batch)]
+    (mapped,) = core.report._MAPPED.values()
+    done += list(batch)
+    accounts, _, trans, _ = load_ledger(seed_path)
+    assert sorted(d["user"] for d in done) == sorted({a.user_id for a in accounts})
+
+    index = BalanceIndex.build(trans)
+    with open(out / "user1.json", encoding="utf-8") as f:
+        report = json.load(f)
+    balances = {a.id: a.balance + index.balance(a.id)
+                for a in accounts if a.user_id == "user1"}
+    assert report["balances"] == balances
+    assert report["transactions"] == sum(1 for t in trans if t.account_id in balances)
+    assert not (out / ".ledger.snap").exists()
+    assert mapped._mm.closed and not core.report._MAPPED
+
+    pooled = list(run_batch(seed_path, str(out), users=["user1"], fmt="csv", workers=2))
+    assert [d["user"] for d in pooled] == ["user1"]
+    with open(out / "user1.csv", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    balances = {r["key"]: int(r["value"]) for r in rows if r["section"] == "balance"}
+    assert balances == report["balances"]
+
+# Test 5: the ledger cube follows events and agrees with the other monthly views
+def test_ledger_cube_incremental(ledger):
+    cube = ledger.cube
+    ledger.add(Transaction("tx_tz", "acc1", "admin", "food", -70,
+                           "2031-01-31T23:30:00-05:00", ""))
+    ledger.add(replace(ledger.get("t001"), ts="2031-03-05T12:00:00"))
+    ledger.delete("t002")
+    assert ledger.cube is cube
+    fresh = ReportCube(ledger.transactions)
+    assert cube.sums == fresh.sums and cube.spent == fresh.spent
+    assert cube.months == fresh.months and cube.rows == fresh.rows
+
+    # tz offset: один и тот же месяц (UTC) в кубе, monthly-view и timeline
+    assert ts_month("2031-01-31T23:30:00-05:00") == (2031, 2)
+    assert cube.monthly("food", accounts={"acc1"})[(2031, 2)] == -70
+    assert ledger.monthly.monthly("food", {"acc1"})[(2031, 2)] == -70
+    lo, hi = ledger.timeline.month_slices()[(2031, 2)]
+    assert "tx_tz" in {t.id for t in ledger.timeline.trans[lo:hi]}
+
+    # поддерево: прогноз и таблица моделей по тем же категориям
+    cats = ("food", "transport")
+    expected = sum(ledger.monthly.expenses(c) for c in cats) // 3
+    assert ledger.forecasts.forecast_many(cats, 3) == expected
+    tree = category_tree((Category("food", "Food", None, "expense"),
+                          Category("transport", "Transport", "food", "expense")))
+    _, _, sub = category_month_matrix(cube, ["food"], tree=tree)
+    _, _, both = category_month_matrix(cube, ["food", "transport"])
+    summed = [float(a + b) for a, b in zip(both[0], both[1])]
+    assert [float(v) for v in sub[0]] == summed
+    assert forecast_table(cube, ["food"], tree=tree)[0]["last"] == float(sub[0][-1])
+
+# Test 6: unsafe user names are rejected before anything is written
+def test_batch_rejects_unsafe_user_names(seed_path, tmp_path):
+    out = tmp_path / "reports"
+    for name in ("../evil", "a/b", "..", ".hidden", "", "/etc/x"):
+        with pytest.raises(ValueError):
+            list(run_batch(seed_path, str(out), users=[name], workers=0))
+    assert not out.exists() and not (tmp_path / "evil.json").exists()
+    assert report_path(str(out), "user1", "csv") == str(out / "user1.csv")
@@ -0,0 +1,115 @@
+import json
+import subprocess
+import sys
+import pytest
+from core.service import (Journal, JournalBusy, compact, get_ledger, load_ledger,
+                          read_journal)
+from core.transforms import load_seed
+from core.domain import Transaction
+
+
+# Test 1: add/delete go to the journal and are replayed on top of the snapshot
+def test_journal_replay_add_and_delete(seed_path, tmp_path):
+    _, _, base, _ = load_seed(seed_path)
+    j = Journal(str(tmp_path / "seed.journal.jsonl"))
+    t = Transaction("tx_j", "acc1", "admin", "food", -500, "2025-05-01T00:00:00",
+                    "journal")
+    j.append_add(t)
+    j.append_delete(base[0].id)
+    j.close()
+
+    _, _, trans, _ = load_ledger(seed_path)
+    assert len(trans) == len(base) + 1
+    assert trans[-1] == t
+    assert trans[0].deleted is True
+    # seed.json не переписывался
+    assert load_seed(seed_path)[2] == base
+
+# Test 2: compaction folds the journal into seed.json and empties the journal
+def test_compact_moves_journal_into_snapshot(seed_path, tmp_path):
+    j = Journal(str(tmp_path / "seed.journal.jsonl"))
+    t = Transaction("tx_c", "acc2", "admin", "food", -10, "2025-05-02T00:00:00", "")
+    j.append_add(t)
+    before = load_ledger(seed_path)[2]
+
+    assert compact(seed_path, j) == 1
+    assert list(read_journal(j.path)) == []
+    assert load_seed(seed_path)[2] == before
+    with open(seed_path, encoding="utf-8") as f:
+        assert json.load(f)["transactions"][-1]["id"] == "tx_c"
+
+    # запись после сжатия продолжает нумерацию
+    assert j.append_delete("tx_c") == 2
+    j.close()
+    assert load_ledger(seed_path)[2][-1].deleted is True
+
+# Test 3: a torn last line (crash mid-write) is ignored on replay
+def test_replay_skips_torn_line(tmp_path):
+    path = tmp_path / "j.jsonl"
+    torn = '{"seq": 1, "op": "delete", "id": "t001"}\n{"seq": 2, "op": "ad'
+    path.write_text(torn, encoding="utf-8")
+    assert [e["seq"] for e in read_journal(str(path))] == [1]
+    j = Journal(str(path))
+    j.append_delete("t002")
+    j.close()
+    assert [e["seq"] for e in read_journal(str(path))] == [1, 2]
+
+_WRITER = """
+import sys
+from core.service import Journal
+from core.domain import Transaction
+j = Journal(sys.argv[1], sync_every=1000)
+for i in range(300):
+    j.append_add(Transaction(f"{sys.argv[2]}{i}", "acc1", "admin", "food", -1,
+                             "2025-05-03T00:00:00", ""))
+j.close()
+"""
+
+# Test 4: writers in other processes and a compaction here do not lose rows
+# or repeat seq numbers
+def test_journal_shared_between_processes(seed_path, tmp_path):
+    j = Journal(str(tmp_path / "seed.journal.jsonl"))
+    procs = [subprocess.Popen([sys.executable, "-c", _WRITER, j.path, p])
+             for p in ("p", "q")]
+    compacted = 0
+    while any(p.poll() is None for p in procs):
+        compacted += compact(seed_path, j)
+    assert [p.wait() for p in procs] == [0, 0]
+    entries = list(read_journal(j.path))
+    seqs = [e["seq"] for e in entries]
+    assert seqs == sorted(set(seqs)) and j.count == len(entries)
+    assert compacted + len(entries) == 600
+    ids = {t.id for t in load_ledger(seed_path)[2]}
+    assert {f"{p}{i}" for p in "pq" for i in range(300)} <= ids
+    j.close()
+
+# Test 5: get_ledger reloads when another process appends to the journal
+def test_get_ledger_sees_other_writers(seed_path):
+    ledger = get_ledger(seed_path)
+    assert get_ledger(seed_path) is ledger
+    subprocess.run([sys.executable, "-c", _WRITER, ledger.journal.path, "x"],
+                   check=True)
+    fresh = get_ledger(seed_path)
+    assert fresh is not ledger and fresh.get("x299") is not None
+    # своя запись после чужой тоже не оставляет леджер устаревшим
+    subprocess.run([sys.executable, "-c", _WRITER, ledger.journal.path, "y"],
+                   check=True)
+    fresh.add(Transaction("own", "acc1", "admin", "food", -1,
+                          "2025-05-04T00:00:00", ""))
+    again = get_ledger(seed_path)
+    assert again is not fresh and again.get("y0") and again.get("own")
+    ledger.journal.close()
+
+# Test 6: an exclusive journal (console import) refuses while another process
+# has the journal open
+def test_exclusive_journal_refuses_when_open_elsewhere(tmp_path):
+    path = str(tmp_path / "seed.journal.jsonl")
+    holder = subprocess.Popen(
+        [sys.executable, "-c", "import sys; from core.service import Journal; "
+         "j = Journal(sys.argv[1]); print('ok', flush=True); sys.stdin.read()", path],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    assert holder.stdout.readline().strip() == "ok"
+    with pytest.raises(JournalBusy):
+        Journal(path, exclusive=True)
+    holder.communicate("")
+    Journal(path, exclusive=True).close()
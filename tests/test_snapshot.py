@@ -0,0 +1,79 @@
+import json
+import os
+import pytest
+from core.snapshot import (MappedSnapshot, json_to_snapshot, snapshot_to_json,
+                           load_base, snapshot_path_for, is_fresh, main)
+from core.service import compact, ensure_snapshot
+from core.transforms import load_seed
+from core.domain import Transaction
+from core.frame import TransactionFrame
+
+# Test 1: seed.json -> .snap -> seed.json keeps every record
+def test_snapshot_round_trip(tmp_path):
+    snap = json_to_snapshot("data/seed.json", str(tmp_path / "seed.snap"))
+    out = tmp_path / "back.json"
+    snapshot_to_json(snap, str(out))
+    with open("data/seed.json", encoding="utf-8") as f:
+        src = json.load(f)
+    with open(out, encoding="utf-8") as f:
+        back = json.load(f)
+    back.pop("transactions")
+    src.pop("transactions")
+    assert back == src
+    assert load_seed(str(out)) == load_seed("data/seed.json")
+
+# Test 2: mapped columns give the same frame as the JSON loader
+def test_snapshot_frame_matches_seed(tmp_path):
+    snap = MappedSnapshot(json_to_snapshot("data/seed.json",
+                                           str(tmp_path / "seed.snap")))
+    frame = TransactionFrame.from_seed("data/seed.json")
+    assert snap.count == len(frame)
+    assert snap.frame.ids[5] == frame.ids[5] and snap.frame.notes[-1] == frame.notes[-1]
+    expenses = frame.group_sum("cat_id", expenses_only=True)
+    assert snap.frame.group_sum("cat_id", expenses_only=True) == expenses
+    acc1 = tuple(frame.where(account_id="acc1").to_transactions())
+    assert tuple(snap.frame.where(account_id="acc1").to_transactions()) == acc1
+
+# Test 3: a stale snapshot is ignored in favour of seed.json
+def test_load_base_prefers_fresh_snapshot(seed_path):
+    snap = json_to_snapshot(seed_path)
+    assert snap == snapshot_path_for(seed_path)
+    assert load_base(seed_path) == load_seed(seed_path)
+
+    with open(seed_path, encoding="utf-8") as f:
+        data = json.load(f)
+    data["transactions"] = data["transactions"][:3]
+    with open(seed_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.utime(snap, (0, 0))
+    assert len(load_base(seed_path)[2]) == 3
+
+# Test 4: the mapping is released after loading; the CLI prints usage without arguments
+def test_snapshot_close_and_cli(tmp_path, capsys):
+    path = json_to_snapshot("data/seed.json", str(tmp_path / "seed.snap"))
+    with MappedSnapshot(path) as snap:
+        trans = snap.transactions()
+    assert snap.frame is None and snap._mm.closed
+    assert trans == load_seed("data/seed.json")[2]
+
+    with pytest.raises(SystemExit) as exc:
+        main([])
+    assert exc.value.code == 2 and "usage:" in capsys.readouterr().err
+    assert main(["to-json", path, str(tmp_path / "back.json")]) == 0
+
+# Test 5: ensure_snapshot writes seed.snap once; compaction keeps it current
+def test_ensure_snapshot(ledger):
+    seed = ledger.seed_path
+    snap = ensure_snapshot(seed, ledger.journal)
+    assert snap == snapshot_path_for(seed) and is_fresh(snap, seed)
+    os.utime(snap, (os.path.getmtime(seed) + 10,) * 2)
+    stamp = os.path.getmtime(snap)
+    ensure_snapshot(seed, ledger.journal)
+    assert os.path.getmtime(snap) == stamp
+
+    ledger.add(Transaction("tx_snap", "acc1", "admin", "food", -1,
+                           "2025-05-01T00:00:00", ""))
+    compact(seed, ledger.journal)
+    assert is_fresh(snap, seed)
+    assert load_base(seed)[2][-1].id == "tx_snap"
+    assert load_base(seed) == load_seed(seed)
@@ -0,0 +1,48 @@
+import os
+from core import startup
+from core.service import get_ledger
+from core.snapshot import snapshot_path_for
+from benchmarks.bench_startup import CASES, cold, run
+
+# Test 1: modules imported before the login form do not pull in NumPy or the data layer
+def test_login_path_is_light():
+    name, stmt, light = CASES[0]
+    assert name == "login" and light
+    assert cold(stmt)["heavy"] == []
+
+# Test 2: the background loader hands out the shared ledger
+def test_background_ledger(seed_path):
+    th = startup.preload(seed_path)
+    assert startup.preload(seed_path) is th
+    ledger = startup.ledger(seed_path)
+    assert startup.ready(seed_path)
+    assert ledger is get_ledger(seed_path) and len(ledger.transactions) > 0
+    ledger.journal.close()
+
+# Test 3: startup benchmark reports cold timings in the bench_core format
+def test_bench_startup_run(tmp_path):
+    result = run(200, str(tmp_path), only=["login", "load_users"], repeat=1)
+    cases = result["sizes"]["200"]
+    assert set(cases) == {"login", "load_users"} and result["failures"] == []
+    assert all(c["median_ms"] > 0 for c in cases.values())
+
+# Test 4: login users come from the background read, then from the seed.snap header
+def test_login_users(seed_path, monkeypatch):
+    import core.snapshot
+    from core.service import ensure_snapshot
+    from core.transforms import load_users
+    expected = load_users(seed_path)
+    assert startup.users(seed_path) == expected
+    ledger = startup.ledger(seed_path)
+    ensure_snapshot(seed_path, ledger.journal)
+    assert core.snapshot.read_meta(snapshot_path_for(seed_path))["users"]
+
+    def full_parse(path):
+        raise AssertionError("seed.json parsed for login")
+    monkeypatch.setattr(core.snapshot, "load_users", full_parse)
+    assert core.snapshot.base_users(seed_path) == expected
+    with open(seed_path, "a", encoding="utf-8") as f:
+        f.write("\n")
+    os.utime(snapshot_path_for(seed_path))
+    assert startup.users(seed_path) == expected
+    ledger.journal.close()
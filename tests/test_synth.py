@@ -0,0 +1,34 @@
+import json
+from benchmarks.synth import generate, write_seed
+from benchmarks.bench_core import compare
+from core.transforms import load_seed
+from core.ftypes import validate_transactions, collect_errors
+from core.tree import category_tree
+
+# Test 1: generator is deterministic and streaming output matches it
+def test_synth_deterministic(tmp_path):
+    a = generate(2000, users=10, depth=3, fanout=3)
+    assert a == generate(2000, users=10, depth=3, fanout=3)
+    other = generate(2000, users=10, depth=3, fanout=3, seed=7)
+    assert a["transactions"] != other["transactions"]
+
+    path = write_seed(str(tmp_path / "synth.json"), 2000, users=10, depth=3, fanout=3)
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == a
+
+# Test 2: generated ledger is valid and the category tree is deep
+def test_synth_valid_ledger(tmp_path):
+    path = write_seed(str(tmp_path / "synth.json"), 1000, users=5, depth=4, fanout=2)
+    accs, cats, trans, buds = load_seed(path)
+    assert collect_errors(validate_transactions(trans, accs, cats)) == []
+    tree = category_tree(cats)
+    assert max(tree.depth.values()) == 3
+    assert {b.cat_id for b in buds} <= {c.id for c in cats}
+    assert list(trans) == sorted(trans, key=lambda t: t.ts)
+
+# Test 3: regressions are reported relative to the baseline
+def test_bench_compare():
+    base = {"sizes": {"10": {"a": {"median_ms": 1.0}, "b": {"median_ms": 1.0}}}}
+    cur = {"sizes": {"10": {"a": {"median_ms": 1.1}, "b": {"median_ms": 2.0},
+                            "c": {"median_ms": 5.0}}}}
+    assert [s["case"] for s in compare(cur, base, 1.25)] == ["b"]
@@ -0,0 +1,56 @@
+from core.textindex import NoteIndex, tokenize
+from core.lazy import Query
+from core.recursion import by_note, by_date_range, by_amount_range
+from core.domain import Transaction
+from core.transforms import load_seed
+
+
+def _tx(i, note, deleted=False):
+    return Transaction(f"t{i}", "acc1", "admin", "food", -100 * (i + 1),
+                       f"2030-01-{i + 1:02d}T10:00:00", note, deleted)
+
+# Test 1: Cyrillic-aware tokens, AND across words, prefix search, deleted rows hidden
+def test_note_index_search():
+    trans = [_tx(0, "Продукты в магазине «Пятёрочка»"), _tx(1, "КОФЕ с собой"),
+             _tx(2, "продукты, кофе"), _tx(3, "Кофейня", deleted=True)]
+    idx = NoteIndex(trans)
+    assert tokenize("Пятёрочка, КОФЕ!") == ["пятерочка", "кофе"]
+    assert idx.search("продукты") == [0, 2]
+    assert idx.search("кофе продукты") == [2]
+    assert idx.search("коф") == []
+    assert idx.search("коф", prefix=True) == [1, 2]
+    assert idx.search("коф", prefix=True, include_deleted=True) == [1, 2, 3]
+    assert idx.search("пятерочка") == [0]
+    assert idx.search("   ") == [] and idx.search("чай") == []
+    assert idx.terms("ко") == ["кофе", "кофейня"]
+
+# Test 2: the index follows ledger adds, soft-deletes and note edits
+def test_note_index_follows_ledger(ledger):
+    before = ledger.notes.search("продукты")
+    ledger.add(Transaction("tx_ti", "acc1", "admin", "food", -50,
+                           "2030-02-01T09:00:00", "Продукты на дачу"))
+    pos = len(ledger.transactions) - 1
+    assert ledger.notes.search("продукты") == before + [pos]
+    assert ledger.notes.search("дач", prefix=True) == [pos]
+    ledger.delete("tx_ti")
+    assert ledger.notes.search("продукты") == before
+    assert ledger.notes.search("дач", prefix=True, include_deleted=True) == [pos]
+
+    rebuilt = NoteIndex(ledger.transactions)
+    assert rebuilt.postings == ledger.notes.postings
+    assert rebuilt.deleted == ledger.notes.deleted
+
+# Test 3: the note predicate pushes down to the index and combines with other filters
+def test_query_note_pushdown(ledger):
+    _, _, trans, _ = load_seed(ledger.seed_path)
+    word = tokenize(next(t.note for t in trans if t.note and not t.deleted))[0]
+    preds = (by_note(word[:3], prefix=True), by_date_range("2000-01-01", "2100-01-01"),
+             by_amount_range(-10**9, 0))
+
+    query = Query.over(ledger)
+    for p in preds:
+        query = query.where(p)
+    scan = [t for t in trans if all(p(t) for p in preds)]
+    assert query.explain()["pushdown"] == "note"
+    assert query.to_list() == scan and query.count() == len(scan)
+    assert Query(trans).where(by_note("")).count() == 0
@@ -0,0 +1,57 @@
+from dataclasses import replace
+from datetime import date
+from collections import defaultdict
+from core.timeline import Timeline
+from core.recursion import by_date_range
+from core.transforms import load_seed, parse_ts
+from core.domain import Transaction
+
+# Test 1: bisect range query returns the same rows as the closure filter
+def test_between_matches_by_date_range():
+    _, _, trans, _ = load_seed("data/seed.json")
+    tl = Timeline(trans)
+    pred = by_date_range("2025-02-01T00:00:00", "2025-03-31T23:59:59")
+    got = tl.between("2025-02-01T00:00:00", "2025-03-31T23:59:59")
+    assert sorted(t.id for t in got) == sorted(t.id for t in trans if pred(t))
+    # даты (date) включаются целиком
+    assert tl.between(date(2025, 2, 1), date(2025, 3, 31)) == got
+    assert [t.ts for t in got] == sorted(t.ts for t in got)
+
+# Test 2: month buckets give the same sums as the per-row datetime grouping
+def test_monthly_sums_match_parsing():
+    _, _, trans, _ = load_seed("data/seed.json")
+    expected = defaultdict(int)
+    for t in trans:
+        if t.cat_id == "food":
+            dt = parse_ts(t.ts)
+            expected[(dt.year, dt.month)] += t.amount
+    assert Timeline(trans).monthly_sums(lambda t: t.cat_id == "food") == dict(expected)
+
+# Test 3: out-of-order add and soft-delete keep the order and month buckets fresh
+def test_timeline_add_and_update():
+    _, _, trans, _ = load_seed("data/seed.json")
+    tl = Timeline(trans)
+    months = len(tl.month_slices())
+    old = Transaction("tx_old", "acc1", "admin", "food", -1, "2019-06-01T00:00:00", "")
+    tl.add(old)
+    assert tl.trans[0] is old and len(tl.month_slices()) == months + 1
+    tl.update(old, Transaction("tx_old", "acc1", "admin", "food", -1,
+                               "2019-06-01T00:00:00", "", True))
+    assert tl.trans[0].deleted and len(tl) == len(trans) + 1
+
+# Test 4: a replace that changes ts moves the row; unparseable ts is not indexed
+def test_timeline_replace_moves_row(ledger):
+    n = len(ledger.timeline)
+    old = ledger.get("t001")
+    moved = replace(old, ts="2031-03-05T12:00:00")
+    ledger.add(moved)
+    assert len(ledger.timeline) == n
+    assert [t for t in ledger.timeline.trans if t.id == "t001"] == [moved]
+    assert ledger.timeline.trans[-1] == moved
+    assert old not in ledger.timeline.between(old.ts[:10], old.ts[:10])
+
+    tl = Timeline([old, replace(old, id="bad", ts="not a date")])
+    assert len(tl) == 1 and (1970, 1) not in tl.month_slices()
+    tl.add(replace(old, id="bad2", ts=""))
+    tl.update(old, replace(old, ts="garbage"))
+    assert len(tl) == 0
@@ -0,0 +1,56 @@
+from core.tree import category_tree
+from core.recursion import flatten_categories, sum_expenses_recursive
+from core.transforms import load_seed
+from core.domain import Category, Transaction
+
+
+def _deep_cats(depth):
+    cats = [Category("c0", "c0", None, "expense")]
+    cats += [Category(f"c{i}", f"c{i}", f"c{i - 1}", "expense")
+             for i in range(1, depth)]
+    cats += [Category("side", "side", "c1", "expense"),
+             Category("orphan", "orphan", "gone", "expense")]
+    return tuple(cats)
+
+# Test 1: interval queries on a deep chain (no recursion limit)
+def test_deep_tree_intervals():
+    cats = _deep_cats(5000)
+    tree = category_tree(cats)
+    assert tree.is_descendant("c0", "c4999")
+    assert tree.is_descendant("c1", "side")
+    assert not tree.is_descendant("c2", "side")
+    assert [c.id for c in tree.descendants("c4997")] == ["c4998", "c4999"]
+    assert len(flatten_categories(cats, "null")) == 5002
+    assert [c.id for c in flatten_categories(cats, "gone")] == ["orphan"]
+    assert category_tree(cats) is tree
+
+# Test 2: rollup gives the same totals as sum_expenses_recursive for every node
+def test_rollup_matches_sum_expenses_recursive():
+    cats = _deep_cats(50)
+    trans = tuple(
+        Transaction(f"t{i}", "acc1", "admin", f"c{i % 50}", -(i + 1),
+                    "2025-01-01T00:00:00", "")
+        for i in range(500)
+    ) + (Transaction("t_side", "acc1", "admin", "side", -7, "2025-01-01T00:00:00", ""),)
+    rolled = category_tree(cats).rollup(trans)
+    for c in cats[:50] + (cats[50],):
+        assert rolled[c.id] == sum_expenses_recursive(cats, trans, c.id)
+    assert rolled["null"] == sum_expenses_recursive(cats, trans, "null")
+
+# Test 3: seed categories — flatten keeps its original shape
+def test_flatten_seed_root():
+    _, cats, trans, _ = load_seed("data/seed.json")
+    flat = flatten_categories(cats, "null")
+    assert flat[0].id == "null" and [c.id for c in flat[1:]] == [c.id for c in cats]
+    food = sum(t.amount for t in trans if t.cat_id == "food" and t.amount < 0)
+    assert sum_expenses_recursive(cats, trans, "food") == food
+
+# Test 4: a category list edited in place is not served a stale tree
+def test_tree_of_mutated_list():
+    cats = [Category("a", "a", None, "expense")]
+    trans = (Transaction("t", "acc1", "admin", "b", -5, "2025-01-01T00:00:00", ""),)
+    assert [c.id for c in flatten_categories(cats, "a")] == ["a"]
+    assert sum_expenses_recursive(cats, trans, "a") == 0
+    cats.append(Category("b", "b", "a", "expense"))
+    assert [c.id for c in flatten_categories(cats, "a")] == ["a", "b"]
+    assert sum_expenses_recursive(cats, trans, "a") == -5